@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Appointment, TimeSlot, MasterService
+from .models import Appointment, AppointmentArchive, AppointmentSeries, TimeSlot, WaitlistEntry
 
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
@@ -29,6 +29,26 @@ class AppointmentAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(AppointmentArchive)
+class AppointmentArchiveAdmin(admin.ModelAdmin):
+    list_display = [
+        'original_id', 'client', 'master', 'service', 'appointment_date',
+        'start_time', 'end_time', 'status', 'archived_at'
+    ]
+    list_filter = ['status', 'master', 'service']
+    list_select_related = ['client', 'master__user', 'service']
+    search_fields = [
+        'client__username', 'client__first_name', 'client__last_name',
+        'service__name'
+    ]
+    date_hierarchy = 'appointment_date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(TimeSlot)
 class TimeSlotAdmin(admin.ModelAdmin):
     list_display = ['master', 'date', 'start_time', 'end_time', 'is_available', 'is_break']
@@ -37,9 +57,21 @@ class TimeSlotAdmin(admin.ModelAdmin):
     search_fields = ['master__user__first_name', 'master__user__last_name']
     date_hierarchy = 'date'
 
-@admin.register(MasterService)
-class MasterServiceAdmin(admin.ModelAdmin):
-    list_display = ['master', 'service', 'price_modifier', 'duration_modifier', 'is_active']
-    list_filter = ['is_active', 'service__category']
-    list_editable = ['price_modifier', 'duration_modifier', 'is_active']
-    search_fields = ['master__user__first_name', 'service__name']
+@admin.register(AppointmentSeries)
+class AppointmentSeriesAdmin(admin.ModelAdmin):
+    list_display = ['client', 'master', 'service', 'frequency', 'occurrences', 'start_date', 'start_time', 'created_at']
+    list_filter = ['frequency', 'master', 'service']
+    list_select_related = ['client', 'master__user', 'service']
+    search_fields = ['client__username', 'client__first_name', 'client__last_name', 'service__name']
+    readonly_fields = ['created_at']
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = [
+        'client', 'service', 'master', 'date_from', 'date_to', 'status',
+        'offered_master', 'offered_date', 'offered_start_time', 'offer_expires_at', 'created_at'
+    ]
+    list_filter = ['status', 'service', 'master']
+    list_select_related = ['client', 'service', 'master__user', 'offered_master__user']
+    search_fields = ['client__username', 'client__first_name', 'client__last_name', 'service__name']
+    readonly_fields = ['created_at', 'notified_at']
@@ -0,0 +1,292 @@
+"""
+Выручка и загрузка мастеров для отчетов персонала.
+
+Все суммы считаются в базе: выручка — Sum по цене услуги, умноженной на
+модификатор цены мастера (MasterService.price_modifier, подзапрос), занятые
+минуты — Sum по end_time - start_time, группировка по неделям и месяцам —
+TruncWeek/TruncMonth. Учитываются и рабочие, и архивные записи.
+
+Закрытые дни (до сегодняшнего) сворачиваются командой rollup_daily_facts
+в витрину DailyServiceFact (мастер × услуга × день) и DailyMasterFact
+(рабочие минуты мастера за день). Отчет за период читает из витрины все
+свернутые дни и досчитывает по записям только оставшиеся: сегодняшний
+день, будущие даты и дни, итоги которых сброшены после изменения записей.
+
+Витрина фиксирует цены и расписание на момент свертки: изменение цены
+услуги не переписывает выручку прошлых дней.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import (
+    Count, DecimalField, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from django.utils import timezone
+from masters.models import Master, MasterSchedule, MasterService
+from services.models import Category, Service
+from .combo import to_minutes
+from .models import Appointment, AppointmentArchive, DailyMasterFact, DailyServiceFact
+from .slots import CLOSING_HOUR, OPENING_HOUR
+
+# Записи, которые занимали время мастера (отмененные его освободили)
+OCCUPYING_STATUSES = ('pending', 'confirmed', 'completed', 'no_show')
+# Сколько дней сворачивать в одной транзакции
+ROLLUP_BATCH_DAYS = 31
+
+# Поле группировки одинаково для записей и витрины
+GROUPINGS = {
+    'master': 'master_id',
+    'service': 'service_id',
+    'category': 'service__category_id',
+}
+PERIODS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+TOTALS = ('appointments_count', 'completed_count', 'cancelled_count', 'revenue', 'booked_minutes')
+
+
+def price_expression():
+    """Цена записи: цена услуги × модификатор мастера (1, если условий нет)"""
+    modifier = MasterService.objects.filter(
+        master_id=OuterRef('master_id'),
+        service_id=OuterRef('service_id'),
+    ).values('price_modifier')[:1]
+    return ExpressionWrapper(
+        F('service__price') * Coalesce(Subquery(modifier), Value(Decimal('1.00'))),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def _appointment_totals():
+    """Агрегаты по записям для .annotate()"""
+    return {
+        'appointments_count': Count('pk', filter=~Q(status='cancelled')),
+        'completed_count': Count('pk', filter=Q(status='completed')),
+        'cancelled_count': Count('pk', filter=Q(status='cancelled')),
+        'revenue': Sum(price_expression(), filter=Q(status='completed')),
+        'booked_duration': Sum(
+            ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField()),
+            filter=Q(status__in=OCCUPYING_STATUSES),
+        ),
+    }
+
+
+def _fact_totals():
+    return {name: Sum(name) for name in TOTALS}
+
+
+def date_ranges(dates):
+    """Отсортированные даты -> непрерывные диапазоны (начало, конец)"""
+    ranges = []
+    for day in sorted(dates):
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [tuple(day_range) for day_range in ranges]
+
+
+def _dates_q(field, dates):
+    return reduce(or_, (Q(**{f'{field}__range': day_range}) for day_range in date_ranges(dates)))
+
+
+def _days(date_from, date_to):
+    return [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+
+
+def scheduled_minutes(master_ids, dates):
+    """
+    Рабочие минуты мастеров по дням: {(дата, мастер): минуты}. Как и при
+    записи, без заполненного расписания мастер работает в часы студии.
+    """
+    opening, closing = OPENING_HOUR * 60, CLOSING_HOUR * 60
+    schedule = {}
+    for master_id, day_of_week, start_time, end_time, is_working_day in MasterSchedule.objects.filter(
+        master_id__in=master_ids
+    ).values_list('master_id', 'day_of_week', 'start_time', 'end_time', 'is_working_day'):
+        minutes = min(closing, to_minutes(end_time)) - max(opening, to_minutes(start_time))
+        schedule.setdefault(master_id, {})[day_of_week] = max(minutes, 0) if is_working_day else 0
+
+    result = {}
+    for master_id in master_ids:
+        days = schedule.get(master_id)
+        for day in dates:
+            result[(day, master_id)] = closing - opening if days is None else days.get(day.isoweekday(), 0)
+    return result
+
+
+def _live_rows(dates, key_fields):
+    """Агрегаты по рабочим и архивным записям за даты, суммированные по ключу"""
+    rows = {}
+    for model in (Appointment, AppointmentArchive):
+        queryset = model.objects.filter(_dates_q('appointment_date', dates)).values(*key_fields)
+        for row in queryset.annotate(**_appointment_totals()).order_by():
+            key = tuple(row[field] for field in key_fields)
+            booked = row.pop('booked_duration') or timedelta()
+            row['booked_minutes'] = int(booked.total_seconds() // 60)
+            row['revenue'] = row['revenue'] or Decimal('0.00')
+            _add(rows, key, row)
+    return rows
+
+
+def _add(rows, key, row):
+    totals = rows.setdefault(key, dict.fromkeys(TOTALS, 0))
+    for name in TOTALS:
+        totals[name] += row[name] or 0
+
+
+# Свертка закрытых дней
+
+def rolled_up_dates(date_from, date_to):
+    return set(
+        DailyMasterFact.objects.filter(date__range=(date_from, date_to))
+        .values_list('date', flat=True).distinct()
+    )
+
+
+def days_to_roll_up(date_from, date_to):
+    """Закрытые дни периода, которых еще нет в витрине"""
+    date_to = min(date_to, timezone.localdate() - timedelta(days=1))
+    if date_from > date_to:
+        return []
+    done = rolled_up_dates(date_from, date_to)
+    return [day for day in _days(date_from, date_to) if day not in done]
+
+
+def rollup_days(dates):
+    """Пересчитывает витрину за закрытые дни, возвращает число строк итогов по услугам"""
+    created = 0
+    dates = sorted(dates)
+    for index in range(0, len(dates), ROLLUP_BATCH_DAYS):
+        batch = dates[index:index + ROLLUP_BATCH_DAYS]
+        rows = _live_rows(batch, ('appointment_date', 'master_id', 'service_id'))
+        master_ids = set(Master.objects.filter(is_active=True).values_list('pk', flat=True))
+        master_ids.update(master_id for day, master_id, service_id in rows)
+        minutes = scheduled_minutes(master_ids, batch)
+        with transaction.atomic():
+            DailyServiceFact.objects.filter(date__in=batch).delete()
+            DailyMasterFact.objects.filter(date__in=batch).delete()
+            DailyServiceFact.objects.bulk_create([
+                DailyServiceFact(date=day, master_id=master_id, service_id=service_id, **totals)
+                for (day, master_id, service_id), totals in rows.items()
+            ])
+            DailyMasterFact.objects.bulk_create([
+                DailyMasterFact(date=day, master_id=master_id, scheduled_minutes=value)
+                for (day, master_id), value in minutes.items()
+            ])
+        created += len(rows)
+    return created
+
+
+def invalidate_daily_facts(*dates):
+    """Сбрасывает итоги дней, записи которых изменились; их пересчитает следующая свертка"""
+    today = timezone.localdate()
+    closed = {day for day in dates if day and day < today}
+    if closed:
+        DailyServiceFact.objects.filter(date__in=closed).delete()
+        DailyMasterFact.objects.filter(date__in=closed).delete()
+
+
+# Отчет
+
+def build_report(date_from, date_to, group_by='master', period=None):
+    """
+    Выручка и загрузка за период: список строк с ключом группировки
+    (мастер, услуга или категория) и, если задан period, началом недели
+    или месяца. Для мастеров строки содержат рабочие минуты и загрузку.
+    """
+    key_field = GROUPINGS[group_by]
+    trunc = PERIODS.get(period)
+    covered = rolled_up_dates(date_from, date_to)
+    uncovered = [day for day in _days(date_from, date_to) if day not in covered]
+    rows = {}
+
+    facts = DailyServiceFact.objects.filter(date__range=(date_from, date_to))
+    fact_keys = [key_field]
+    if trunc:
+        facts = facts.annotate(period=trunc('date'))
+        fact_keys.insert(0, 'period')
+    for row in facts.values(*fact_keys).annotate(**_fact_totals()).order_by():
+        _add(rows, (row.get('period'), row[key_field]), row)
+
+    if uncovered:
+        live_keys = ('appointment_date', key_field)
+        for (day, key), totals in _live_rows(uncovered, live_keys).items():
+            _add(rows, (_period_start(day, period), key), totals)
+
+    if group_by == 'master':
+        _add_scheduled_minutes(rows, date_from, date_to, uncovered, trunc, period)
+
+    return _labelled(rows, group_by)
+
+
+def _period_start(day, period):
+    """То же, что TruncWeek/TruncMonth в базе, для дат, посчитанных по записям"""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return None
+
+
+def _add_scheduled_minutes(rows, date_from, date_to, uncovered, trunc, period):
+    scheduled = {}
+    facts = DailyMasterFact.objects.filter(date__range=(date_from, date_to))
+    keys = ['master_id']
+    if trunc:
+        facts = facts.annotate(period=trunc('date'))
+        keys.insert(0, 'period')
+    for row in facts.values(*keys).annotate(minutes=Sum('scheduled_minutes')).order_by():
+        key = (row.get('period'), row['master_id'])
+        scheduled[key] = scheduled.get(key, 0) + row['minutes']
+
+    if uncovered:
+        master_ids = set(Master.objects.filter(is_active=True).values_list('pk', flat=True))
+        master_ids.update(master_id for period_start, master_id in rows)
+        for (day, master_id), minutes in scheduled_minutes(master_ids, uncovered).items():
+            key = (_period_start(day, period), master_id)
+            scheduled[key] = scheduled.get(key, 0) + minutes
+
+    for key, minutes in scheduled.items():
+        totals = rows.setdefault(key, dict.fromkeys(TOTALS, 0))
+        totals['scheduled_minutes'] = minutes
+
+
+def _labelled(rows, group_by):
+    keys = {key for period_start, key in rows if key is not None}
+    if group_by == 'master':
+        names = {pk: master.get_full_name() for pk, master in Master.objects.select_related('user').in_bulk(keys).items()}
+    elif group_by == 'service':
+        names = dict(Service.objects.filter(pk__in=keys).values_list('pk', 'name'))
+    else:
+        names = dict(Category.objects.filter(pk__in=keys).values_list('pk', 'name'))
+
+    report = []
+    for (period_start, key), totals in rows.items():
+        row = {'period': period_start, 'key': key, 'label': names.get(key, '—'), **totals}
+        row.setdefault('scheduled_minutes', None)
+        if row['scheduled_minutes']:
+            row['utilisation'] = round(row['booked_minutes'] * 100 / row['scheduled_minutes'], 1)
+        else:
+            row['utilisation'] = None
+        report.append(row)
+    report.sort(key=lambda row: (row['period'] or date.min, -row['revenue'], row['label']))
+    return report
+
+
+def report_totals(report):
+    """Итоговая строка отчета"""
+    totals = dict.fromkeys(TOTALS, 0)
+    scheduled = 0
+    for row in report:
+        for name in TOTALS:
+            totals[name] += row[name]
+        scheduled += row['scheduled_minutes'] or 0
+    totals['scheduled_minutes'] = scheduled or None
+    totals['utilisation'] = round(totals['booked_minutes'] * 100 / scheduled, 1) if scheduled else None
+    return totals
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class BookingsConfig(AppConfig):
+    name = 'bookings'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,106 @@
+"""
+Архивирование старых записей.
+
+Завершенные и отмененные записи старше заданного срока переносятся из
+рабочей таблицы ``Appointment`` в ``AppointmentArchive``, чтобы запросы
+проверки пересечений, списков записей и админки работали с небольшим
+набором строк. Клиенты по-прежнему видят свою историю через
+``ArchiveReadThrough``.
+"""
+from datetime import date
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+from .calendar import invalidate_feeds
+from .models import Appointment, AppointmentArchive
+
+ARCHIVABLE_STATUSES = ['completed', 'cancelled', 'no_show']
+
+ARCHIVED_FIELDS = [
+    'client_id', 'master_id', 'service_id', 'appointment_date', 'start_time',
+    'end_time', 'status', 'notes', 'created_at', 'updated_at',
+]
+
+
+def get_archive_cutoff(months, today=None):
+    """Возвращает дату, записи раньше которой подлежат архивации"""
+    today = today or timezone.localdate()
+    month_index = today.year * 12 + today.month - 1 - months
+    year, month = divmod(month_index, 12)
+    return date(year, month + 1, 1)
+
+
+def get_archivable_appointments(cutoff):
+    """Записи, которые можно перенести в архив"""
+    return Appointment.objects.filter(
+        appointment_date__lt=cutoff,
+        status__in=ARCHIVABLE_STATUSES,
+    )
+
+
+def archive_appointments(cutoff, batch_size=500):
+    """Переносит записи старше cutoff в архив пакетами, возвращает их количество"""
+    queryset = get_archivable_appointments(cutoff).order_by('pk')
+    archived = 0
+    while True:
+        rows = list(queryset.values('pk', *ARCHIVED_FIELDS)[:batch_size])
+        if not rows:
+            break
+        with transaction.atomic():
+            ids = [row.pop('pk') for row in rows]
+            AppointmentArchive.objects.bulk_create(
+                [AppointmentArchive(original_id=pk, **row) for pk, row in zip(ids, rows)],
+                ignore_conflicts=True,
+            )
+            # Одним DELETE без сигналов post_delete: закрытые записи не занимают
+            # слоты, а сводки клиентов и итоги дней учитывают архив. Внешних
+            # ключей на Appointment нет, каскадное удаление не нужно
+            deleted = Appointment.objects.filter(pk__in=ids)
+            deleted._raw_delete(deleted.db)
+            transaction.on_commit(partial(
+                invalidate_feeds,
+                master_ids=[row['master_id'] for row in rows],
+                client_ids=[row['client_id'] for row in rows],
+            ))
+        archived += len(ids)
+    return archived
+
+
+class ArchiveReadThrough:
+    """
+    Последовательность для Paginator: сначала записи из рабочей таблицы,
+    затем из архива. Архивные записи всегда старше рабочих, поэтому
+    общий порядок по убыванию даты сохраняется.
+    """
+
+    def __init__(self, appointments, archived):
+        self.appointments = appointments
+        self.archived = archived
+        self._hot_count = None
+
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.appointments.count()
+        return self._hot_count
+
+    def count(self):
+        return self.hot_count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+        hot_count = self.hot_count()
+
+        items = []
+        if start < hot_count:
+            items.extend(self.appointments[start:min(stop, hot_count)])
+        if stop > hot_count:
+            items.extend(self.archived[max(start - hot_count, 0):stop - hot_count])
+        return items
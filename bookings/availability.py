@@ -0,0 +1,99 @@
+"""
+Кэш занятости дня мастера.
+
+Расчет свободного времени читает из базы интервалы активных записей
+мастера на дату. Эти интервалы кэшируются под ключом с версией слотов
+(slots.py): любое изменение записей мастера на дату меняет версию,
+и старый ключ просто перестает читаться, поэтому отдельно сбрасывать
+кэш не нужно. Удержания и длительность услуги в кэш не входят: они
+накладываются на интервалы при каждом запросе без обращения к базе.
+
+Команда prewarm_availability заранее заполняет кэш для пар (мастер, дата),
+которые по прогнозу (forecast.py) будут запрашивать чаще всего. Попадания
+и промахи учитываются в метрике cache_requests_total (core/metrics.py).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from core.metrics import cache_access
+from .models import Appointment
+from .slots import aget_slots_version, get_slots_version
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+
+def _busy_key(master_id, date, version):
+    return f'bookings:busy:{master_id}:{date.isoformat()}:{version}'
+
+
+def _load_busy_intervals(master_id, date):
+    """Интервалы активных записей мастера на дату (один запрос на весь день)"""
+    return list(Appointment.objects.filter(
+        master_id=master_id,
+        appointment_date=date,
+        status__in=ACTIVE_STATUSES,
+    ).values_list('start_time', 'end_time'))
+
+
+def get_busy_intervals(master_id, date, version=None):
+    """Занятые интервалы мастера на дату, при промахе — один запрос"""
+    if version is None:
+        version = get_slots_version(master_id, date)
+    key = _busy_key(master_id, date, version)
+    intervals = cache.get(key)
+    cache_access('availability', intervals is not None)
+    if intervals is not None:
+        return intervals
+    intervals = _load_busy_intervals(master_id, date)
+    cache.set(key, intervals, settings.BOOKING_AVAILABILITY_TIMEOUT)
+    return intervals
+
+
+async def aget_busy_intervals(master_id, date, version=None):
+    """Асинхронный вариант get_busy_intervals"""
+    if version is None:
+        version = await aget_slots_version(master_id, date)
+    key = _busy_key(master_id, date, version)
+    intervals = await cache.aget(key)
+    cache_access('availability', intervals is not None)
+    if intervals is not None:
+        return intervals
+    intervals = await sync_to_async(_load_busy_intervals)(master_id, date)
+    await cache.aset(key, intervals, settings.BOOKING_AVAILABILITY_TIMEOUT)
+    return intervals
+
+
+def prewarm_busy_intervals(master_days):
+    """
+    Заполняет кэш занятости для пар (мастер, дата) одним запросом.
+    Уже закэшированные для текущей версии пары пропускаются.
+    Возвращает число заполненных пар.
+    """
+    master_days = set(master_days)
+    if not master_days:
+        return 0
+    # Версии читаем до запроса: запись, появившаяся во время прогрева,
+    # сменит версию, и прогретый ключ просто не будет прочитан
+    keys = {
+        (master_id, date): _busy_key(master_id, date, get_slots_version(master_id, date))
+        for master_id, date in master_days
+    }
+    cached = cache.get_many(list(keys.values()))
+    missing = {pair for pair, key in keys.items() if key not in cached}
+    if not missing:
+        return 0
+
+    intervals = {pair: [] for pair in missing}
+    rows = Appointment.objects.filter(
+        master_id__in={master_id for master_id, date in missing},
+        appointment_date__in={date for master_id, date in missing},
+        status__in=ACTIVE_STATUSES,
+    ).values_list('master_id', 'appointment_date', 'start_time', 'end_time')
+    for master_id, date, start_time, end_time in rows:
+        if (master_id, date) in intervals:
+            intervals[(master_id, date)].append((start_time, end_time))
+    cache.set_many(
+        {keys[pair]: value for pair, value in intervals.items()},
+        settings.BOOKING_AVAILABILITY_TIMEOUT,
+    )
+    return len(intervals)
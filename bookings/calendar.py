@@ -0,0 +1,191 @@
+"""
+Календарные ленты (iCalendar, RFC 5545) для мастеров и клиентов.
+
+Лента доступна по подписанной ссылке без входа на сайт: календарные
+приложения не умеют авторизоваться. Тело ленты генерируется потоково
+и по завершении сохраняется в кэш вместе с ETag и Last-Modified, поэтому
+приложения, опрашивающие ленту каждые несколько минут, получают готовый
+ответ или 304. Кэш ленты адресуется её версией: сигналы записей меняют
+версию, и тело, дописанное в кэш после изменения, становится недостижимым.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import quote_etag
+from core.metrics import cache_access
+from .models import Appointment
+
+FEED_KINDS = ('master', 'client')
+FEED_SALT = 'bookings.calendar'
+FEED_STATUSES = ('pending', 'confirmed', 'completed')
+ICS_CONTENT_TYPE = 'text/calendar; charset=utf-8'
+
+
+def make_feed_token(kind, owner_id):
+    return signing.Signer(salt=FEED_SALT).sign(f'{kind}-{owner_id}')
+
+
+def parse_feed_token(token):
+    """Возвращает (вид, id) или None для поддельной ссылки"""
+    try:
+        value = signing.Signer(salt=FEED_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+    kind, sep, owner_id = value.partition('-')
+    if kind not in FEED_KINDS or not owner_id.isdigit():
+        return None
+    return kind, int(owner_id)
+
+
+def get_feed_url(kind, owner_id):
+    return reverse('bookings:calendar_feed', kwargs={'token': make_feed_token(kind, owner_id)})
+
+
+def get_feed_appointments(kind, owner_id):
+    since = timezone.localdate() - timedelta(days=settings.CALENDAR_FEED_PAST_DAYS)
+    appointments = Appointment.objects.filter(
+        status__in=FEED_STATUSES,
+        appointment_date__gte=since,
+    )
+    if kind == 'master':
+        return appointments.filter(master_id=owner_id)
+    return appointments.filter(client_id=owner_id)
+
+
+def _version_key(kind, owner_id):
+    return f'bookings:calendar-version:{kind}:{owner_id}'
+
+
+def _feed_key(kind, owner_id, version):
+    return f'bookings:calendar:{kind}:{owner_id}:{version}'
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def get_feed_version(kind, owner_id):
+    """Текущая версия ленты; читается до расчёта валидаторов и генерации"""
+    key = _version_key(kind, owner_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), settings.CALENDAR_FEED_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def get_cached_feed(kind, owner_id, version):
+    """(etag, last_modified, body) из кэша или None"""
+    cached = cache.get(_feed_key(kind, owner_id, version))
+    cache_access('calendar_feed', cached is not None)
+    return cached
+
+
+def get_feed_validators(kind, owner_id, appointments):
+    """ETag и Last-Modified ленты по количеству и последнему изменению записей"""
+    stats = appointments.aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+    last_modified = stats['last_modified']
+    stamp = int(last_modified.timestamp()) if last_modified else 0
+    # Количество входит в ETag: удаление записи не меняет максимум updated_at
+    etag = quote_etag(f"{kind}-{owner_id}-{stats['count']}-{stamp}")
+    return etag, stamp
+
+
+def invalidate_feeds(master_ids=(), client_ids=()):
+    feeds = [('master', pk) for pk in set(master_ids) if pk]
+    feeds += [('client', pk) for pk in set(client_ids) if pk]
+    cache.set_many(
+        {_version_key(kind, pk): _new_version() for kind, pk in feeds},
+        settings.CALENDAR_FEED_TIMEOUT,
+    )
+
+
+def stream_feed(kind, owner_id, version, appointments, etag, last_modified, host):
+    """
+    Генератор строк ленты; полностью отданная лента сохраняется в кэш
+    под версией, прочитанной до генерации. Если записи изменились, пока
+    лента отдавалась, версия уже другая и устаревшее тело никто не прочитает.
+    """
+    chunks = []
+    for chunk in _render_calendar(kind, appointments, host):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(
+        _feed_key(kind, owner_id, version),
+        (etag, last_modified, ''.join(chunks)),
+        settings.CALENDAR_FEED_TIMEOUT,
+    )
+
+
+def _render_calendar(kind, appointments, host):
+    name = 'Записи клиентов' if kind == 'master' else 'Мои записи'
+    yield _line('BEGIN:VCALENDAR')
+    yield _line('VERSION:2.0')
+    yield _line('PRODID:-//Elegant Studio//Bookings//RU')
+    yield _line('CALSCALE:GREGORIAN')
+    yield _line('METHOD:PUBLISH')
+    yield _line(f'X-WR-CALNAME:{_escape(name)}')
+    related = ('client', 'service') if kind == 'master' else ('master__user', 'service')
+    queryset = appointments.select_related(*related).order_by('appointment_date', 'start_time')
+    for appointment in queryset.iterator(chunk_size=500):
+        yield ''.join(_render_event(kind, appointment, host))
+    yield _line('END:VCALENDAR')
+
+
+def _render_event(kind, appointment, host):
+    if kind == 'master':
+        person = appointment.client.get_full_name() or appointment.client.username
+    else:
+        person = str(appointment.master)
+    yield _line('BEGIN:VEVENT')
+    yield _line(f'UID:appointment-{appointment.pk}@{host}')
+    yield _line(f'DTSTAMP:{_utc(appointment.updated_at)}')
+    yield _line(f'DTSTART:{_utc(_local(appointment.appointment_date, appointment.start_time))}')
+    yield _line(f'DTEND:{_utc(_local(appointment.appointment_date, appointment.end_time))}')
+    yield _line(f'SUMMARY:{_escape(f"{appointment.service.name} — {person}")}')
+    if appointment.notes:
+        yield _line(f'DESCRIPTION:{_escape(appointment.notes)}')
+    yield _line(f"STATUS:{'TENTATIVE' if appointment.status == 'pending' else 'CONFIRMED'}")
+    yield _line('END:VEVENT')
+
+
+def _local(date, time):
+    return timezone.make_aware(datetime.combine(date, time))
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _escape(text):
+    return (
+        text.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _line(content):
+    """Строка iCalendar с переносом длинных строк по 75 байт"""
+    parts = []
+    current = ''
+    size = 0
+    for char in content:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > 75:
+            parts.append(current)
+            # Строка-продолжение начинается с пробела
+            current = ' '
+            size = 1
+        current += char
+        size += char_size
+    parts.append(current)
+    return '\r\n'.join(parts) + '\r\n'
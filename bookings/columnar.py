@@ -0,0 +1,210 @@
+"""
+Колоночная аналитика записей в памяти (NumPy).
+
+Для разовых отчетов (тепловая карта занятости по дням недели и часам,
+загрузка мастеров, повторные визиты и удержание клиентов) записи читаются
+не экземплярами моделей, а кортежами values_list(...).iterator() и сразу
+раскладываются по массивам NumPy:
+
+- даты — int32, номер дня от 1970-01-01;
+- время начала и окончания — int16, минуты от полуночи;
+- id мастера, клиента и услуги — int32;
+- статус — int8, индекс в Appointment.STATUS_CHOICES.
+
+Запись занимает 21 байт против нескольких килобайт у экземпляра модели,
+а расчеты выполняются векторно по всему массиву. Используется отдельными
+командами, поэтому NumPy не нужен для работы сайта.
+"""
+from dataclasses import dataclass, fields
+from datetime import date, timedelta
+from itertools import islice
+
+import numpy as np
+from .analytics import OCCUPYING_STATUSES, scheduled_minutes
+from .models import Appointment, AppointmentArchive
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+STATUS_CODES = {code: index for index, (code, label) in enumerate(Appointment.STATUS_CHOICES)}
+COLUMNS = ('appointment_date', 'start_time', 'end_time', 'master_id', 'client_id', 'service_id', 'status')
+CHUNK_SIZE = 50_000
+_DTYPES = (np.int32, np.int16, np.int16, np.int32, np.int32, np.int32, np.int8)
+
+
+@dataclass
+class AppointmentColumns:
+    """Записи по столбцам: одна позиция во всех массивах — одна запись"""
+    day: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    master: np.ndarray
+    client: np.ndarray
+    service: np.ndarray
+    status: np.ndarray
+
+    def __len__(self):
+        return len(self.day)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in vars(self).values())
+
+    @classmethod
+    def concatenate(cls, parts):
+        if not parts:
+            return cls(*(np.empty(0, dtype=dtype) for dtype in _DTYPES))
+        return cls(*(np.concatenate([getattr(part, field.name) for part in parts]) for field in fields(cls)))
+
+    def where(self, mask):
+        return AppointmentColumns(*(array[mask] for array in vars(self).values()))
+
+    def with_status(self, *statuses):
+        return self.where(np.isin(self.status, [STATUS_CODES[status] for status in statuses]))
+
+
+def day_number(value):
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+def from_day_number(value):
+    return date.fromordinal(int(value) + EPOCH_ORDINAL)
+
+
+def _chunk_columns(rows):
+    # Различных дат и времен немного, поэтому преобразуем каждое значение один раз
+    days, starts, ends, masters, clients, services, statuses = zip(*rows)
+    day_cache = {value: day_number(value) for value in set(days)}
+    minute_cache = {value: value.hour * 60 + value.minute for value in set(starts) | set(ends)}
+    count = len(rows)
+    return AppointmentColumns(
+        np.fromiter(map(day_cache.__getitem__, days), dtype=np.int32, count=count),
+        np.fromiter(map(minute_cache.__getitem__, starts), dtype=np.int16, count=count),
+        np.fromiter(map(minute_cache.__getitem__, ends), dtype=np.int16, count=count),
+        np.fromiter(masters, dtype=np.int32, count=count),
+        np.fromiter(clients, dtype=np.int32, count=count),
+        np.fromiter(services, dtype=np.int32, count=count),
+        np.fromiter(map(STATUS_CODES.__getitem__, statuses), dtype=np.int8, count=count),
+    )
+
+
+def load_columns(date_from=None, date_to=None, include_archive=True, chunk_size=CHUNK_SIZE):
+    """Читает записи (и архив) в столбцы пачками по chunk_size строк"""
+    models = (Appointment, AppointmentArchive) if include_archive else (Appointment,)
+    parts = []
+    for model in models:
+        queryset = model.objects.all()
+        if date_from:
+            queryset = queryset.filter(appointment_date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(appointment_date__lte=date_to)
+        rows = queryset.order_by().values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+        while chunk := list(islice(rows, chunk_size)):
+            parts.append(_chunk_columns(chunk))
+    return AppointmentColumns.concatenate(parts)
+
+
+def weekday(days):
+    """День недели номеров дней: 0 — понедельник (1970-01-01 был четвергом)"""
+    return (days + 3) % 7
+
+
+def busy_hour_heatmap(columns, first_hour=0, last_hour=24):
+    """
+    Занятые минуты по дням недели и часам: массив 7 × (last_hour - first_hour).
+    Запись 10:30–12:00 дает 30 минут в час 10 и 60 минут в час 11.
+    """
+    busy = columns.with_status(*OCCUPYING_STATUSES)
+    starts = busy.start.astype(np.int32)
+    ends = busy.end.astype(np.int32)
+    first_hours = starts // 60
+    cells = weekday(busy.day) * 24
+    # Проходов столько, сколько часов захватывает самая длинная запись, а не 24
+    span = int(((ends - 1) // 60 - first_hours).max()) + 1 if len(busy) else 0
+    heatmap = np.zeros(7 * 24, dtype=np.int64)
+    for offset in range(span):
+        hours = first_hours + offset
+        overlap = np.minimum(ends, (hours + 1) * 60) - np.maximum(starts, hours * 60)
+        np.clip(overlap, 0, None, out=overlap)
+        heatmap += np.bincount(cells + np.minimum(hours, 23), weights=overlap, minlength=7 * 24).astype(np.int64)
+    return heatmap.reshape(7, 24)[:, first_hour:last_hour]
+
+
+def master_utilisation(columns, date_from, date_to):
+    """Загрузка мастеров за период: {мастер: (занято минут, рабочих минут, %)}"""
+    period = columns.where((columns.day >= day_number(date_from)) & (columns.day <= day_number(date_to)))
+    busy = period.with_status(*OCCUPYING_STATUSES)
+    masters, inverse = np.unique(busy.master, return_inverse=True)
+    booked = np.bincount(inverse, weights=busy.end.astype(np.int32) - busy.start, minlength=len(masters))
+
+    dates = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+    scheduled = {}
+    for (day, master_id), minutes in scheduled_minutes([int(master) for master in masters], dates).items():
+        scheduled[master_id] = scheduled.get(master_id, 0) + minutes
+
+    result = {}
+    for master_id, minutes in zip(masters.tolist(), booked.tolist()):
+        available = scheduled.get(master_id, 0)
+        result[master_id] = (int(minutes), available, round(minutes * 100 / available, 1) if available else None)
+    return result
+
+
+def _client_visit_months(columns):
+    """Клиенты и месяцы (от 1970-01) их завершенных визитов"""
+    visits = columns.with_status('completed')
+    months = visits.day.astype('datetime64[D]').astype('datetime64[M]').astype(np.int32)
+    clients, inverse = np.unique(visits.client, return_inverse=True)
+    return clients, inverse, months
+
+
+def repeat_client_rate(columns):
+    """Доля клиентов, у которых больше одного завершенного визита: (повторных, всего, %)"""
+    clients, inverse, months = _client_visit_months(columns)
+    visits = np.bincount(inverse, minlength=len(clients))
+    repeat = int(np.count_nonzero(visits > 1))
+    return repeat, len(clients), round(repeat * 100 / len(clients), 1) if len(clients) else None
+
+
+def cohort_retention(columns, months_ahead=6):
+    """
+    Удержание по когортам первого визита: (месяцы когорт, размеры когорт,
+    матрица долей). Ячейка [когорта, k] — доля клиентов когорты, пришедших
+    снова через k месяцев после первого визита (k = 0 — сама когорта).
+    """
+    clients, inverse, months = _client_visit_months(columns)
+    if not len(clients):
+        return [], np.empty(0, dtype=np.int64), np.empty((0, months_ahead + 1))
+    first_month = np.full(len(clients), np.iinfo(np.int32).max, dtype=np.int32)
+    np.minimum.at(first_month, inverse, months)
+    offset = months - first_month[inverse]
+    in_window = offset <= months_ahead
+
+    # Клиент учитывается в ячейке один раз, сколько бы визитов у него ни было за месяц
+    pairs = np.unique(inverse[in_window].astype(np.int64) * (months_ahead + 1) + offset[in_window])
+    pair_clients, pair_offsets = np.divmod(pairs, months_ahead + 1)
+    cohorts, cohort_index = np.unique(first_month, return_inverse=True)
+    counts = np.bincount(
+        cohort_index[pair_clients] * (months_ahead + 1) + pair_offsets,
+        minlength=len(cohorts) * (months_ahead + 1),
+    ).reshape(len(cohorts), months_ahead + 1)
+    sizes = counts[:, 0]
+    cohort_months = [
+        date(1970 + int(month) // 12, int(month) % 12 + 1, 1) for month in cohorts
+    ]
+    return cohort_months, sizes, counts / sizes[:, None]
+
+
+def synthetic_columns(rows, masters=30, clients=200_000, services=40, days=3 * 365, seed=1):
+    """Случайные записи для замеров на объемах, которых нет в базе"""
+    rng = np.random.default_rng(seed)
+    start = rng.integers(9 * 2, 20 * 2, size=rows, dtype=np.int16) * 30
+    duration = rng.choice(np.array([30, 45, 60, 90, 120], dtype=np.int16), size=rows)
+    status_weights = [0.05, 0.1, 0.7, 0.1, 0.05]
+    return AppointmentColumns(
+        (rng.integers(0, days, size=rows) + day_number(date(2023, 1, 1))).astype(np.int32),
+        start,
+        np.minimum(start + duration, 21 * 60).astype(np.int16),
+        rng.integers(1, masters + 1, size=rows, dtype=np.int32),
+        # Частые клиенты встречаются чаще: распределение с тяжелым хвостом
+        np.minimum(rng.zipf(1.3, size=rows), clients).astype(np.int32),
+        rng.integers(1, services + 1, size=rows, dtype=np.int32),
+        rng.choice(np.arange(len(STATUS_CODES), dtype=np.int8), size=rows, p=status_weights),
+    )
@@ -0,0 +1,223 @@
+"""
+Комплексная запись: несколько услуг подряд, у одного или разных мастеров.
+
+Данные дня загружаются тремя запросами независимо от числа мастеров:
+какие мастера оказывают услуги комплекса, активные записи этих мастеров
+на дату и их расписание. Длительность услуги у мастера берется из карты
+условий (durations.py). Из них
+строятся множества свободных интервалов в минутах от полуночи, и дальше
+решатель работает только в памяти.
+
+Решатель перебирает начала первой услуги по сетке слотов от раннего
+к позднему. Каждая следующая услуга начинается ровно в момент окончания
+предыдущей, поэтому состояние поиска — (номер услуги, время начала).
+Неудачные состояния запоминаются и не проверяются повторно через других
+мастеров: даже для 5 услуг и 30 мастеров перебор проверяет сотни
+состояний, а не 30^5 сочетаний.
+"""
+from bisect import bisect_right
+from datetime import time
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from masters.models import MasterSchedule, MasterService
+from .durations import get_duration
+from .holds import get_held_intervals
+from .models import Appointment
+from .slots import CLOSING_HOUR, OPENING_HOUR, slot_start_times
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+MAX_COMBO_SERVICES = 5
+
+
+class ComboUnavailable(Exception):
+    """Подобранное время заняли до записи"""
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def subtract_intervals(window, busy):
+    """Свободные интервалы окна за вычетом занятых"""
+    free = []
+    cursor, window_end = window
+    for busy_start, busy_end in sorted(busy):
+        if busy_end <= cursor:
+            continue
+        if busy_start >= window_end:
+            break
+        if busy_start > cursor:
+            free.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if cursor < window_end:
+        free.append((cursor, window_end))
+    return free
+
+
+def fits(free, start, end):
+    """Помещается ли [start, end) в один из свободных интервалов"""
+    index = bisect_right(free, (start, float('inf'))) - 1
+    return index >= 0 and free[index][0] <= start and end <= free[index][1]
+
+
+def solve_combo(parts, free_intervals, start_candidates):
+    """
+    Самая ранняя непрерывная последовательность услуг.
+
+    parts — список {id мастера: длительность в минутах} для каждой услуги
+    по порядку; free_intervals — {id мастера: отсортированные свободные
+    интервалы в минутах}; start_candidates — возможные начала первой
+    услуги по возрастанию. Возвращает [(мастер, начало, конец), ...] или None.
+    """
+    # Выполнимость остатка комплекса зависит только от номера услуги и
+    # времени начала: интервалы услуг не пересекаются, кто бы их ни выполнял
+    failed = set()
+
+    def place(index, start, previous_master):
+        if index == len(parts):
+            return []
+        if (index, start) in failed:
+            return None
+        # Сначала пробуем того же мастера, чтобы клиенту не переходить к другому
+        masters = sorted(parts[index], key=lambda master_id: master_id != previous_master)
+        for master_id in masters:
+            end = start + parts[index][master_id]
+            if not fits(free_intervals.get(master_id, ()), start, end):
+                continue
+            rest = place(index + 1, end, master_id)
+            if rest is not None:
+                return [(master_id, start, end)] + rest
+        failed.add((index, start))
+        return None
+
+    for start in start_candidates:
+        plan = place(0, start, None)
+        if plan is not None:
+            return plan
+    return None
+
+
+def load_combo_day(services, date, client_id=None):
+    """Длительности по мастерам и свободные интервалы мастеров на дату"""
+    offered = MasterService.objects.filter(
+        service__in=services,
+        is_active=True,
+        master__is_active=True,
+    ).values_list('master_id', 'service_id')
+    parts = [{} for _ in services]
+    for master_id, service_id in offered:
+        for index, service in enumerate(services):
+            if service.pk == service_id:
+                parts[index][master_id] = get_duration(master_id, service)
+
+    master_ids = set().union(*parts) if parts else set()
+    busy = {master_id: [] for master_id in master_ids}
+    for master_id, start_time, end_time in Appointment.objects.filter(
+        master_id__in=master_ids,
+        appointment_date=date,
+        status__in=ACTIVE_STATUSES,
+    ).values_list('master_id', 'start_time', 'end_time'):
+        busy[master_id].append((to_minutes(start_time), to_minutes(end_time)))
+
+    # Как и в сериях: без заполненного расписания мастер работает в часы
+    # студии, с расписанием — только в рабочие дни, указанные в нем
+    studio_window = (OPENING_HOUR * 60, CLOSING_HOUR * 60)
+    windows = {master_id: studio_window for master_id in master_ids}
+    schedule = MasterSchedule.objects.filter(master_id__in=master_ids).values_list(
+        'master_id', 'day_of_week', 'start_time', 'end_time', 'is_working_day'
+    )
+    scheduled_today = set()
+    for master_id, day_of_week, start_time, end_time, is_working_day in schedule:
+        if day_of_week == date.isoweekday() and is_working_day:
+            scheduled_today.add(master_id)
+            windows[master_id] = (
+                max(studio_window[0], to_minutes(start_time)),
+                min(studio_window[1], to_minutes(end_time)),
+            )
+        elif master_id not in scheduled_today:
+            windows[master_id] = (0, 0)
+
+    free_intervals = {}
+    for master_id in master_ids:
+        held = [
+            (to_minutes(start), to_minutes(end))
+            for start, end in get_held_intervals(master_id, date, exclude_owner=client_id)
+        ]
+        free_intervals[master_id] = subtract_intervals(windows[master_id], busy[master_id] + held)
+    return parts, free_intervals
+
+
+def find_combo(services, date, client_id=None, not_before=None):
+    """Ближайший план комплекса на дату: [(id мастера, услуга, начало, конец), ...] или None"""
+    parts, free_intervals = load_combo_day(services, date, client_id)
+    if not all(parts):
+        return None
+    candidates = [
+        to_minutes(start_time) for start_time in slot_start_times()
+        if not_before is None or start_time >= not_before
+    ]
+    plan = solve_combo(parts, free_intervals, candidates)
+    if plan is None:
+        return None
+    return [
+        (master_id, service, to_time(start), to_time(end))
+        for (master_id, start, end), service in zip(plan, services)
+    ]
+
+
+def plan_signature(plan):
+    """Строка плана для формы подтверждения: мастер и время каждой услуги"""
+    return ';'.join(
+        f'{master_id}:{service.pk}:{start_time:%H:%M}-{end_time:%H:%M}'
+        for master_id, service, start_time, end_time in plan
+    )
+
+
+def book_combo(client, date, plan, notes=''):
+    """Создает все записи комплекса в одной транзакции"""
+    try:
+        # Вне транзакции запроса atomic — транзакция, внутри — точка сохранения:
+        # неудачная вставка откатывает только записи комплекса
+        with transaction.atomic():
+            appointments = []
+            for master_id, service, start_time, end_time in plan:
+                conflicting = Appointment.objects.filter(
+                    master_id=master_id,
+                    appointment_date=date,
+                    status__in=ACTIVE_STATUSES,
+                    start_time__lt=end_time,
+                    end_time__gt=start_time,
+                ).exists()
+                # Время, которое другой клиент удержал уже после подбора плана
+                held = get_held_intervals(master_id, date, exclude_owner=client.pk)
+                if conflicting or any(held_start < end_time and held_end > start_time for held_start, held_end in held):
+                    raise ComboUnavailable
+                appointment = Appointment(
+                    client=client,
+                    master_id=master_id,
+                    service=service,
+                    appointment_date=date,
+                    start_time=start_time,
+                    end_time=end_time,
+                    notes=notes,
+                )
+                appointment.save()
+                appointments.append(appointment)
+    except IntegrityError:
+        # Одновременная запись заняла то же начало после проверки
+        # (appointment_active_slot_unique)
+        raise ComboUnavailable
+    return appointments
+
+
+def combo_not_before(date):
+    """Раньше какого времени нельзя начать комплекс: на сегодня — не в прошлом"""
+    now = timezone.localtime()
+    if date == now.date():
+        return now.time()
+    return None
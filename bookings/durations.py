@@ -0,0 +1,117 @@
+"""
+Длительность и цена услуги у мастера.
+
+Все условия мастеров (MasterService) загружаются одним запросом в карту
+(id мастера, id услуги) -> (длительность, цена) и хранятся в кэше до
+изменения MasterService или Service (см. signals.py); при этом меняется
+и версия условий, входящая в ETag свободного времени. Через эту карту
+время окончания считают модель записи, форма, расчет свободного времени
+и подбор мастера, поэтому проверяемый интервал всегда совпадает
+с сохраненным. Если у мастера нет условий для услуги, действуют базовые
+длительность и цена услуги.
+"""
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from core.metrics import cache_access
+from masters.models import MasterService
+
+SERVICE_TERMS_KEY = 'bookings:service-terms'
+SERVICE_TERMS_VERSION_KEY = 'bookings:service-terms-version'
+# Длительность на случай, если у услуги она не указана
+DEFAULT_DURATION = 30
+
+ServiceTerms = namedtuple('ServiceTerms', ['duration', 'price'])
+
+
+def _load_service_terms():
+    rows = MasterService.objects.values_list(
+        'master_id', 'service_id', 'duration_modifier', 'price_modifier',
+        'service__duration_minutes', 'service__price',
+    )
+    return {
+        (master_id, service_id): ServiceTerms(duration + duration_modifier, price * price_modifier)
+        for master_id, service_id, duration_modifier, price_modifier, duration, price in rows
+    }
+
+
+def get_service_terms_map():
+    """Карта (мастер, услуга) -> ServiceTerms, один запрос при промахе кэша"""
+    terms = cache.get(SERVICE_TERMS_KEY)
+    cache_access('service_terms', terms is not None)
+    if terms is None:
+        terms = _load_service_terms()
+        cache.set(SERVICE_TERMS_KEY, terms, settings.SERVICE_TERMS_TIMEOUT)
+    return terms
+
+
+async def aget_service_terms_map():
+    """Асинхронный вариант get_service_terms_map"""
+    terms = await cache.aget(SERVICE_TERMS_KEY)
+    cache_access('service_terms', terms is not None)
+    if terms is None:
+        terms = await sync_to_async(_load_service_terms)()
+        await cache.aset(SERVICE_TERMS_KEY, terms, settings.SERVICE_TERMS_TIMEOUT)
+    return terms
+
+
+def _new_terms_version():
+    return uuid.uuid4().hex[:12]
+
+
+def get_service_terms_version():
+    """
+    Версия условий мастеров. Входит в ETag свободного времени: изменение
+    длительности меняет начала слотов без изменения записей и версии слотов
+    """
+    version = cache.get(SERVICE_TERMS_VERSION_KEY)
+    if version is None:
+        cache.add(SERVICE_TERMS_VERSION_KEY, _new_terms_version(), settings.SERVICE_TERMS_TIMEOUT)
+        version = cache.get(SERVICE_TERMS_VERSION_KEY)
+    return version
+
+
+async def aget_service_terms_version():
+    """Асинхронный вариант get_service_terms_version"""
+    version = await cache.aget(SERVICE_TERMS_VERSION_KEY)
+    if version is None:
+        await cache.aadd(SERVICE_TERMS_VERSION_KEY, _new_terms_version(), settings.SERVICE_TERMS_TIMEOUT)
+        version = await cache.aget(SERVICE_TERMS_VERSION_KEY)
+    return version
+
+
+def invalidate_service_terms():
+    cache.delete(SERVICE_TERMS_KEY)
+    cache.set(SERVICE_TERMS_VERSION_KEY, _new_terms_version(), settings.SERVICE_TERMS_TIMEOUT)
+
+
+def _resolve(terms, master_id, service):
+    found = terms.get((master_id, service.pk))
+    if found is not None:
+        return found
+    return ServiceTerms(service.duration_minutes, service.price)
+
+
+def get_service_terms(master_id, service):
+    """Длительность и цена услуги у мастера"""
+    return _resolve(get_service_terms_map(), master_id, service)
+
+
+def get_duration(master_id, service):
+    """Длительность услуги у мастера в минутах"""
+    return get_service_terms(master_id, service).duration or DEFAULT_DURATION
+
+
+async def aget_duration(master_id, service):
+    """Асинхронный вариант get_duration"""
+    return _resolve(await aget_service_terms_map(), master_id, service).duration or DEFAULT_DURATION
+
+
+def get_end_time(master_id, service, date, start_time):
+    """Окончание услуги у мастера, начатой в start_time"""
+    start = datetime.combine(date, start_time)
+    return (start + timedelta(minutes=get_duration(master_id, service))).time()
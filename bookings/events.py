@@ -0,0 +1,99 @@
+"""
+Рассылка изменений слотов открытым формам записи (Server-Sent Events).
+
+Сигналы Appointment публикуют событие в канал (мастер, дата), а каждый
+подписчик — открытое SSE-соединение — получает его через собственную
+asyncio-очередь. Публикация потокобезопасна: сигналы срабатывают в
+потоках синхронных представлений, а подписчики живут в цикле событий
+ASGI-сервера.
+
+Брокер работает внутри одного процесса: при нескольких процессах
+ASGI-сервера подписчик получит только изменения, сделанные в его процессе.
+"""
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+
+HEARTBEAT_SECONDS = 15
+# Django 4.2 не замечает отключение клиента во время потоковой передачи,
+# поэтому соединение закрывается сервером, а EventSource переподключается
+MAX_STREAM_SECONDS = 300
+QUEUE_SIZE = 32
+
+
+class SlotEventBroker:
+    """Издатель-подписчик с раздачей событий по каналам (мастер, дата)"""
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def channel_key(self, master_id, date):
+        return master_id, date.isoformat()
+
+    @contextmanager
+    def subscribe(self, master_id, date):
+        """Регистрирует очередь подписчика в текущем цикле событий"""
+        key = self.channel_key(master_id, date)
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+        with self._lock:
+            self._channels.setdefault(key, set()).add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                subscribers = self._channels.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._channels[key]
+
+    def publish(self, master_id, date, event):
+        """Отправляет событие всем подписчикам канала, возвращает их количество"""
+        with self._lock:
+            subscribers = list(self._channels.get(self.channel_key(master_id, date), ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put_nowait, queue, event)
+            except RuntimeError:
+                # Цикл событий подписчика уже закрыт
+                pass
+        return len(subscribers)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+
+def _put_nowait(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # Медленный клиент: достаточно одного непрочитанного события,
+        # по нему он все равно перезапросит слоты целиком
+        pass
+
+
+broker = SlotEventBroker()
+
+
+def format_event(event, name='slots'):
+    return f'event: {name}\ndata: {json.dumps(event)}\n\n'.encode()
+
+
+async def slot_event_stream(master_id, date, heartbeat=HEARTBEAT_SECONDS, lifetime=MAX_STREAM_SECONDS):
+    """Асинхронный поток SSE для одного мастера и даты"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + lifetime
+    with broker.subscribe(master_id, date) as queue:
+        yield b'retry: 5000\n\n'
+        while loop.time() < deadline:
+            try:
+                timeout = min(heartbeat, max(deadline - loop.time(), 0))
+                event = await asyncio.wait_for(queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                # Комментарий-пульс не дает прокси закрыть соединение
+                yield b': ping\n\n'
+            else:
+                yield format_event(event)
@@ -0,0 +1,96 @@
+"""
+Прогноз спроса на запись для прогрева кэша занятости.
+
+По рабочим и архивным записям за последние недели база считает число
+записей в разрезе мастер × услуга × день недели × час начала по неделям.
+Для каждого разреза ряд недельных значений сглаживается экспоненциально
+(простое экспоненциальное сглаживание, коэффициент alpha): последние недели
+весят больше, разовые всплески быстро затухают.
+
+Ожидаемый спрос на пару (мастер, дата) — сумма сглаженных значений мастера
+для дня недели этой даты. Пары, где мастер по расписанию не работает,
+отбрасываются. Самые востребованные пары прогревает prewarm_availability.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+from masters.models import Master
+from .analytics import scheduled_minutes
+from .models import Appointment, AppointmentArchive
+
+# Ожидаемое число записей на пару (мастер, дата), час пика и самая частая услуга
+DemandForecast = namedtuple('DemandForecast', ['master_id', 'date', 'expected', 'peak_hour', 'service_id'])
+
+
+def weekly_counts(date_from, weeks):
+    """Записи по неделям: {(мастер, услуга, день недели, час): [число за каждую неделю]}"""
+    date_to = date_from + timedelta(weeks=weeks) - timedelta(days=1)
+    counts = {}
+    for model in (Appointment, AppointmentArchive):
+        rows = model.objects.filter(appointment_date__range=(date_from, date_to)).values_list(
+            'master_id', 'service_id', 'appointment_date', ExtractHour('start_time'),
+        ).annotate(count=Count('pk')).order_by()
+        for master_id, service_id, day, hour, count in rows:
+            key = (master_id, service_id, day.isoweekday(), hour)
+            series = counts.setdefault(key, [0] * weeks)
+            series[(day - date_from).days // 7] += count
+    return counts
+
+
+def smooth(series, alpha):
+    """Простое экспоненциальное сглаживание, возвращает последний уровень"""
+    level = series[0]
+    for value in series[1:]:
+        level = alpha * value + (1 - alpha) * level
+    return level
+
+
+def demand_rates(today=None, weeks=None, alpha=None):
+    """Сглаженное число записей в неделю: {(мастер, услуга, день недели, час): значение}"""
+    today = today or timezone.localdate()
+    weeks = weeks or settings.BOOKING_FORECAST_WEEKS
+    alpha = settings.BOOKING_FORECAST_ALPHA if alpha is None else alpha
+    counts = weekly_counts(today - timedelta(weeks=weeks), weeks)
+    return {key: smooth(series, alpha) for key, series in counts.items()}
+
+
+def rank_master_days(rates, dates, master_ids=None):
+    """Пары (мастер, дата) по убыванию ожидаемого спроса"""
+    by_weekday = {}
+    for (master_id, service_id, weekday, hour), rate in rates.items():
+        demand = by_weekday.setdefault((master_id, weekday), {'total': 0, 'hours': {}, 'services': {}})
+        demand['total'] += rate
+        demand['hours'][hour] = demand['hours'].get(hour, 0) + rate
+        demand['services'][service_id] = demand['services'].get(service_id, 0) + rate
+
+    if master_ids is None:
+        master_ids = list(Master.objects.filter(is_active=True).values_list('pk', flat=True))
+    working = scheduled_minutes(master_ids, dates)
+
+    ranked = []
+    for (day, master_id), minutes in working.items():
+        demand = by_weekday.get((master_id, day.isoweekday()))
+        if not minutes or demand is None or demand['total'] <= 0:
+            continue
+        ranked.append(DemandForecast(
+            master_id,
+            day,
+            round(demand['total'], 2),
+            max(demand['hours'], key=demand['hours'].get),
+            max(demand['services'], key=demand['services'].get),
+        ))
+    ranked.sort(key=lambda forecast: (-forecast.expected, forecast.date, forecast.master_id))
+    return ranked
+
+
+def forecast_master_days(today=None, days=None, limit=None, weeks=None, alpha=None):
+    """Самые востребованные пары (мастер, дата) на ближайшие days дней"""
+    today = today or timezone.localdate()
+    days = days or settings.BOOKING_PREWARM_DAYS
+    limit = limit or settings.BOOKING_PREWARM_LIMIT
+    dates = [today + timedelta(days=offset) for offset in range(days)]
+    return rank_master_days(demand_rates(today, weeks, alpha), dates)[:limit]
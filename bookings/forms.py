@@ -1,8 +1,13 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.utils import timezone
-from datetime import datetime, timedelta
-from .models import Appointment
+from datetime import datetime
+from .models import Appointment, AppointmentSeries, WaitlistEntry
+from .combo import MAX_COMBO_SERVICES
+from .durations import get_end_time
+from .holds import get_held_intervals
+from .metrics import BOOKING_CONFLICTS
+from .series import MAX_OCCURRENCES
 from services.models import Service
 from masters.models import Master
 
@@ -49,6 +54,11 @@ class AppointmentForm(forms.ModelForm):
         model = Appointment
         fields = ['service', 'master', 'appointment_date', 'start_time', 'notes']
     
+    def __init__(self, *args, client=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Клиент, для которого удержанное им время не считается занятым
+        self.client = client
+    
     def clean(self):
         cleaned_data = super().clean()
         service = cleaned_data.get('service')
@@ -69,18 +79,16 @@ class AppointmentForm(forms.ModelForm):
             # Проверка доступности времени
             if master:
                 # Проверяем, не занято ли время у выбранного мастера
-                end_time = self._calculate_end_time(service, start_time)
+                end_time = get_end_time(master.pk, service, appointment_date, start_time)
                 if self._is_time_conflicting(master, appointment_date, start_time, end_time):
+                    BOOKING_CONFLICTS.labels('form_taken').inc()
                     raise forms.ValidationError("Выбранное время уже занято у этого мастера")
+                if self._is_time_held(master, appointment_date, start_time, end_time):
+                    BOOKING_CONFLICTS.labels('form_held').inc()
+                    raise forms.ValidationError("Выбранное время временно удержано другим клиентом")
         
         return cleaned_data
     
-    def _calculate_end_time(self, service, start_time):
-        """Рассчитывает время окончания услуги"""
-        start_datetime = datetime.combine(timezone.now().date(), start_time)
-        end_datetime = start_datetime + timedelta(minutes=service.duration_minutes)
-        return end_datetime.time()
-    
     def _is_time_conflicting(self, master, date, start_time, end_time):
         """Проверяет, есть ли конфликт времени"""
         from .models import Appointment
@@ -91,9 +99,153 @@ class AppointmentForm(forms.ModelForm):
             status__in=['pending', 'confirmed'],
             start_time__lt=end_time,
             end_time__gt=start_time
-        )
+        ).exclude(pk=self.instance.pk)
         return conflicting_appointments.exists()
 
+    def _is_time_held(self, master, date, start_time, end_time):
+        """Проверяет, не удержано ли время другим клиентом"""
+        held_intervals = get_held_intervals(
+            master.pk, date, exclude_owner=self.client.pk if self.client else None
+        )
+        return any(held_start < end_time and held_end > start_time for held_start, held_end in held_intervals)
+
+class AppointmentSeriesForm(forms.Form):
+    """Форма серии регулярных записей"""
+    service = forms.ModelChoiceField(
+        queryset=Service.objects.filter(is_active=True),
+        empty_label="Выберите услугу",
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label="Услуга"
+    )
+    master = forms.ModelChoiceField(
+        queryset=Master.objects.filter(is_active=True).select_related('user'),
+        empty_label="Выберите мастера",
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label="Мастер"
+    )
+    start_date = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        label="Дата первой записи"
+    )
+    start_time = forms.TimeField(
+        widget=forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+        label="Время начала"
+    )
+    frequency = forms.ChoiceField(
+        choices=AppointmentSeries.FREQUENCY_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label="Периодичность"
+    )
+    occurrences = forms.IntegerField(
+        min_value=2,
+        max_value=MAX_OCCURRENCES,
+        initial=4,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+        label="Количество записей"
+    )
+    notes = forms.CharField(
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
+        label="Особые пожелания",
+        required=False
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        start_time = cleaned_data.get('start_time')
+        
+        if start_date and start_date < timezone.now().date():
+            raise forms.ValidationError("Нельзя записаться на прошедшую дату")
+        if start_time and (start_time < datetime.strptime('09:00', '%H:%M').time() or
+                           start_time > datetime.strptime('21:00', '%H:%M').time()):
+            raise forms.ValidationError("Время записи должно быть с 9:00 до 21:00")
+        
+        return cleaned_data
+
+class ComboBookingForm(forms.Form):
+    """Форма комплексной записи: несколько услуг подряд в указанном порядке"""
+    appointment_date = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        label="Дата"
+    )
+    notes = forms.CharField(
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
+        label="Особые пожелания",
+        required=False
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        notes = self.fields.pop('notes')
+        for index in range(1, MAX_COMBO_SERVICES + 1):
+            self.fields[f'service_{index}'] = forms.ModelChoiceField(
+                queryset=Service.objects.filter(is_active=True),
+                required=index <= 2,
+                empty_label="Выберите услугу" if index <= 2 else "Не нужна",
+                widget=forms.Select(attrs={'class': 'form-select'}),
+                label=f"Услуга {index}"
+            )
+        self.fields['notes'] = notes
+    
+    def get_services(self):
+        """Выбранные услуги по порядку"""
+        return [
+            self.cleaned_data[f'service_{index}']
+            for index in range(1, MAX_COMBO_SERVICES + 1)
+            if self.cleaned_data.get(f'service_{index}')
+        ]
+    
+    def clean_appointment_date(self):
+        appointment_date = self.cleaned_data['appointment_date']
+        if appointment_date < timezone.now().date():
+            raise forms.ValidationError("Нельзя записаться на прошедшую дату")
+        return appointment_date
+
+class WaitlistForm(forms.ModelForm):
+    """Форма записи в лист ожидания"""
+    MAX_WINDOW_DAYS = 60
+    
+    service = forms.ModelChoiceField(
+        queryset=Service.objects.filter(is_active=True),
+        empty_label="Выберите услугу",
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label="Услуга"
+    )
+    master = forms.ModelChoiceField(
+        queryset=Master.objects.filter(is_active=True),
+        required=False,
+        empty_label="Любой мастер",
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label="Мастер"
+    )
+    date_from = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        label="С даты"
+    )
+    date_to = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        label="По дату"
+    )
+    
+    class Meta:
+        model = WaitlistEntry
+        fields = ['service', 'master', 'date_from', 'date_to']
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        
+        if date_from and date_to:
+            if date_from < timezone.now().date():
+                raise forms.ValidationError("Нельзя встать в очередь на прошедшие даты")
+            if date_to < date_from:
+                raise forms.ValidationError("Дата окончания должна быть не раньше даты начала")
+            if (date_to - date_from).days > self.MAX_WINDOW_DAYS:
+                raise forms.ValidationError(f"Диапазон дат не может превышать {self.MAX_WINDOW_DAYS} дней")
+        
+        return cleaned_data
+
 class AppointmentFilterForm(forms.Form):
     """Форма фильтрации записей"""
     STATUS_CHOICES = [
@@ -144,3 +296,58 @@ class AppointmentFilterForm(forms.Form):
         widget=forms.Select(attrs={'class': 'form-select'}),
         label="Услуга"
     )
+
+class ClientAppointmentFilterForm(AppointmentFilterForm):
+    """Форма фильтрации записей клиента с доступом к архиву"""
+    include_archive = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        label="Показать архивные записи"
+    )
+
+class AnalyticsReportForm(forms.Form):
+    """Параметры отчета по выручке и загрузке"""
+    MAX_DAYS = 366 * 3
+    GROUP_BY_CHOICES = [
+        ('master', 'По мастерам'),
+        ('service', 'По услугам'),
+        ('category', 'По категориям'),
+    ]
+    PERIOD_CHOICES = [
+        ('', 'За весь период'),
+        ('week', 'По неделям'),
+        ('month', 'По месяцам'),
+    ]
+    
+    date_from = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        label="С даты"
+    )
+    date_to = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        label="По дату"
+    )
+    group_by = forms.ChoiceField(
+        choices=GROUP_BY_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label="Группировка"
+    )
+    period = forms.ChoiceField(
+        choices=PERIOD_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label="Разбивка"
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        
+        if date_from and date_to:
+            if date_to < date_from:
+                raise forms.ValidationError("Дата окончания должна быть не раньше даты начала")
+            if (date_to - date_from).days > self.MAX_DAYS:
+                raise forms.ValidationError(f"Период отчета не может превышать {self.MAX_DAYS} дней")
+        
+        return cleaned_data
@@ -0,0 +1,132 @@
+"""
+Временное удержание слотов.
+
+Удержание занимает ключи кэша (мастер, дата, ячейка сетки) всех ячеек,
+которые пересекает интервал услуги. Каждая ячейка занимается атомарно
+через cache.add, поэтому два пересекающихся удержания не могут быть
+получены одновременно. По истечении срока ключи исчезают сами, и чистить
+просроченные удержания не нужно. Пока время удержано, расчет свободного
+времени считает его занятым для всех, кроме владельца удержания.
+
+Удержания всех слотов мастера на дату читаются одним get_many по сетке
+slot_start_times(). Как и версии слотов, удержания требуют общего для
+всех процессов кэша.
+"""
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.utils.crypto import md5
+from .slots import SLOT_MINUTES, slot_start_times
+
+
+def _hold_key(master_id, date, start_time):
+    return f"bookings:hold:{master_id}:{date.isoformat()}:{start_time.strftime('%H:%M')}"
+
+
+def _covered_starts(date, start_time, end_time):
+    """Ячейки сетки, которые пересекает интервал"""
+    covered = []
+    for cell_start in slot_start_times():
+        cell_end = (datetime.combine(date, cell_start) + timedelta(minutes=SLOT_MINUTES)).time()
+        if cell_start < end_time and cell_end > start_time:
+            covered.append(cell_start)
+    return covered
+
+
+def hold_slot(master_id, date, start_time, end_time, owner_id, seconds):
+    """Удерживает время за владельцем; False, если оно пересекается с чужим удержанием"""
+    value = {'owner': owner_id, 'start': start_time, 'end': end_time}
+    acquired = []
+    for cell_start in _covered_starts(date, start_time, end_time):
+        key = _hold_key(master_id, date, cell_start)
+        if not cache.add(key, value, seconds):
+            current = cache.get(key)
+            if current is None or current['owner'] != owner_id:
+                cache.delete_many(acquired)
+                return False
+            # Своя ячейка (например, повторный выбор того же времени): продлеваем
+            cache.set(key, value, seconds)
+        acquired.append(key)
+    return True
+
+
+def release_hold(master_id, date, start_time, owner_id):
+    """Снимает удержание, если оно принадлежит владельцу"""
+    cells = [cell_start for cell_start in slot_start_times() if cell_start <= start_time]
+    if not cells:
+        return
+    current = cache.get(_hold_key(master_id, date, cells[-1]))
+    if current is None or current['owner'] != owner_id:
+        return
+    keys = [
+        _hold_key(master_id, date, cell_start)
+        for cell_start in _covered_starts(date, current['start'], current['end'])
+    ]
+    # Ячейки могли истечь или перейти к другому владельцу, удаляем только свои
+    found = cache.get_many(keys)
+    cache.delete_many([
+        key for key, value in found.items()
+        if value['owner'] == owner_id and value['start'] == current['start']
+    ])
+
+
+def _checkout_key(owner_id):
+    return f'bookings:checkout-hold:{owner_id}'
+
+
+def hold_checkout_slot(owner_id, master_id, date, start_time, end_time, seconds):
+    """
+    Удерживает время, выбранное клиентом в форме записи. У клиента одно
+    такое удержание: выбор другого времени освобождает предыдущее.
+    """
+    previous = cache.get(_checkout_key(owner_id))
+    if previous is not None and previous != (master_id, date, start_time):
+        release_hold(*previous, owner_id)
+    if not hold_slot(master_id, date, start_time, end_time, owner_id, seconds):
+        return False
+    cache.set(_checkout_key(owner_id), (master_id, date, start_time), seconds)
+    return True
+
+
+def release_checkout_hold(owner_id):
+    """Снимает удержание клиента после записи"""
+    previous = cache.get(_checkout_key(owner_id))
+    if previous is not None:
+        release_hold(*previous, owner_id)
+        cache.delete(_checkout_key(owner_id))
+    return previous
+
+
+def _held_intervals(holds, exclude_owner):
+    # Удержание на несколько ячеек встречается несколько раз
+    return sorted({
+        (hold['start'], hold['end'])
+        for cell_start, hold in holds
+        if hold['owner'] != exclude_owner
+    })
+
+
+def _grid_keys(master_id, date):
+    return {_hold_key(master_id, date, start_time): start_time for start_time in slot_start_times()}
+
+
+def get_held_intervals(master_id, date, exclude_owner=None):
+    """Интервалы (начало, конец), удержанные чужими владельцами"""
+    keys = _grid_keys(master_id, date)
+    found = cache.get_many(list(keys))
+    return _held_intervals(((keys[key], hold) for key, hold in found.items()), exclude_owner)
+
+
+async def aget_held_intervals(master_id, date, exclude_owner=None):
+    """Асинхронный вариант get_held_intervals"""
+    keys = _grid_keys(master_id, date)
+    found = await cache.aget_many(list(keys))
+    return _held_intervals(((keys[key], hold) for key, hold in found.items()), exclude_owner)
+
+
+def holds_fingerprint(intervals):
+    """Короткий отпечаток набора удержаний для ETag слотов"""
+    if not intervals:
+        return ''
+    raw = ';'.join(f"{start:%H%M}-{end:%H%M}" for start, end in intervals)
+    return md5(raw.encode(), usedforsecurity=False).hexdigest()[:8]
@@ -0,0 +1,121 @@
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from bookings.models import Appointment
+
+
+WEEKDAYS = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+
+
+class Command(BaseCommand):
+    help = (
+        'Разовые отчеты по записям в памяти (NumPy): занятость по дням недели и часам, '
+        'загрузка мастеров, повторные визиты и удержание клиентов. '
+        'С --benchmark замеряет расчеты на синтетических записях'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Период загрузки мастеров, дней до сегодня')
+        parser.add_argument('--months-ahead', type=int, default=6, help='Глубина удержания когорт, месяцев')
+        parser.add_argument('--no-archive', action='store_true', help='Не читать архив записей')
+        parser.add_argument('--benchmark', type=int, metavar='ЗАПИСЕЙ', help='Замер на синтетических записях, например 5000000')
+
+    def handle(self, *args, **options):
+        try:
+            from bookings import columnar
+        except ImportError:
+            raise CommandError('Для колоночной аналитики нужен NumPy: pip install -r requirements-dev.txt')
+
+        if options['benchmark']:
+            self.benchmark(columnar, options['benchmark'], options)
+            return
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        columns = columnar.load_columns(include_archive=not options['no_archive'])
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f'Загружено записей: {len(columns)} за {elapsed:.2f} с, '
+            f'массивы {columns.nbytes / 2**20:.1f} МБ, пик памяти {peak / 2**20:.1f} МБ'
+        )
+        if not len(columns):
+            return
+
+        self.write_heatmap(columnar.busy_hour_heatmap(columns, 9, 21), 9)
+
+        date_to = timezone.localdate()
+        date_from = date_to - timedelta(days=options['days'])
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Загрузка мастеров {date_from}–{date_to}'))
+        for master_id, (booked, scheduled, percent) in sorted(columnar.master_utilisation(columns, date_from, date_to).items()):
+            self.stdout.write(f'  мастер {master_id}: {booked // 60} ч из {scheduled // 60} ч ({percent}%)')
+
+        repeat, total, percent = columnar.repeat_client_rate(columns)
+        self.stdout.write(self.style.MIGRATE_HEADING('Повторные визиты'))
+        self.stdout.write(f'  {repeat} из {total} клиентов ({percent}%)')
+
+        months, sizes, retention = columnar.cohort_retention(columns, options['months_ahead'])
+        self.stdout.write(self.style.MIGRATE_HEADING('Удержание по когортам (доля вернувшихся через k месяцев)'))
+        for month, size, row in zip(months, sizes, retention):
+            cells = ' '.join(f'{value:5.0%}' for value in row[1:])
+            self.stdout.write(f'  {month:%Y-%m} ({size:>5}): {cells}')
+
+    def write_heatmap(self, heatmap, first_hour):
+        self.stdout.write(self.style.MIGRATE_HEADING('Занятые часы по дням недели'))
+        hours = range(first_hour, first_hour + heatmap.shape[1])
+        self.stdout.write('     ' + ''.join(f'{hour:>6}' for hour in hours))
+        for name, row in zip(WEEKDAYS, heatmap):
+            self.stdout.write(f'  {name} ' + ''.join(f'{minutes // 60:>6}' for minutes in row))
+
+    def benchmark(self, columnar, rows, options):
+        if rows < 1:
+            raise CommandError('--benchmark должен быть положительным')
+        started = time.perf_counter()
+        columns = columnar.synthetic_columns(rows)
+        self.stdout.write(
+            f'Синтетических записей: {len(columns)} ({columns.nbytes / 2**20:.0f} МБ) '
+            f'за {time.perf_counter() - started:.2f} с'
+        )
+
+        last_day = columnar.from_day_number(columns.day.max())
+        timings = [
+            ('тепловая карта 7×24', lambda: columnar.busy_hour_heatmap(columns)),
+            ('загрузка мастеров за 90 дней', lambda: columnar.master_utilisation(columns, last_day - timedelta(days=90), last_day)),
+            ('повторные визиты', lambda: columnar.repeat_client_rate(columns)),
+            ('удержание когорт', lambda: columnar.cohort_retention(columns, options['months_ahead'])),
+        ]
+        for title, function in timings:
+            started = time.perf_counter()
+            function()
+            self.stdout.write(f'  {title}: {(time.perf_counter() - started) * 1000:.0f} мс')
+
+        # Для сравнения: тот же расчет тепловой карты циклом Python по кортежам
+        sample = min(rows, 500_000)
+        tuples = list(zip(
+            columns.day[:sample].tolist(), columns.start[:sample].tolist(),
+            columns.end[:sample].tolist(), columns.status[:sample].tolist(),
+        ))
+        busy_codes = {columnar.STATUS_CODES[status] for status in columnar.OCCUPYING_STATUSES}
+        started = time.perf_counter()
+        heatmap = [[0] * 24 for _ in range(7)]
+        for day, start, end, status in tuples:
+            if status not in busy_codes:
+                continue
+            for hour in range(start // 60, (end - 1) // 60 + 1):
+                heatmap[(day + 3) % 7][hour] += min(end, (hour + 1) * 60) - max(start, hour * 60)
+        python_ms = (time.perf_counter() - started) * 1000 * rows / sample
+        self.stdout.write(f'  тепловая карта циклом Python (оценка на {rows} по {sample}): {python_ms:.0f} мс')
+
+        # Скорость загрузчика на реальной таблице записей
+        if Appointment.objects.exists():
+            started = time.perf_counter()
+            loaded = columnar.load_columns(include_archive=not options['no_archive'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'  загрузка из базы: {len(loaded)} записей за {elapsed:.2f} с '
+                f'({len(loaded) / elapsed:,.0f} записей/с)'
+            )
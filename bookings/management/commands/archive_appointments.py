@@ -0,0 +1,114 @@
+import time as time_module
+from datetime import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+from bookings.archive import archive_appointments, get_archivable_appointments, get_archive_cutoff
+from bookings.models import Appointment
+
+
+class Command(BaseCommand):
+    help = 'Переносит завершенные и отмененные записи старше N месяцев в архив'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=getattr(settings, 'BOOKING_ARCHIVE_MONTHS', 12),
+            help='Архивировать записи старше указанного количества месяцев',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'BOOKING_ARCHIVE_BATCH_SIZE', 500),
+            help='Количество записей, переносимых за одну транзакцию',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать записи, ничего не перенося',
+        )
+        parser.add_argument(
+            '--benchmark',
+            action='store_true',
+            help='Замерить время типичных запросов к рабочей таблице до и после архивации',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Количество повторов каждого запроса при замере',
+        )
+
+    def handle(self, *args, **options):
+        if options['months'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--months и --batch-size должны быть положительными')
+
+        cutoff = get_archive_cutoff(options['months'])
+        self.stdout.write(f'Архивируются записи до {cutoff:%d.%m.%Y}')
+
+        if options['benchmark']:
+            # Замеряем на одном и том же клиенте и мастере до и после переноса
+            busiest = Appointment.objects.values('client_id', 'master_id').annotate(
+                total=Count('pk')
+            ).order_by('-total').first()
+            if not busiest:
+                raise CommandError('Нет записей для замера')
+            before = self.benchmark(busiest, options['repeat'])
+
+        if options['dry_run']:
+            count = get_archivable_appointments(cutoff).count()
+            self.stdout.write(f'Будет перенесено записей: {count} (пробный запуск)')
+            return
+
+        started = time_module.monotonic()
+        count = archive_appointments(cutoff, batch_size=options['batch_size'])
+        elapsed = time_module.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Перенесено в архив: {count} записей за {elapsed:.2f} с')
+        )
+
+        if options['benchmark']:
+            after = self.benchmark(busiest, options['repeat'])
+            self.stdout.write('Запрос: до / после, мс')
+            for name in before:
+                self.stdout.write(f'  {name}: {before[name]:.3f} / {after[name]:.3f}')
+
+    def benchmark(self, busiest, repeat):
+        """Среднее время горячих запросов к Appointment в миллисекундах"""
+        today = timezone.localdate()
+
+        def client_list():
+            appointments = Appointment.objects.filter(client_id=busiest['client_id'])
+            list(appointments[:10])
+            appointments.count()
+
+        def overlap_check():
+            Appointment.objects.filter(
+                master_id=busiest['master_id'],
+                appointment_date=today,
+                status__in=['pending', 'confirmed'],
+                start_time__lt=time(12, 0),
+                end_time__gt=time(11, 0),
+            ).exists()
+
+        def admin_filter():
+            appointments = Appointment.objects.filter(status='completed')
+            list(appointments.select_related('client', 'master', 'service')[:20])
+            appointments.count()
+
+        queries = {
+            'Список записей клиента': client_list,
+            'Проверка пересечения': overlap_check,
+            'Фильтр админки по статусу': admin_filter,
+        }
+
+        results = {}
+        for name, query in queries.items():
+            started = time_module.perf_counter()
+            for _ in range(repeat):
+                query()
+            results[name] = (time_module.perf_counter() - started) * 1000 / repeat
+        return results
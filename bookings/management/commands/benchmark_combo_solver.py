@@ -0,0 +1,79 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from bookings.combo import MAX_COMBO_SERVICES, solve_combo, subtract_intervals, to_minutes
+from bookings.slots import CLOSING_HOUR, OPENING_HOUR, SLOT_MINUTES, slot_start_times
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет время подбора комплексной записи на синтетическом дне: '
+        'до 5 услуг подряд и до 30 мастеров, без обращения к базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=MAX_COMBO_SERVICES, help='Услуг в комплексе')
+        parser.add_argument('--masters', type=int, default=30, help='Количество мастеров')
+        parser.add_argument('--offer-rate', type=float, default=0.5, help='Доля мастеров, оказывающих каждую услугу')
+        parser.add_argument('--load', type=float, default=0.6, help='Доля занятого времени мастеров')
+        parser.add_argument('--runs', type=int, default=500, help='Количество случайных дней')
+        parser.add_argument('--seed', type=int, default=1, help='Начальное значение генератора случайных чисел')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['services'] <= MAX_COMBO_SERVICES:
+            raise CommandError(f'В комплексе может быть от 1 до {MAX_COMBO_SERVICES} услуг')
+        if options['masters'] < 1 or options['runs'] < 1:
+            raise CommandError('Нужен хотя бы один мастер и один прогон')
+        if not 0 <= options['load'] < 1 or not 0 < options['offer_rate'] <= 1:
+            raise CommandError('--load должен быть в [0, 1), --offer-rate в (0, 1]')
+
+        rng = random.Random(options['seed'])
+        candidates = [to_minutes(start_time) for start_time in slot_start_times()]
+        timings = []
+        found = 0
+        switching = 0
+        for _ in range(options['runs']):
+            parts, free_intervals = self.generate_day(rng, options)
+            started = time.perf_counter()
+            plan = solve_combo(parts, free_intervals, candidates)
+            timings.append((time.perf_counter() - started) * 1000)
+            if plan is not None:
+                found += 1
+                switching += len({master_id for master_id, start, end in plan}) > 1
+
+        timings.sort()
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['services']} услуг, {options['masters']} мастеров, "
+            f"занятость {options['load']:.0%}, прогонов: {options['runs']}"
+        ))
+        self.stdout.write(
+            f"  план найден: {found} ({found / options['runs']:.0%}), "
+            f"из них у нескольких мастеров: {switching}\n"
+            f"  время подбора, мс: среднее {statistics.mean(timings):.3f}, "
+            f"p50 {timings[len(timings) // 2]:.3f}, "
+            f"p99 {timings[min(len(timings) - 1, int(len(timings) * 0.99))]:.3f}, "
+            f"максимум {timings[-1]:.3f}"
+        )
+
+    def generate_day(self, rng, options):
+        """Случайные длительности услуг по мастерам и свободные интервалы мастеров"""
+        master_ids = list(range(1, options['masters'] + 1))
+        parts = []
+        for _ in range(options['services']):
+            duration = rng.choice([30, 45, 60, 90, 120])
+            offered = [master_id for master_id in master_ids if rng.random() < options['offer_rate']]
+            # Как MasterService.get_final_duration: у мастера услуга может идти дольше или быстрее
+            parts.append({master_id: duration + rng.choice([-15, 0, 0, 15]) for master_id in offered or master_ids[:1]})
+
+        window = (OPENING_HOUR * 60, CLOSING_HOUR * 60)
+        cells = list(range(window[0], window[1], SLOT_MINUTES))
+        free_intervals = {}
+        for master_id in master_ids:
+            busy = []
+            for cell in cells:
+                if rng.random() < options['load']:
+                    busy.append((cell, cell + SLOT_MINUTES))
+            free_intervals[master_id] = subtract_intervals(window, busy)
+        return parts, free_intervals
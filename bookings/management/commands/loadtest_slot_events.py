@@ -0,0 +1,81 @@
+import asyncio
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from bookings.events import broker, slot_event_stream
+from core.benchmarks import percentile
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест рассылки изменений слотов: N подписчиков SSE в одном процессе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=1000, help='Количество подписчиков')
+        parser.add_argument('--channels', type=int, default=50, help='Количество пар мастер/дата')
+        parser.add_argument('--events', type=int, default=20, help='Событий на каждый канал')
+        parser.add_argument('--interval', type=float, default=0.01, help='Пауза между раундами публикации, с')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Максимальное время теста, с')
+
+    def handle(self, *args, **options):
+        if min(options['subscribers'], options['channels'], options['events']) < 1:
+            raise CommandError('--subscribers, --channels и --events должны быть положительными')
+        asyncio.run(self.run(**options))
+
+    async def run(self, subscribers, channels, events, interval, timeout, **options):
+        date = timezone.localdate()
+        sent_at = {}
+        latencies = []
+
+        async def subscriber(master_id):
+            stream = slot_event_stream(master_id, date, heartbeat=timeout, lifetime=timeout)
+            # Первый фрагмент (retry) отдается уже после регистрации в брокере
+            await stream.__anext__()
+            try:
+                for _ in range(events):
+                    chunk = await stream.__anext__()
+                    if not chunk.startswith(b'event:'):
+                        continue
+                    event = json.loads(chunk.split(b'data: ', 1)[1])
+                    latencies.append(time.monotonic() - sent_at[event['version']])
+            finally:
+                await stream.aclose()
+
+        started = time.monotonic()
+        tasks = [
+            asyncio.create_task(subscriber(index % channels + 1))
+            for index in range(subscribers)
+        ]
+        while broker.subscriber_count() < subscribers:
+            await asyncio.sleep(0.01)
+        connect_time = time.monotonic() - started
+        self.stdout.write(f'Подписчиков: {broker.subscriber_count()}, подключение за {connect_time:.2f} с')
+
+        publish_started = time.monotonic()
+        for round_number in range(events):
+            for master_id in range(1, channels + 1):
+                version = f'{round_number}-{master_id}'
+                sent_at[version] = time.monotonic()
+                # Публикация из отдельного потока, как из сигнала синхронного представления
+                await asyncio.to_thread(broker.publish, master_id, date, {'version': version})
+            await asyncio.sleep(interval)
+
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        elapsed = time.monotonic() - publish_started
+
+        expected = subscribers * events
+        latencies.sort()
+        self.stdout.write(f'Доставлено событий: {len(latencies)} из {expected} за {elapsed:.2f} с')
+        self.stdout.write(f'Пропускная способность: {len(latencies) / elapsed:.0f} доставок/с')
+        self.stdout.write(
+            f'Задержка доставки, мс: p50={percentile(latencies, 0.50) * 1000:.2f} '
+            f'p99={percentile(latencies, 0.99) * 1000:.2f} '
+            f'max={(latencies[-1] if latencies else 0) * 1000:.2f}'
+        )
+        if len(latencies) < expected:
+            raise CommandError('Часть событий не доставлена подписчикам')
+        self.stdout.write(self.style.SUCCESS('Все события доставлены'))
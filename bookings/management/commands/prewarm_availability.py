@@ -0,0 +1,60 @@
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from bookings.availability import prewarm_busy_intervals
+from bookings.forecast import forecast_master_days
+from masters.models import Master
+from services.models import Service
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогнозирует по истории записей самые востребованные пары (мастер, дата) '
+        'и заранее заполняет для них кэш занятости. Запускать по расписанию '
+        'до пиков спроса, например каждый час. Нужен общий кэш (Redis, Memcached): '
+        'кэш в памяти команды не виден процессам сервера'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Горизонт прогноза в днях (по умолчанию BOOKING_PREWARM_DAYS)')
+        parser.add_argument('--limit', type=int, help='Сколько пар прогревать (по умолчанию BOOKING_PREWARM_LIMIT)')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать прогноз, кэш не заполнять')
+
+    def handle(self, *args, **options):
+        # Кэш в памяти живет только в процессе команды: воркеры gunicorn
+        # его не увидят, а у каждого из них свои версии слотов
+        backend = caches['default']
+        if not options['dry_run'] and isinstance(backend, (LocMemCache, DummyCache)):
+            raise CommandError(
+                f'Кэш {type(backend).__name__} не общий для процессов сервера, прогрев бесполезен. '
+                'Задайте CACHE_BACKEND (Redis, Memcached) или запустите с --dry-run'
+            )
+
+        started = time.monotonic()
+        forecasts = forecast_master_days(days=options['days'], limit=options['limit'])
+        if not forecasts:
+            self.stdout.write('Истории записей недостаточно для прогноза')
+            return
+        self.print_forecast(forecasts)
+        if options['dry_run']:
+            return
+        warmed = prewarm_busy_intervals((forecast.master_id, forecast.date) for forecast in forecasts)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрето пар: {warmed} из {len(forecasts)} (остальные уже в кэше) за {elapsed:.2f} с'
+        ))
+
+    def print_forecast(self, forecasts):
+        masters = Master.objects.select_related('user').in_bulk({forecast.master_id for forecast in forecasts})
+        services = dict(Service.objects.filter(
+            pk__in={forecast.service_id for forecast in forecasts}
+        ).values_list('pk', 'name'))
+        for forecast in forecasts:
+            self.stdout.write(
+                f'{forecast.date} {masters[forecast.master_id].get_full_name():<30} '
+                f'ожидается {forecast.expected:>6.2f}  пик {forecast.peak_hour:02d}:00  '
+                f'{services.get(forecast.service_id, "—")}'
+            )
@@ -0,0 +1,44 @@
+from django.contrib.sites.models import Site
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from django.utils import timezone
+from bookings.models import WaitlistEntry
+from bookings.waitlist import expire_offers
+
+
+class Command(BaseCommand):
+    help = 'Лист ожидания: передает просроченные предложения дальше и рассылает письма о свободном времени'
+
+    def handle(self, *args, **options):
+        expired, reoffered = expire_offers()
+        self.stdout.write(f'Просрочено предложений: {expired}, передано следующим: {reoffered}')
+
+        offers = WaitlistEntry.objects.filter(
+            status='offered',
+            notified_at__isnull=True,
+            offer_expires_at__gt=timezone.now(),
+        ).select_related('client', 'service', 'offered_master__user')
+        link = f'https://{Site.objects.get_current().domain}{reverse("bookings:waitlist")}'
+
+        sent = 0
+        for entry in offers:
+            if entry.client.email:
+                send_mail(
+                    'Освободилось время для записи',
+                    (
+                        f'Здравствуйте!\n\n'
+                        f'Освободилось время на услугу «{entry.service.name}»: '
+                        f'{entry.offered_date:%d.%m.%Y} в {entry.offered_start_time:%H:%M}, '
+                        f'мастер {entry.offered_master}.\n'
+                        f'Мы удерживаем его за вами до '
+                        f'{timezone.localtime(entry.offer_expires_at):%H:%M}. Записаться: {link}\n'
+                    ),
+                    None,
+                    [entry.client.email],
+                )
+                sent += 1
+            # Без email клиент увидит предложение в листе ожидания на сайте
+            WaitlistEntry.objects.filter(pk=entry.pk).update(notified_at=timezone.now())
+
+        self.stdout.write(self.style.SUCCESS(f'Отправлено уведомлений: {sent}'))
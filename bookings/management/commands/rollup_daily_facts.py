@@ -0,0 +1,60 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from bookings.analytics import days_to_roll_up, rollup_days
+from bookings.models import Appointment, AppointmentArchive
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Неверная дата "{value}", ожидается ГГГГ-ММ-ДД')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сворачивает закрытые дни в витрину отчетов (DailyServiceFact, DailyMasterFact). '
+        'Без параметров обрабатывает только дни, которых в витрине нет: '
+        'вчерашний и дни, итоги которых сброшены после изменения записей. '
+        'Запускать по расписанию раз в сутки, после sweep_appointments'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Начало периода ГГГГ-ММ-ДД (по умолчанию дата первой записи)')
+        parser.add_argument('--until', help='Конец периода ГГГГ-ММ-ДД (по умолчанию вчера)')
+        parser.add_argument('--rebuild', action='store_true', help='Пересчитать все дни периода, а не только недостающие')
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        until = min(parse_date(options['until']), yesterday) if options['until'] else yesterday
+        if options['since']:
+            since = parse_date(options['since'])
+        else:
+            firsts = [
+                model.objects.aggregate(first=Min('appointment_date'))['first']
+                for model in (Appointment, AppointmentArchive)
+            ]
+            firsts = [first for first in firsts if first]
+            if not firsts:
+                self.stdout.write('Записей нет, сворачивать нечего')
+                return
+            since = min(firsts)
+
+        if options['rebuild']:
+            days = [since + timedelta(days=offset) for offset in range(max((until - since).days + 1, 0))]
+        else:
+            days = days_to_roll_up(since, until)
+        if not days:
+            self.stdout.write(f'Витрина за {since}–{until} актуальна')
+            return
+
+        started = time.monotonic()
+        rows = rollup_days(days)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Свернуто дней: {len(days)} ({days[0]}–{days[-1]}), строк итогов: {rows} за {elapsed:.2f} с'
+        ))
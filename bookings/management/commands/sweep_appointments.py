@@ -0,0 +1,130 @@
+import time as time_module
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from bookings.analytics import invalidate_daily_facts
+from bookings.calendar import invalidate_feeds
+from bookings.models import Appointment
+from bookings.summary import invalidate_client_summary
+
+
+DEFAULT_SWEEP_RULES = {
+    'confirmed': 'completed',
+    'pending': 'no_show',
+}
+
+
+class Command(BaseCommand):
+    help = 'Закрывает прошедшие записи: переводит их в "Завершено" или "Не явился" пакетами'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-minutes',
+            type=int,
+            default=getattr(settings, 'BOOKING_SWEEP_GRACE_MINUTES', 60),
+            help='Сколько минут после окончания записи ждать перед закрытием',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'BOOKING_SWEEP_BATCH_SIZE', 500),
+            help='Количество записей, обновляемых за одну транзакцию',
+        )
+        parser.add_argument(
+            '--rule',
+            action='append',
+            default=[],
+            metavar='ИЗ:В',
+            help='Правило перевода статуса, например confirmed:completed (можно указать несколько раз)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать записи, ничего не изменяя',
+        )
+
+    def handle(self, *args, **options):
+        rules = self.get_rules(options['rule'])
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным')
+
+        cutoff = timezone.localtime() - timedelta(minutes=options['grace_minutes'])
+        past = Q(appointment_date__lt=cutoff.date()) | Q(
+            appointment_date=cutoff.date(),
+            end_time__lte=cutoff.time(),
+        )
+
+        started = time_module.monotonic()
+        total = 0
+        for source, target in rules.items():
+            queryset = Appointment.objects.filter(past, status=source)
+            if options['dry_run']:
+                count = queryset.count()
+                self.stdout.write(f'{source} -> {target}: {count} (пробный запуск)')
+            else:
+                count = self.sweep(queryset, source, target, batch_size)
+                self.stdout.write(f'{source} -> {target}: {count}')
+            total += count
+
+        elapsed = time_module.monotonic() - started
+        rate = total / elapsed if elapsed > 0 else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Обработано записей: {total} за {elapsed:.2f} с ({rate:.0f} записей/с)'
+            )
+        )
+
+    def get_rules(self, raw_rules):
+        """Собирает правила перевода статусов из настроек и аргументов"""
+        if not raw_rules:
+            rules = dict(getattr(settings, 'BOOKING_SWEEP_RULES', DEFAULT_SWEEP_RULES))
+        else:
+            rules = {}
+            for raw_rule in raw_rules:
+                source, sep, target = raw_rule.partition(':')
+                if not sep:
+                    raise CommandError(f'Неверное правило "{raw_rule}", ожидается формат ИЗ:В')
+                rules[source.strip()] = target.strip()
+
+        statuses = {code for code, label in Appointment.STATUS_CHOICES}
+        for source, target in rules.items():
+            if source not in statuses or target not in statuses:
+                raise CommandError(f'Неизвестный статус в правиле {source}:{target}')
+            if source not in ('pending', 'confirmed'):
+                raise CommandError(f'Закрывать можно только активные записи, а не "{source}"')
+            if source == target:
+                raise CommandError(f'Правило {source}:{target} не меняет статус')
+        return rules
+
+    def sweep(self, queryset, source, target, batch_size):
+        """Переводит записи пакетами, чтобы не держать длинную блокировку"""
+        updated = 0
+        last_pk = 0
+        while True:
+            # Страницы по pk: пакет не выбирается повторно, даже если его строки не изменились
+            rows = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'client_id', 'master_id', 'appointment_date')[:batch_size]
+            )
+            if not rows:
+                break
+            batch = [pk for pk, client_id, master_id, appointment_date in rows]
+            last_pk = batch[-1]
+            with transaction.atomic():
+                updated += Appointment.objects.filter(pk__in=batch, status=source).update(
+                    status=target,
+                    updated_at=timezone.now(),
+                )
+            # update() не отправляет сигналы, поэтому кэши клиентов и мастеров сбрасываем явно
+            invalidate_client_summary(*(client_id for pk, client_id, master_id, appointment_date in rows))
+            invalidate_feeds(
+                master_ids=[master_id for pk, client_id, master_id, appointment_date in rows],
+                client_ids=[client_id for pk, client_id, master_id, appointment_date in rows],
+            )
+            invalidate_daily_facts(*{appointment_date for pk, client_id, master_id, appointment_date in rows})
+        return updated
@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.crypto import md5
+
+SOURCE_TABLE = 'bookings_masterservice'
+TARGET_TABLE = 'masters_masterservice'
+TARGET_INDEX = 'masterservice_service_idx'
+COLUMNS = 'master_id, service_id, price_modifier, duration_modifier, is_active'
+
+
+def normalize(row):
+    """Строка без различий представления между СУБД (Decimal, bool)"""
+    master_id, service_id, price_modifier, duration_modifier, is_active = row
+    return (
+        master_id,
+        service_id,
+        Decimal(str(price_modifier)).quantize(Decimal('0.01')),
+        int(duration_modifier),
+        bool(is_active),
+    )
+
+
+def checksum(rows):
+    raw = '\n'.join('|'.join(map(str, row)) for row in sorted(rows))
+    return md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет перенос bookings.MasterService в masters.MasterService: '
+        'сравнивает количество строк и контрольные суммы обеих таблиц'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--accept-conflicts', action='store_true',
+            help='Не считать ошибкой пары с разными условиями (остается строка masters)',
+        )
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+            if TARGET_TABLE not in tables:
+                raise CommandError(f'Нет таблицы {TARGET_TABLE}, выполните migrate')
+            cursor.execute(f'SELECT {COLUMNS} FROM {TARGET_TABLE}')
+            target_rows = [normalize(row) for row in cursor.fetchall()]
+            constraints = connection.introspection.get_constraints(cursor, TARGET_TABLE)
+
+            if TARGET_INDEX not in constraints:
+                self.stdout.write(self.style.WARNING(f'Индекс {TARGET_INDEX} не найден'))
+
+            if SOURCE_TABLE not in tables:
+                # Таблица-дубликат уже удалена: печатаем сумму для сравнения между окружениями
+                self.stdout.write(
+                    f'{SOURCE_TABLE} уже удалена. {TARGET_TABLE}: строк {len(target_rows)}, '
+                    f'контрольная сумма {checksum(target_rows)}'
+                )
+                return
+            cursor.execute(f'SELECT {COLUMNS} FROM {SOURCE_TABLE}')
+            source_rows = [normalize(row) for row in cursor.fetchall()]
+
+        target = {row[:2]: row for row in target_rows}
+        source_keys = {row[:2] for row in source_rows}
+        # Строки target с парами из source: после переноса их столько же, сколько строк source
+        transferred = [row for row in target_rows if row[:2] in source_keys]
+        missing = [row for row in source_rows if row[:2] not in target]
+        conflicts = [row for row in source_rows if row[:2] in target and target[row[:2]] != row]
+
+        source_sum = checksum(source_rows)
+        transferred_sum = checksum(transferred)
+        self.stdout.write(
+            f'{SOURCE_TABLE}: строк {len(source_rows)}, контрольная сумма {source_sum}\n'
+            f'{TARGET_TABLE}: строк {len(target_rows)}, контрольная сумма {checksum(target_rows)}\n'
+            f'  из них пар {SOURCE_TABLE}: {len(transferred)}, контрольная сумма {transferred_sum}\n'
+            f'  не перенесены: {len(missing)}, расходятся (оставлена строка {TARGET_TABLE}): {len(conflicts)}'
+        )
+        for row in conflicts:
+            self.stdout.write(f'  мастер {row[0]}, услуга {row[1]}: {row[2:]} -> {target[row[:2]][2:]}')
+
+        errors = []
+        if len(source_keys) != len(source_rows) or len(target) != len(target_rows):
+            errors.append('в таблицах есть повторяющиеся пары (мастер, услуга)')
+        if missing or len(transferred) != len(source_rows):
+            errors.append(f'строк {SOURCE_TABLE} {len(source_rows)}, перенесено {len(transferred)}')
+        # При полном переносе суммы расходятся только из-за пар с разными условиями
+        if source_sum != transferred_sum and not (options['accept_conflicts'] and conflicts):
+            errors.append('контрольные суммы не совпадают')
+        if errors:
+            raise CommandError(
+                f"Перенос не проверен: {'; '.join(errors)}. "
+                'Выполните migrate bookings 0006_merge_masterservice и проверьте расхождения'
+            )
+        self.stdout.write(self.style.SUCCESS('Перенос проверен, можно выполнять migrate bookings'))
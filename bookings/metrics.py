@@ -0,0 +1,13 @@
+"""Счетчики записи на приём для /metrics (см. core/metrics.py)"""
+from prometheus_client import Counter
+
+SLOT_LOOKUPS = Counter(
+    'booking_slot_lookups_total', 'Запросы свободного времени: not_modified — ответ 304 по ETag, computed — расчет',
+    ['result'],
+)
+BOOKING_CONFLICTS = Counter(
+    'booking_conflicts_total', 'Отказы в записи из-за занятого или удержанного времени',
+    ['source'],
+)
+BOOKINGS_CREATED = Counter('bookings_created_total', 'Созданные записи')
+CANCELLATIONS = Counter('booking_cancellations_total', 'Отмены активных записей')
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('services', '0001_initial'),
+        ('bookings', '0003_appointmentarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_from', models.DateField(verbose_name='С даты')),
+                ('date_to', models.DateField(verbose_name='По дату')),
+                ('status', models.CharField(choices=[('waiting', 'Ожидает'), ('offered', 'Предложено время'), ('booked', 'Записан'), ('cancelled', 'Отменено')], default='waiting', max_length=20, verbose_name='Статус')),
+                ('offered_date', models.DateField(blank=True, null=True, verbose_name='Предложенная дата')),
+                ('offered_start_time', models.TimeField(blank=True, null=True, verbose_name='Предложенное время')),
+                ('offer_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Предложение действует до')),
+                ('notified_at', models.DateTimeField(blank=True, null=True, verbose_name='Уведомление отправлено')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Заявка в листе ожидания',
+                'verbose_name_plural': 'Лист ожидания',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='appointment',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'confirmed'])), fields=('master', 'appointment_date', 'start_time'), name='appointment_active_slot_unique'),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL, verbose_name='Клиент'),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='master',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='masters.master', verbose_name='Мастер'),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='offered_master',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='masters.master', verbose_name='Предложенный мастер'),
+        ),
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='service',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='services.service', verbose_name='Услуга'),
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['service', 'status', 'date_from'], name='waitlist_service_date_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('masters', '0001_initial'),
+        ('services', '0001_initial'),
+        ('bookings', '0004_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(choices=[('weekly', 'Каждую неделю'), ('biweekly', 'Раз в две недели'), ('monthly', 'Каждый месяц')], max_length=20, verbose_name='Периодичность')),
+                ('occurrences', models.PositiveIntegerField(verbose_name='Количество повторений')),
+                ('start_date', models.DateField(verbose_name='Дата первой записи')),
+                ('start_time', models.TimeField(verbose_name='Время начала')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_series', to=settings.AUTH_USER_MODEL, verbose_name='Клиент')),
+                ('master', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_series', to='masters.master', verbose_name='Мастер')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_series', to='services.service', verbose_name='Услуга')),
+            ],
+            options={
+                'verbose_name': 'Серия записей',
+                'verbose_name_plural': 'Серии записей',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointments', to='bookings.appointmentseries', verbose_name='Серия'),
+        ),
+    ]
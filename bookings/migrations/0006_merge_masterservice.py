@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# Строк за один проход: чтение пачки, один запрос существующих пар и один bulk_create
+BATCH_SIZE = 500
+FIELDS = ('master_id', 'service_id', 'price_modifier', 'duration_modifier', 'is_active')
+
+
+def copy_rows(source, target):
+    """
+    Переносит пары (мастер, услуга), которых нет в target, пачками по pk.
+    Если пара есть в обеих таблицах, остается строка target: по ней уже
+    считаются длительности и цены.
+    """
+    last_pk = 0
+    while True:
+        batch = list(source.objects.filter(pk__gt=last_pk).order_by('pk').values('pk', *FIELDS)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1]['pk']
+        existing = set(
+            target.objects.filter(master_id__in={row['master_id'] for row in batch})
+            .values_list('master_id', 'service_id')
+        )
+        target.objects.bulk_create([
+            target(**{field: row[field] for field in FIELDS})
+            for row in batch
+            if (row['master_id'], row['service_id']) not in existing
+        ])
+
+
+def merge_into_masters(apps, schema_editor):
+    copy_rows(apps.get_model('bookings', 'MasterService'), apps.get_model('masters', 'MasterService'))
+
+
+def split_back(apps, schema_editor):
+    copy_rows(apps.get_model('masters', 'MasterService'), apps.get_model('bookings', 'MasterService'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_appointmentseries'),
+        ('masters', '0002_masterservice_service_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_into_masters, split_back),
+    ]
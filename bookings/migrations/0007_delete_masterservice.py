@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+# Удаляет дубликат bookings.MasterService. Перед удалением перенос можно
+# проверить: migrate bookings 0006, затем manage.py verify_masterservice_merge
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_merge_masterservice'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='MasterService',
+        ),
+    ]
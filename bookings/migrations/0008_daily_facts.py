@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0001_initial'),
+        ('masters', '0002_masterservice_service_idx'),
+        ('bookings', '0007_delete_masterservice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyServiceFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('appointments_count', models.IntegerField(default=0, verbose_name='Записей (без отмененных)')),
+                ('completed_count', models.IntegerField(default=0, verbose_name='Завершено')),
+                ('cancelled_count', models.IntegerField(default=0, verbose_name='Отменено')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выручка')),
+                ('booked_minutes', models.IntegerField(default=0, verbose_name='Занято минут')),
+                ('master', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_service_facts', to='masters.master', verbose_name='Мастер')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_service_facts', to='services.service', verbose_name='Услуга')),
+            ],
+            options={
+                'verbose_name': 'Итоги дня по услуге',
+                'verbose_name_plural': 'Итоги дней по услугам',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyMasterFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('scheduled_minutes', models.IntegerField(default=0, verbose_name='Рабочих минут')),
+                ('master', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_master_facts', to='masters.master', verbose_name='Мастер')),
+            ],
+            options={
+                'verbose_name': 'Итоги дня по мастеру',
+                'verbose_name_plural': 'Итоги дней по мастерам',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyservicefact',
+            constraint=models.UniqueConstraint(fields=('date', 'master', 'service'), name='daily_service_fact_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailymasterfact',
+            constraint=models.UniqueConstraint(fields=('date', 'master'), name='daily_master_fact_unique'),
+        ),
+    ]
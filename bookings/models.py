@@ -3,12 +3,15 @@ from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime
 from services.models import Service
 from masters.models import Master
+from .durations import get_end_time, get_service_terms
 
 class Appointment(models.Model):
     """Запись клиента на услугу"""
+    is_archived = False
+
     STATUS_CHOICES = [
         ('pending', _('Ожидает подтверждения')),
         ('confirmed', _('Подтверждено')),
@@ -25,6 +28,10 @@ class Appointment(models.Model):
     end_time = models.TimeField(verbose_name=_('Время окончания'))
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name=_('Статус'))
     notes = models.TextField(blank=True, verbose_name=_('Примечания'))
+    series = models.ForeignKey(
+        'AppointmentSeries', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='appointments', verbose_name=_('Серия')
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Дата создания'))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Дата обновления'))
     
@@ -32,11 +39,39 @@ class Appointment(models.Model):
         verbose_name = _('Запись')
         verbose_name_plural = _('Записи')
         ordering = ['-appointment_date', '-start_time']
-        unique_together = ['master', 'appointment_date', 'start_time']
+        constraints = [
+            # Отмененная запись не мешает снова занять то же время
+            models.UniqueConstraint(
+                fields=['master', 'appointment_date', 'start_time'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='appointment_active_slot_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'appointment_date'], name='appointment_status_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.client.get_full_name()} - {self.service.name} у {self.master} {self.appointment_date} {self.start_time}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем исходные мастера и дату, чтобы при переносе записи
+        # сбросить версию слотов и для старого дня
+        if 'master_id' in instance.__dict__ and 'appointment_date' in instance.__dict__:
+            instance._loaded_slot = (instance.master_id, instance.appointment_date)
+        # Исходный статус нужен, чтобы заметить отмену и предложить окно листу ожидания
+        if 'status' in instance.__dict__:
+            instance._loaded_status = instance.status
+        # Время окончания пересчитывается, только если изменилось то, от чего оно зависит
+        if all(name in instance.__dict__ for name in ('master_id', 'service_id', 'appointment_date', 'start_time')):
+            instance._loaded_terms = instance._end_time_terms()
+        return instance
+    
+    def _end_time_terms(self):
+        return (self.master_id, self.service_id, self.appointment_date, self.start_time)
+    
     def clean(self):
         """Валидация записи"""
         if self.appointment_date < timezone.now().date():
@@ -61,20 +96,17 @@ class Appointment(models.Model):
     
     def save(self, *args, **kwargs):
         """Автоматический расчет времени окончания"""
-        if not self.end_time and self.start_time and self.service:
-            # Получаем длительность услуги у конкретного мастера
-            try:
-                from masters.models import MasterService
-                master_service = MasterService.objects.get(master=self.master, service=self.service)
-                duration = master_service.get_final_duration()
-            except MasterService.DoesNotExist:
-                duration = self.service.duration_minutes
-            
-            start_datetime = datetime.combine(self.appointment_date, self.start_time)
-            end_datetime = start_datetime + timedelta(minutes=duration)
-            self.end_time = end_datetime.time()
+        terms_changed = getattr(self, '_loaded_terms', None) not in (None, self._end_time_terms())
+        if (not self.end_time or terms_changed) and self.start_time and self.service:
+            # Длительность услуги у конкретного мастера (карта условий из кэша)
+            self.end_time = get_end_time(self.master_id, self.service, self.appointment_date, self.start_time)
         
         super().save(*args, **kwargs)
+        self._loaded_terms = self._end_time_terms()
+    
+    def get_price(self):
+        """Цена услуги у мастера записи"""
+        return get_service_terms(self.master_id, self.service).price
     
     def get_duration(self):
         """Возвращает длительность записи в минутах"""
@@ -93,6 +125,37 @@ class Appointment(models.Model):
         }
         return status_classes.get(self.status, 'secondary')
 
+class AppointmentArchive(models.Model):
+    """Архивная (завершенная или отмененная) запись, вынесенная из рабочей таблицы"""
+    is_archived = True
+
+    original_id = models.BigIntegerField(unique=True, verbose_name=_('ID исходной записи'))
+    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_appointments', verbose_name=_('Клиент'))
+    master = models.ForeignKey(Master, on_delete=models.CASCADE, related_name='archived_appointments', verbose_name=_('Мастер'))
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='archived_appointments', verbose_name=_('Услуга'))
+    appointment_date = models.DateField(verbose_name=_('Дата записи'))
+    start_time = models.TimeField(verbose_name=_('Время начала'))
+    end_time = models.TimeField(verbose_name=_('Время окончания'))
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES, verbose_name=_('Статус'))
+    notes = models.TextField(blank=True, verbose_name=_('Примечания'))
+    created_at = models.DateTimeField(verbose_name=_('Дата создания'))
+    updated_at = models.DateTimeField(verbose_name=_('Дата обновления'))
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Дата архивации'))
+
+    class Meta:
+        verbose_name = _('Архивная запись')
+        verbose_name_plural = _('Архив записей')
+        ordering = ['-appointment_date', '-start_time']
+        indexes = [
+            models.Index(fields=['client', 'appointment_date'], name='archive_client_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client.get_full_name()} - {self.service.name} у {self.master} {self.appointment_date} {self.start_time} (архив)"
+
+    get_duration = Appointment.get_duration
+    get_status_display_class = Appointment.get_status_display_class
+
 class TimeSlot(models.Model):
     """Временные слоты для записи"""
     master = models.ForeignKey(Master, on_delete=models.CASCADE, related_name='time_slots', verbose_name=_('Мастер'))
@@ -121,34 +184,137 @@ class TimeSlot(models.Model):
             status__in=['pending', 'confirmed']
         ).exists()
 
-class MasterService(models.Model):
-    """Связь мастер-услуга для приложения bookings"""
-    master = models.ForeignKey(Master, on_delete=models.CASCADE, related_name='booking_masterservices', verbose_name=_('Мастер'))
-    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='booking_masterservices', verbose_name=_('Услуга'))
-    price_modifier = models.DecimalField(
-        max_digits=5, 
-        decimal_places=2, 
-        default=1.00, 
-        verbose_name=_('Модификатор цены')
+class AppointmentSeries(models.Model):
+    """Серия регулярных записей клиента на одну услугу к одному мастеру"""
+    FREQUENCY_CHOICES = [
+        ('weekly', _('Каждую неделю')),
+        ('biweekly', _('Раз в две недели')),
+        ('monthly', _('Каждый месяц')),
+    ]
+    
+    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='appointment_series', verbose_name=_('Клиент'))
+    master = models.ForeignKey(Master, on_delete=models.CASCADE, related_name='appointment_series', verbose_name=_('Мастер'))
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='appointment_series', verbose_name=_('Услуга'))
+    frequency = models.CharField(max_length=20, choices=FREQUENCY_CHOICES, verbose_name=_('Периодичность'))
+    occurrences = models.PositiveIntegerField(verbose_name=_('Количество повторений'))
+    start_date = models.DateField(verbose_name=_('Дата первой записи'))
+    start_time = models.TimeField(verbose_name=_('Время начала'))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Дата создания'))
+    
+    class Meta:
+        verbose_name = _('Серия записей')
+        verbose_name_plural = _('Серии записей')
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.client} - {self.service.name} ({self.get_frequency_display()}, {self.occurrences})"
+
+class WaitlistEntry(models.Model):
+    """Заявка клиента в лист ожидания на услугу в диапазоне дат"""
+    STATUS_CHOICES = [
+        ('waiting', _('Ожидает')),
+        ('offered', _('Предложено время')),
+        ('booked', _('Записан')),
+        ('cancelled', _('Отменено')),
+    ]
+    
+    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries', verbose_name=_('Клиент'))
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='waitlist_entries', verbose_name=_('Услуга'))
+    master = models.ForeignKey(
+        Master, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='waitlist_entries', verbose_name=_('Мастер')
     )
-    duration_modifier = models.IntegerField(
-        default=0, 
-        verbose_name=_('Модификатор длительности (минуты)')
+    date_from = models.DateField(verbose_name=_('С даты'))
+    date_to = models.DateField(verbose_name=_('По дату'))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting', verbose_name=_('Статус'))
+    offered_master = models.ForeignKey(
+        Master, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', verbose_name=_('Предложенный мастер')
     )
-    is_active = models.BooleanField(default=True, verbose_name=_('Активно'))
+    offered_date = models.DateField(null=True, blank=True, verbose_name=_('Предложенная дата'))
+    offered_start_time = models.TimeField(null=True, blank=True, verbose_name=_('Предложенное время'))
+    offer_expires_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Предложение действует до'))
+    notified_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Уведомление отправлено'))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Дата создания'))
     
     class Meta:
-        verbose_name = _('Услуга мастера')
-        verbose_name_plural = _('Услуги мастеров')
-        unique_together = ['master', 'service']
+        verbose_name = _('Заявка в листе ожидания')
+        verbose_name_plural = _('Лист ожидания')
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['service', 'status', 'date_from'], name='waitlist_service_date_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.master} - {self.service}"
+        return f"{self.client} - {self.service.name} ({self.date_from} - {self.date_to})"
     
-    def get_final_price(self):
-        """Возвращает итоговую цену услуги у мастера"""
-        return self.service.price * self.price_modifier
+    def has_active_offer(self):
+        """Предложенное время еще удерживается за клиентом"""
+        return self.status == 'offered' and self.offer_expires_at and self.offer_expires_at > timezone.now()
     
-    def get_final_duration(self):
-        """Возвращает итоговую длительность услуги у мастера"""
-        return self.service.duration_minutes + self.duration_modifier
+    def get_status_display_class(self):
+        """Возвращает CSS класс для статуса"""
+        status_classes = {
+            'waiting': 'warning',
+            'offered': 'info',
+            'booked': 'success',
+            'cancelled': 'secondary',
+        }
+        return status_classes.get(self.status, 'secondary')
+
+class DailyServiceFact(models.Model):
+    """Итоги закрытого дня по мастеру и услуге (витрина отчетов, см. analytics.py)"""
+    date = models.DateField(verbose_name=_('Дата'))
+    master = models.ForeignKey(Master, on_delete=models.CASCADE, related_name='daily_service_facts', verbose_name=_('Мастер'))
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='daily_service_facts', verbose_name=_('Услуга'))
+    appointments_count = models.IntegerField(default=0, verbose_name=_('Записей (без отмененных)'))
+    completed_count = models.IntegerField(default=0, verbose_name=_('Завершено'))
+    cancelled_count = models.IntegerField(default=0, verbose_name=_('Отменено'))
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name=_('Выручка'))
+    booked_minutes = models.IntegerField(default=0, verbose_name=_('Занято минут'))
+    
+    class Meta:
+        verbose_name = _('Итоги дня по услуге')
+        verbose_name_plural = _('Итоги дней по услугам')
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'master', 'service'], name='daily_service_fact_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.master} - {self.service}"
+
+class DailyMasterFact(models.Model):
+    """
+    Рабочие минуты мастера за закрытый день. Строка есть для каждого мастера
+    каждого свернутого дня, поэтому по этой таблице видно, какие дни уже
+    перенесены в витрину.
+    """
+    date = models.DateField(verbose_name=_('Дата'))
+    master = models.ForeignKey(Master, on_delete=models.CASCADE, related_name='daily_master_facts', verbose_name=_('Мастер'))
+    scheduled_minutes = models.IntegerField(default=0, verbose_name=_('Рабочих минут'))
+    
+    class Meta:
+        verbose_name = _('Итоги дня по мастеру')
+        verbose_name_plural = _('Итоги дней по мастерам')
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'master'], name='daily_master_fact_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.master}"
+
+
+def __getattr__(name):
+    # Совместимость: услуги мастеров раньше дублировались моделью
+    # bookings.MasterService, теперь остается только masters.MasterService
+    if name == 'MasterService':
+        import warnings
+        from masters.models import MasterService
+        warnings.warn(
+            'bookings.models.MasterService объединена с masters.models.MasterService, '
+            'импортируйте ее из masters.models',
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return MasterService
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
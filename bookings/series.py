@@ -0,0 +1,138 @@
+"""
+Серии регулярных записей.
+
+Все даты серии проверяются разом: один запрос к Appointment по списку дат
+находит пересечения с активными записями мастера, один запрос к
+MasterSchedule дает рабочие часы по дням недели. Свободные повторения
+создаются одним bulk_create, занятые возвращаются вызывающему вместе с
+причиной, а не отменяют всю серию. Если между проверкой и вставкой
+то же время заняла другая запись, уникальное ограничение отклоняет
+вставку, и даты проверяются заново.
+
+bulk_create не отправляет сигналы post_save, поэтому версии слотов,
+сводку клиента и календарные ленты серия обновляет сама.
+"""
+import calendar
+from datetime import timedelta
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from masters.models import MasterSchedule
+from .calendar import invalidate_feeds
+from .durations import get_end_time
+from .holds import get_held_intervals
+from .metrics import BOOKINGS_CREATED
+from .models import Appointment, AppointmentSeries
+from .signals import slots_changed
+from .summary import invalidate_client_summary
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+MAX_OCCURRENCES = 26
+# Сколько раз пересчитывать конфликты, если время заняли во время вставки
+INSERT_ATTEMPTS = 3
+
+
+def add_months(date, months):
+    """Та же дата через months месяцев; 31 января -> 28/29 февраля"""
+    month_index = date.month - 1 + months
+    year = date.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(date.day, calendar.monthrange(year, month)[1])
+    return date.replace(year=year, month=month, day=day)
+
+
+def series_dates(start_date, frequency, occurrences):
+    """Даты повторений серии"""
+    if frequency == 'monthly':
+        return [add_months(start_date, index) for index in range(occurrences)]
+    step = timedelta(weeks=2 if frequency == 'biweekly' else 1)
+    return [start_date + step * index for index in range(occurrences)]
+
+
+def find_conflicts(master, dates, start_time, end_time, client_id=None):
+    """Причины, по которым повторения нельзя создать: {дата: причина}"""
+    conflicts = {}
+
+    busy_dates = set(
+        Appointment.objects.filter(
+            master=master,
+            appointment_date__in=dates,
+            status__in=ACTIVE_STATUSES,
+            start_time__lt=end_time,
+            end_time__gt=start_time,
+        ).values_list('appointment_date', flat=True)
+    )
+
+    # Если расписание мастера не заполнено, рабочие часы не проверяем
+    schedule = {
+        day['day_of_week']: day
+        for day in MasterSchedule.objects.filter(master=master).values(
+            'day_of_week', 'start_time', 'end_time', 'is_working_day'
+        )
+    }
+
+    for date in dates:
+        if date in busy_dates:
+            conflicts[date] = 'Время занято'
+            continue
+        if schedule:
+            day = schedule.get(date.isoweekday())
+            if day is None or not day['is_working_day']:
+                conflicts[date] = 'Выходной день мастера'
+                continue
+            if start_time < day['start_time'] or end_time > day['end_time']:
+                conflicts[date] = 'Вне рабочих часов мастера'
+                continue
+        held = get_held_intervals(master.pk, date, exclude_owner=client_id)
+        if any(held_start < end_time and held_end > start_time for held_start, held_end in held):
+            conflicts[date] = 'Время временно удержано другим клиентом'
+    return conflicts
+
+
+def create_series(client, master, service, start_date, start_time, frequency, occurrences, notes=''):
+    """Создает серию и свободные повторения; возвращает (серия, записи, {дата: причина})"""
+    dates = series_dates(start_date, frequency, occurrences)
+    end_time = get_end_time(master.pk, service, start_date, start_time)
+
+    with transaction.atomic():
+        series = AppointmentSeries.objects.create(
+            client=client,
+            master=master,
+            service=service,
+            frequency=frequency,
+            occurrences=occurrences,
+            start_date=start_date,
+            start_time=start_time,
+        )
+        for attempt in range(INSERT_ATTEMPTS):
+            conflicts = find_conflicts(master, dates, start_time, end_time, client_id=client.pk)
+            try:
+                # Точку сохранения откатывает только неудачная вставка, не серию
+                with transaction.atomic():
+                    appointments = Appointment.objects.bulk_create([
+                        Appointment(
+                            client=client,
+                            master=master,
+                            service=service,
+                            appointment_date=date,
+                            start_time=start_time,
+                            end_time=end_time,
+                            notes=notes,
+                            series=series,
+                        )
+                        for date in dates
+                        if date not in conflicts
+                    ])
+                break
+            except IntegrityError:
+                # Одновременная запись заняла то же время после проверки
+                # (appointment_active_slot_unique): проверяем даты заново
+                if attempt == INSERT_ATTEMPTS - 1:
+                    raise
+        for appointment in appointments:
+            slots_changed(master.pk, appointment.appointment_date, start_time, end_time)
+        transaction.on_commit(partial(invalidate_client_summary, client.pk))
+        transaction.on_commit(partial(invalidate_feeds, [master.pk], [client.pk]))
+        transaction.on_commit(partial(BOOKINGS_CREATED.inc, len(appointments)))
+
+    return series, appointments, conflicts
@@ -0,0 +1,93 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from masters.models import MasterService
+from reviews.models import Review
+from services.models import Service
+from .analytics import invalidate_daily_facts
+from .calendar import invalidate_feeds
+from .durations import invalidate_service_terms
+from .events import broker
+from .metrics import BOOKINGS_CREATED, CANCELLATIONS
+from .models import Appointment
+from .slots import bump_slots_version
+from .summary import invalidate_client_summary
+from .waitlist import ACTIVE_STATUSES, offer_freed_slot
+
+
+def slots_changed(master_id, date, start_time=None, end_time=None):
+    """Новая версия слотов и уведомление открытых форм записи после коммита"""
+    transaction.on_commit(partial(_publish_slots_change, master_id, date, start_time, end_time))
+
+
+def _publish_slots_change(master_id, date, start_time, end_time):
+    version = bump_slots_version(master_id, date)
+    broker.publish(master_id, date, {
+        'master': master_id,
+        'date': date.isoformat(),
+        'version': version,
+        'start_time': start_time.strftime('%H:%M') if start_time else None,
+        'end_time': end_time.strftime('%H:%M') if end_time else None,
+    })
+
+
+def slot_freed(appointment):
+    """Предлагает освободившееся окно листу ожидания после коммита"""
+    transaction.on_commit(partial(
+        offer_freed_slot,
+        appointment.master_id,
+        appointment.service_id,
+        appointment.appointment_date,
+        appointment.start_time,
+        appointment.end_time,
+        exclude_client_id=appointment.client_id,
+    ))
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, created, **kwargs):
+    """Сообщает об изменении слотов для новой и прежней даты/мастера записи"""
+    if created:
+        transaction.on_commit(BOOKINGS_CREATED.inc)
+    slots_changed(instance.master_id, instance.appointment_date, instance.start_time, instance.end_time)
+    transaction.on_commit(partial(invalidate_client_summary, instance.client_id))
+    loaded_slot = getattr(instance, '_loaded_slot', None)
+    master_ids = [instance.master_id]
+    if loaded_slot and loaded_slot != (instance.master_id, instance.appointment_date):
+        slots_changed(*loaded_slot)
+        master_ids.append(loaded_slot[0])
+    transaction.on_commit(partial(invalidate_feeds, master_ids, [instance.client_id]))
+    transaction.on_commit(partial(invalidate_daily_facts, instance.appointment_date, loaded_slot and loaded_slot[1]))
+    if instance.status == 'cancelled' and getattr(instance, '_loaded_status', None) in ACTIVE_STATUSES:
+        transaction.on_commit(CANCELLATIONS.inc)
+        slot_freed(instance)
+    instance._loaded_status = instance.status
+    instance._loaded_slot = (instance.master_id, instance.appointment_date)
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    slots_changed(instance.master_id, instance.appointment_date, instance.start_time, instance.end_time)
+    transaction.on_commit(partial(invalidate_client_summary, instance.client_id))
+    transaction.on_commit(partial(invalidate_feeds, [instance.master_id], [instance.client_id]))
+    transaction.on_commit(partial(invalidate_daily_facts, instance.appointment_date))
+    if instance.status in ACTIVE_STATUSES:
+        slot_freed(instance)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    """Количество отзывов входит в сводку клиента"""
+    transaction.on_commit(partial(invalidate_client_summary, instance.client_id))
+
+
+@receiver(post_save, sender=MasterService)
+@receiver(post_delete, sender=MasterService)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def service_terms_changed(sender, instance, **kwargs):
+    """Длительность и цена услуг у мастеров входят в кэшируемую карту"""
+    transaction.on_commit(invalidate_service_terms)
@@ -0,0 +1,71 @@
+"""
+Версии расписания мастеров.
+
+Для каждой пары (мастер, дата) в кэше хранится версия, которая меняется
+при любом изменении записей этого мастера на эту дату. Версия входит в
+ETag ответа available_times, поэтому повторный запрос браузера с
+If-None-Match проверяется по кэшу без обращения к таблице Appointment.
+
+Каждая новая версия — уникальный токен, а не счетчик: после вытеснения
+ключа из кэша старый ETag не может случайно совпасть с новым. При
+нескольких процессах gunicorn CACHES должен указывать на общий кэш
+(Redis, Memcached), иначе процессы не увидят изменения друг друга.
+"""
+import uuid
+from datetime import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Время работы студии и шаг сетки слотов
+OPENING_HOUR = 9
+CLOSING_HOUR = 21
+SLOT_MINUTES = 30
+
+
+def slot_start_times():
+    """Все начала слотов рабочего дня по сетке"""
+    return [
+        time(hour, minute)
+        for hour in range(OPENING_HOUR, CLOSING_HOUR)
+        for minute in range(0, 60, SLOT_MINUTES)
+    ]
+
+
+def _version_key(master_id, date):
+    return f'bookings:slots-version:{master_id}:{date.isoformat()}'
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def _version_timeout():
+    return getattr(settings, 'BOOKING_SLOTS_VERSION_TIMEOUT', 60 * 60 * 24)
+
+
+def get_slots_version(master_id, date):
+    """Текущая версия слотов мастера на дату"""
+    key = _version_key(master_id, date)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), _version_timeout())
+        version = cache.get(key)
+    return version
+
+
+async def aget_slots_version(master_id, date):
+    """Асинхронный вариант get_slots_version для ASGI-представлений"""
+    key = _version_key(master_id, date)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _new_version(), _version_timeout())
+        version = await cache.aget(key)
+    return version
+
+
+def bump_slots_version(master_id, date):
+    """Помечает слоты мастера на дату как изменившиеся, возвращает новую версию"""
+    version = _new_version()
+    cache.set(_version_key(master_id, date), version, _version_timeout())
+    return version
@@ -0,0 +1,99 @@
+"""
+Сводка клиента для личного кабинета.
+
+Все показатели считаются одним SQL-запросом: коррелированные подзапросы
+с условными Count/Min/Max по записям, архиву и отзывам клиента. Результат
+кэшируется на пользователя; сигналы записей и отзывов удаляют его при
+изменениях. Ключ включает текущую дату, поэтому «предстоящие» записи
+пересчитываются в начале нового дня.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, Max, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from core.metrics import cache_access
+from reviews.models import Review
+from .models import Appointment, AppointmentArchive
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+
+def _summary_key(user_id, date):
+    return f'bookings:client-summary:{user_id}:{date.isoformat()}'
+
+
+def _client_aggregate(queryset, aggregate, output_field=None):
+    """Скалярный подзапрос: агрегат по строкам клиента из внешнего запроса"""
+    subquery = Subquery(
+        queryset.filter(client=OuterRef('pk'))
+        .order_by()
+        .values('client')
+        .annotate(value=aggregate)
+        .values('value'),
+        output_field=output_field,
+    )
+    if output_field is None:
+        # Count по пустой группе возвращает NULL, а не 0
+        return Coalesce(subquery, Value(0), output_field=IntegerField())
+    return subquery
+
+
+def _summary_query(user_id, today):
+    active = Q(status__in=ACTIVE_STATUSES)
+    upcoming = active & Q(appointment_date__gte=today)
+    cancelled = Q(status__in=('cancelled', 'no_show'))
+    appointments = Appointment.objects.all()
+    archived = AppointmentArchive.objects.all()
+    return User.objects.filter(pk=user_id).annotate(
+        upcoming_count=_client_aggregate(appointments, Count('pk', filter=upcoming)),
+        next_visit=_client_aggregate(
+            appointments,
+            Min('appointment_date', filter=upcoming),
+            output_field=Appointment._meta.get_field('appointment_date'),
+        ),
+        completed_count=_client_aggregate(appointments, Count('pk', filter=Q(status='completed'))),
+        archived_completed_count=_client_aggregate(archived, Count('pk', filter=Q(status='completed'))),
+        last_visit=_client_aggregate(
+            appointments,
+            Max('appointment_date', filter=Q(status='completed')),
+            output_field=Appointment._meta.get_field('appointment_date'),
+        ),
+        archived_last_visit=_client_aggregate(
+            archived,
+            Max('appointment_date', filter=Q(status='completed')),
+            output_field=Appointment._meta.get_field('appointment_date'),
+        ),
+        cancelled_count=_client_aggregate(appointments, Count('pk', filter=cancelled)),
+        archived_cancelled_count=_client_aggregate(archived, Count('pk', filter=cancelled)),
+        reviews_count=_client_aggregate(Review.objects.filter(is_active=True), Count('pk')),
+    ).values(
+        'upcoming_count', 'next_visit', 'completed_count', 'archived_completed_count',
+        'last_visit', 'archived_last_visit', 'cancelled_count', 'archived_cancelled_count', 'reviews_count',
+    )
+
+
+def get_client_summary(user):
+    """Сводка по записям и отзывам клиента (из кэша или одним запросом)"""
+    today = timezone.localdate()
+    key = _summary_key(user.pk, today)
+    summary = cache.get(key)
+    cache_access('client_summary', summary is not None)
+    if summary is None:
+        summary = _summary_query(user.pk, today).first() or {}
+        if summary:
+            # Старые визиты перенесены в архив (manage.py archive_appointments)
+            summary['visits_count'] = summary.pop('completed_count') + summary.pop('archived_completed_count')
+            summary['cancelled_count'] += summary.pop('archived_cancelled_count')
+            archived_last_visit = summary.pop('archived_last_visit')
+            if summary['last_visit'] is None:
+                summary['last_visit'] = archived_last_visit
+        cache.set(key, summary, settings.CLIENT_SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate_client_summary(*user_ids):
+    """Удаляет кэшированные сводки клиентов"""
+    today = timezone.localdate()
+    cache.delete_many([_summary_key(user_id, today) for user_id in set(user_ids) if user_id])
@@ -0,0 +1,783 @@
+import threading
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from masters.models import Master, MasterSchedule, MasterService
+from services.models import Category, Service
+from .analytics import GROUPINGS, PERIODS, build_report, days_to_roll_up, report_totals, rollup_days
+from .archive import archive_appointments
+from .calendar import get_cached_feed, get_feed_url, get_feed_version, make_feed_token, parse_feed_token
+from .combo import ComboUnavailable, book_combo, find_combo, plan_signature
+from .availability import get_busy_intervals
+from .durations import get_end_time
+from .forms import AppointmentForm
+from .holds import get_held_intervals, hold_checkout_slot, hold_slot, release_checkout_hold, release_hold
+from .models import Appointment, AppointmentArchive, DailyMasterFact, DailyServiceFact, WaitlistEntry
+from .series import create_series, find_conflicts
+from .slots import get_slots_version
+from .summary import get_client_summary
+from .views import _free_start_times
+
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def create_master(username='master', services=()):
+    user = User.objects.create(username=username, first_name='Анна')
+    master = Master.objects.create(user=user, specialization='Маникюр', experience_years=3, bio='')
+    for service in services:
+        MasterService.objects.create(master=master, service=service)
+    return master
+
+
+def create_service(name='Маникюр', duration=60, price=1000):
+    category, created = Category.objects.get_or_create(name='Ногти')
+    return Service.objects.create(name=name, price=price, duration_minutes=duration, category=category)
+
+
+class BookingTestCase(TestCase):
+    """Мастер с одной услугой и клиент; кэш чистый в каждом тесте"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.service = create_service()
+        cls.master = create_master(services=[cls.service])
+        cls.client_user = User.objects.create(username='client')
+
+    def setUp(self):
+        cache.clear()
+
+    def book(self, day, start, status='pending', master=None, client=None):
+        return Appointment.objects.create(
+            client=client or self.client_user,
+            master=master or self.master,
+            service=self.service,
+            appointment_date=day,
+            start_time=start,
+            status=status,
+        )
+
+
+class ClientSummaryTests(BookingTestCase):
+    def test_archiving_keeps_counts(self):
+        old = date.today() - timedelta(days=800)
+        self.book(old, time(10), status='completed')
+        self.book(old, time(12), status='cancelled')
+        self.book(old, time(14), status='no_show')
+        self.book(date.today() + timedelta(days=3), time(10))
+
+        before = get_client_summary(self.client_user)
+        self.assertEqual(before['visits_count'], 1)
+        self.assertEqual(before['cancelled_count'], 2)
+        self.assertEqual(before['upcoming_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            archived = archive_appointments(date.today() - timedelta(days=400))
+        self.assertEqual(archived, 3)
+        self.assertEqual(get_client_summary(self.client_user), before)
+
+
+class ArchiveTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.old = date.today() - timedelta(days=800)
+        for hour in range(9, 19):
+            self.book(self.old, time(hour), status='completed')
+            self.book(self.old - timedelta(days=1), time(hour), status='cancelled')
+
+    def test_queries_do_not_grow_with_rows(self):
+        # На пакет: выборка, точка сохранения, вставка в архив, DELETE, освобождение точки
+        with self.assertNumQueries(4 * 5 + 1), self.captureOnCommitCallbacks(execute=True):
+            archived = archive_appointments(date.today(), batch_size=5)
+        self.assertEqual(archived, 20)
+        self.assertFalse(Appointment.objects.exists())
+        self.assertEqual(AppointmentArchive.objects.count(), 20)
+
+    def test_skips_appointment_signals(self):
+        version = get_slots_version(self.master.pk, self.old)
+        with mock.patch('bookings.signals.broker.publish') as publish, \
+                mock.patch('bookings.signals.invalidate_daily_facts') as invalidate_facts, \
+                self.captureOnCommitCallbacks(execute=True):
+            archive_appointments(date.today())
+        publish.assert_not_called()
+        invalidate_facts.assert_not_called()
+        self.assertEqual(get_slots_version(self.master.pk, self.old), version)
+
+    def test_invalidates_calendar_feeds(self):
+        version = get_feed_version('client', self.client_user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_appointments(date.today())
+        self.assertNotEqual(get_feed_version('client', self.client_user.pk), version)
+
+
+class SweepAppointmentsTests(BookingTestCase):
+    def sweep(self, *args):
+        output = StringIO()
+        call_command('sweep_appointments', *args, stdout=output)
+        return output.getvalue()
+
+    def test_closes_past_appointments_in_batches(self):
+        past = date.today() - timedelta(days=2)
+        confirmed = [self.book(past, time(hour), status='confirmed') for hour in (10, 12, 14)]
+        pending = self.book(past, time(16))
+        upcoming = self.book(date.today() + timedelta(days=2), time(10), status='confirmed')
+
+        output = self.sweep('--batch-size', '2')
+
+        self.assertIn('confirmed -> completed: 3', output)
+        self.assertIn('pending -> no_show: 1', output)
+        for appointment in confirmed:
+            appointment.refresh_from_db()
+            self.assertEqual(appointment.status, 'completed')
+        pending.refresh_from_db()
+        upcoming.refresh_from_db()
+        self.assertEqual(pending.status, 'no_show')
+        self.assertEqual(upcoming.status, 'confirmed')
+
+    def test_dry_run_changes_nothing(self):
+        appointment = self.book(date.today() - timedelta(days=2), time(10), status='confirmed')
+        self.assertIn('confirmed -> completed: 1 (пробный запуск)', self.sweep('--dry-run'))
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'confirmed')
+
+    def test_rejects_invalid_rules(self):
+        for rule in ('confirmed:confirmed', 'cancelled:completed', 'confirmed:unknown', 'confirmed'):
+            with self.subTest(rule=rule), self.assertRaises(CommandError):
+                self.sweep('--rule', rule)
+
+
+class VerifyMasterServiceMergeTests(BookingTestCase):
+    """Проверка переноса на воссозданной таблице-дубликате bookings_masterservice"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.second_service = create_service('Педикюр')
+        MasterService.objects.create(master=cls.master, service=cls.second_service, price_modifier=Decimal('1.10'))
+
+    def setUp(self):
+        super().setUp()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE bookings_masterservice (id integer PRIMARY KEY, master_id integer, service_id integer, '
+                'price_modifier decimal, duration_modifier integer, is_active bool)'
+            )
+
+    def add_source_row(self, service, price_modifier='1.00', duration_modifier=0):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO bookings_masterservice (master_id, service_id, price_modifier, duration_modifier, is_active) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                [self.master.pk, service.pk, price_modifier, duration_modifier, True],
+            )
+
+    def verify(self, *args):
+        output = StringIO()
+        call_command('verify_masterservice_merge', *args, stdout=output)
+        return output.getvalue()
+
+    def test_transferred_rows(self):
+        self.add_source_row(self.service)
+        self.add_source_row(self.second_service, price_modifier='1.10')
+        self.assertIn('Перенос проверен', self.verify())
+
+    def test_missing_row(self):
+        self.add_source_row(self.service)
+        MasterService.objects.filter(service=self.service).delete()
+        with self.assertRaisesMessage(CommandError, 'перенесено 0'):
+            self.verify()
+
+    def test_conflicting_row(self):
+        self.add_source_row(self.service, duration_modifier=15)
+        with self.assertRaisesMessage(CommandError, 'контрольные суммы не совпадают'):
+            self.verify()
+        self.assertIn('Перенос проверен', self.verify('--accept-conflicts'))
+
+    def test_duplicate_source_rows(self):
+        self.add_source_row(self.service)
+        self.add_source_row(self.service)
+        with self.assertRaisesMessage(CommandError, 'повторяющиеся пары'):
+            self.verify()
+
+
+class SeriesTests(BookingTestCase):
+    def test_slot_taken_between_check_and_insert(self):
+        start = date.today() + timedelta(days=7)
+        other_client = User.objects.create(username='other')
+        calls = []
+
+        def racing_find_conflicts(*args, **kwargs):
+            # Первая проверка проходит до того, как другой клиент записался
+            calls.append(args)
+            if len(calls) == 1:
+                conflicts = find_conflicts(*args, **kwargs)
+                self.book(start + timedelta(weeks=1), time(10), client=other_client)
+                return conflicts
+            return find_conflicts(*args, **kwargs)
+
+        with mock.patch('bookings.series.find_conflicts', racing_find_conflicts):
+            series, appointments, conflicts = create_series(
+                self.client_user, self.master, self.service, start, time(10), 'weekly', 3,
+            )
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(conflicts, {start + timedelta(weeks=1): 'Время занято'})
+        self.assertEqual(
+            sorted(appointment.appointment_date for appointment in appointments),
+            [start, start + timedelta(weeks=2)],
+        )
+        self.assertEqual(series.appointments.count(), 2)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], STORAGES=TEST_STORAGES)
+class ComboBookingTests(BookingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.second_service = create_service('Педикюр')
+        MasterService.objects.create(master=cls.master, service=cls.second_service)
+        cls.second_master = create_master('second-master', services=[cls.second_service])
+
+    def setUp(self):
+        super().setUp()
+        self.day = date.today() + timedelta(days=7)
+        self.services = [self.service, self.second_service]
+
+    def confirm(self, plan):
+        self.client.force_login(self.client_user)
+        return self.client.post(reverse('bookings:combo_booking'), {
+            'appointment_date': self.day.isoformat(),
+            'service_1': self.service.pk,
+            'service_2': self.second_service.pk,
+            'plan': plan_signature(plan),
+            'confirm': '',
+        })
+
+    def test_confirms_unchanged_plan(self):
+        plan = find_combo(self.services, self.day)
+        self.confirm(plan)
+        self.assertEqual(Appointment.objects.filter(client=self.client_user).count(), 2)
+
+    def test_changed_later_part_is_not_booked(self):
+        plan = find_combo(self.services, self.day)
+        self.assertEqual([part[0] for part in plan], [self.master.pk, self.master.pk])
+        # Вторую услугу у первого мастера заняли: начало плана то же, мастер другой
+        self.book(self.day, plan[1][2], client=User.objects.create(username='other'))
+        new_plan = find_combo(self.services, self.day)
+        self.assertEqual(new_plan[0][2], plan[0][2])
+        self.assertEqual(new_plan[1][0], self.second_master.pk)
+
+        response = self.confirm(plan)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Appointment.objects.filter(client=self.client_user).exists())
+        self.assertEqual(response.context['plan_signature'], plan_signature(new_plan))
+
+    def test_recheck_respects_other_holds(self):
+        plan = find_combo(self.services, self.day, client_id=self.client_user.pk)
+        master_id, service, start_time, end_time = plan[1]
+        hold_slot(master_id, self.day, start_time, end_time, owner_id=self.client_user.pk + 100, seconds=60)
+        with self.assertRaises(ComboUnavailable):
+            book_combo(self.client_user, self.day, plan)
+        self.assertFalse(Appointment.objects.filter(client=self.client_user).exists())
+
+    def test_concurrent_booking_at_same_start(self):
+        plan = find_combo(self.services, self.day, client_id=self.client_user.pk)
+        start_time = plan[1][2]
+        other_client = User.objects.create(username='other')
+        rechecks = []
+
+        def racing_held_intervals(*args, **kwargs):
+            # Другой клиент записывается на начало второй услуги сразу после ее проверки
+            rechecks.append(args)
+            if len(rechecks) == 2:
+                self.book(self.day, start_time, client=other_client)
+            return []
+
+        def book_combo_racing(*args, **kwargs):
+            with mock.patch('bookings.combo.get_held_intervals', racing_held_intervals):
+                return book_combo(*args, **kwargs)
+
+        with mock.patch('bookings.views.book_combo', book_combo_racing):
+            response = self.confirm(plan)
+        self.assertEqual(len(rechecks), 2)
+        self.assertEqual(response.status_code, 200)
+        # Запись «другого клиента» в тесте сделана в той же точке сохранения
+        # и откатывается вместе с комплексом; важно, что ответ не 500
+        self.assertFalse(Appointment.objects.filter(client=self.client_user).exists())
+        self.assertContains(response, 'Время успели занять')
+
+    def test_recheck_ignores_own_hold(self):
+        plan = find_combo(self.services, self.day, client_id=self.client_user.pk)
+        master_id, service, start_time, end_time = plan[0]
+        hold_slot(master_id, self.day, start_time, end_time, owner_id=self.client_user.pk, seconds=60)
+        self.assertEqual(len(book_combo(self.client_user, self.day, plan)), 2)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class AvailableTimesTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.day = date.today() + timedelta(days=7)
+
+    def available_times(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse('bookings:available_times'), {
+            'master': self.master.pk,
+            'service': self.service.pk,
+            'date': self.day.isoformat(),
+        }, **headers)
+
+    def test_revalidation(self):
+        first = self.available_times()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.available_times(first['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(self.day, time(10))
+        self.assertEqual(self.available_times(first['ETag']).status_code, 200)
+
+    def test_duration_change_invalidates_etag(self):
+        self.book(self.day, time(12))
+        first = self.available_times()
+        self.assertIn('11:00', first.json()['times'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            terms = MasterService.objects.get(master=self.master, service=self.service)
+            terms.duration_modifier = 30
+            terms.save()
+
+        response = self.available_times(first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        # 90 минут с 11:00 пересекаются с записью в 12:00
+        self.assertNotIn('11:00', response.json()['times'])
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class HoldTimeViewTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.client_user)
+        self.day = date.today() + timedelta(days=7)
+
+    def hold(self, **data):
+        return self.client.post(reverse('bookings:hold_time'), {
+            'master': self.master.pk,
+            'service': self.service.pk,
+            'date': self.day.isoformat(),
+            'time': '10:00',
+            **data,
+        })
+
+    def test_holds_free_time(self):
+        response = self.hold()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_held_intervals(self.master.pk, self.day), [(time(10), time(11))])
+
+    def test_taken_time(self):
+        self.book(self.day, time(10, 30))
+        self.assertEqual(self.hold().status_code, 409)
+
+    def test_unknown_master(self):
+        self.assertEqual(self.hold(master=self.master.pk + 100).status_code, 400)
+        self.assertEqual(get_held_intervals(self.master.pk + 100, self.day), [])
+
+    def test_master_without_service(self):
+        other_service = create_service('Педикюр')
+        self.assertEqual(self.hold(service=other_service.pk).status_code, 400)
+        self.assertEqual(get_held_intervals(self.master.pk, self.day), [])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], STORAGES=TEST_STORAGES)
+class WaitlistTests(BookingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.first = User.objects.create(username='first', email='first@example.com')
+        cls.second = User.objects.create(username='second', email='second@example.com')
+
+    def setUp(self):
+        super().setUp()
+        self.day = date.today() + timedelta(days=7)
+        self.entries = [
+            WaitlistEntry.objects.create(
+                client=client, service=self.service, date_from=self.day, date_to=self.day,
+            )
+            for client in (self.first, self.second)
+        ]
+
+    def cancel(self, appointment):
+        appointment.status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+
+    def process_waitlist(self):
+        output = StringIO()
+        call_command('process_waitlist', stdout=output)
+        return output.getvalue()
+
+    def test_cancellation_offers_slot_to_first_in_queue(self):
+        self.cancel(self.book(self.day, time(10), status='confirmed'))
+
+        first, second = (WaitlistEntry.objects.get(pk=entry.pk) for entry in self.entries)
+        self.assertEqual(first.status, 'offered')
+        self.assertEqual((first.offered_master, first.offered_date), (self.master, self.day))
+        self.assertEqual(first.offered_start_time, time(10))
+        self.assertEqual(second.status, 'waiting')
+        # Окно удержано за первым клиентом и занято для всех остальных
+        self.assertEqual(get_held_intervals(self.master.pk, self.day, exclude_owner=self.first.pk), [])
+        self.assertEqual(get_held_intervals(self.master.pk, self.day), [(time(10), time(11))])
+
+    def test_offer_is_sent_once(self):
+        self.cancel(self.book(self.day, time(10), status='confirmed'))
+
+        self.assertIn('Отправлено уведомлений: 1', self.process_waitlist())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['first@example.com'])
+        self.assertIsNotNone(WaitlistEntry.objects.get(pk=self.entries[0].pk).notified_at)
+
+        self.assertIn('Отправлено уведомлений: 0', self.process_waitlist())
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_expired_offer_passes_to_next_client(self):
+        self.cancel(self.book(self.day, time(10), status='confirmed'))
+        WaitlistEntry.objects.filter(pk=self.entries[0].pk).update(offer_expires_at=timezone.now())
+        # Удержание истекает вместе с предложением
+        release_hold(self.master.pk, self.day, time(10), self.first.pk)
+
+        output = self.process_waitlist()
+
+        self.assertIn('Просрочено предложений: 1, передано следующим: 1', output)
+        first, second = (WaitlistEntry.objects.get(pk=entry.pk) for entry in self.entries)
+        self.assertEqual(first.status, 'waiting')
+        self.assertEqual(second.status, 'offered')
+        self.assertEqual([message.to for message in mail.outbox], [['second@example.com']])
+
+    def test_accepting_offer_books_held_time(self):
+        self.cancel(self.book(self.day, time(10), status='confirmed'))
+        self.client.force_login(self.first)
+
+        response = self.client.post(reverse('bookings:waitlist_accept', kwargs={'pk': self.entries[0].pk}))
+
+        appointment = Appointment.objects.get(client=self.first)
+        self.assertRedirects(response, reverse('bookings:appointment_detail', kwargs={'pk': appointment.pk}))
+        self.assertEqual(WaitlistEntry.objects.get(pk=self.entries[0].pk).status, 'booked')
+        self.assertEqual(get_held_intervals(self.master.pk, self.day), [])
+
+    def test_staff_moves_appointment_onto_owners_hold(self):
+        self.cancel(self.book(self.day, time(10), status='confirmed'))
+        appointment = self.book(self.day, time(15), client=self.first)
+        staff = User.objects.create(username='admin', is_staff=True)
+        self.client.force_login(staff)
+
+        response = self.client.post(
+            reverse('bookings:admin_appointment_edit', kwargs={'pk': appointment.pk}),
+            {
+                'service': self.service.pk,
+                'master': self.master.pk,
+                'appointment_date': self.day.isoformat(),
+                'start_time': '10:00',
+                'notes': '',
+            },
+        )
+
+        self.assertRedirects(response, reverse('bookings:admin_appointment_list'))
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.start_time, time(10))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class CalendarFeedTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.day = date.today() + timedelta(days=3)
+        self.book(self.day, time(10))
+
+    def feed(self, kind='client', owner=None, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(get_feed_url(kind, owner or self.client_user.pk), **headers)
+
+    def cached_feed(self):
+        version = get_feed_version('client', self.client_user.pk)
+        return get_cached_feed('client', self.client_user.pk, version)
+
+    def test_token(self):
+        token = make_feed_token('master', self.master.pk)
+        self.assertEqual(parse_feed_token(token), ('master', self.master.pk))
+        self.assertIsNone(parse_feed_token(token.replace('master', 'client')))
+        self.assertIsNone(parse_feed_token(f'{token}x'))
+
+        forged = reverse('bookings:calendar_feed', kwargs={'token': f'{token}x'})
+        self.assertEqual(self.client.get(forged).status_code, 404)
+
+    def test_streams_then_serves_cached_body(self):
+        first = self.feed()
+        self.assertTrue(first.streaming)
+        body = b''.join(first.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertEqual(self.cached_feed()[2], body)
+
+        second = self.feed()
+        self.assertFalse(second.streaming)
+        self.assertEqual(second.content.decode(), body)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_not_modified(self):
+        first = self.feed()
+        b''.join(first.streaming_content)
+        self.assertEqual(self.feed(etag=first['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(self.day, time(14))
+        response = self.feed(etag=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(b''.join(response.streaming_content).decode().count('BEGIN:VEVENT'), 2)
+
+    def test_change_while_streaming_is_not_cached(self):
+        response = self.feed()
+        chunks = iter(response.streaming_content)
+        next(chunks)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(self.day, time(14))
+        list(chunks)
+        self.assertIsNone(self.cached_feed())
+
+        fresh = self.feed()
+        self.assertTrue(fresh.streaming)
+        self.assertEqual(b''.join(fresh.streaming_content).decode().count('BEGIN:VEVENT'), 2)
+
+
+class AnalyticsTests(BookingTestCase):
+    """Отчет по витрине должен совпадать с отчетом, посчитанным по записям"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.pedicure = create_service(name='Педикюр', duration=90, price=2000)
+        cls.second_master = create_master(username='second', services=[cls.service, cls.pedicure])
+        MasterService.objects.filter(master=cls.second_master, service=cls.service).update(price_modifier=Decimal('1.20'))
+        for day_of_week in range(1, 6):
+            MasterSchedule.objects.create(
+                master=cls.second_master, day_of_week=day_of_week, start_time=time(10), end_time=time(18),
+            )
+
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+        # Период захватывает границы недель и месяцев, сегодня и будущие дни
+        self.date_from = self.today - timedelta(days=45)
+        self.date_to = self.today + timedelta(days=7)
+        statuses = ('completed', 'cancelled', 'no_show', 'completed', 'confirmed')
+        for offset in range(-44, 7, 3):
+            day = self.today + timedelta(days=offset)
+            status = statuses[offset % len(statuses)] if offset < 0 else 'pending'
+            self.book(day, time(10), status=status)
+            self.book_pedicure(day, time(12), status='completed' if offset < 0 else 'pending')
+            self.book(day, time(15), status=status, master=self.second_master)
+        archive_appointments(self.today - timedelta(days=30))
+
+    def book_pedicure(self, day, start, status):
+        return Appointment.objects.create(
+            client=self.client_user, master=self.second_master, service=self.pedicure,
+            appointment_date=day, start_time=start, status=status,
+        )
+
+    def live_report(self, group_by='master', period=None):
+        """Отчет только по записям: витрина удаляется внутри откатываемой транзакции"""
+        with transaction.atomic():
+            DailyServiceFact.objects.all().delete()
+            DailyMasterFact.objects.all().delete()
+            report = build_report(self.date_from, self.date_to, group_by, period)
+            transaction.set_rollback(True)
+        return report
+
+    def rollup(self):
+        return rollup_days(days_to_roll_up(self.date_from, self.date_to))
+
+    def test_facts_match_live_report(self):
+        self.assertTrue(AppointmentArchive.objects.exists())
+        live = {
+            (group_by, period): build_report(self.date_from, self.date_to, group_by, period)
+            for group_by in GROUPINGS for period in (None, *PERIODS)
+        }
+        self.assertTrue(self.rollup())
+        self.assertEqual(days_to_roll_up(self.date_from, self.date_to), [])
+
+        for (group_by, period), expected in live.items():
+            with self.subTest(group_by=group_by, period=period):
+                report = build_report(self.date_from, self.date_to, group_by, period)
+                self.assertEqual(report, expected)
+                self.assertEqual(report_totals(report), report_totals(expected))
+
+    def test_closed_period_reads_only_facts(self):
+        date_to = self.today - timedelta(days=1)
+        expected = build_report(self.date_from, date_to, 'service', 'week')
+        rollup_days(days_to_roll_up(self.date_from, date_to))
+
+        with CaptureQueriesContext(connection) as queries:
+            report = build_report(self.date_from, date_to, 'service', 'week')
+        self.assertEqual(report, expected)
+        self.assertFalse([query for query in queries if 'bookings_appointment' in query['sql']])
+
+    def test_save_invalidates_closed_day(self):
+        self.rollup()
+        appointment = Appointment.objects.filter(
+            appointment_date__lt=self.today, status='completed', master=self.master,
+        ).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.status = 'cancelled'
+            appointment.save()
+
+        self.assertFalse(DailyServiceFact.objects.filter(date=appointment.appointment_date).exists())
+        self.assertFalse(DailyMasterFact.objects.filter(date=appointment.appointment_date).exists())
+        self.assertEqual(days_to_roll_up(self.date_from, self.date_to), [appointment.appointment_date])
+        self.assertEqual(build_report(self.date_from, self.date_to), self.live_report())
+
+    def test_moved_appointment_invalidates_both_days(self):
+        self.rollup()
+        appointment = Appointment.objects.filter(appointment_date__lt=self.today, master=self.master).first()
+        old_day = appointment.appointment_date
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.appointment_date = old_day - timedelta(days=1)
+            appointment.save()
+
+        self.assertEqual(days_to_roll_up(self.date_from, self.date_to), [old_day - timedelta(days=1), old_day])
+        self.assertEqual(build_report(self.date_from, self.date_to, 'master', 'week'), self.live_report('master', 'week'))
+
+    def test_delete_invalidates_closed_day(self):
+        self.rollup()
+        appointment = Appointment.objects.filter(appointment_date__lt=self.today, status='completed').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+
+        self.assertEqual(days_to_roll_up(self.date_from, self.date_to), [appointment.appointment_date])
+        self.assertEqual(build_report(self.date_from, self.date_to, 'service'), self.live_report('service'))
+
+    def test_archiving_keeps_facts(self):
+        self.rollup()
+        facts = DailyServiceFact.objects.count()
+        expected = build_report(self.date_from, self.date_to, 'master', 'month')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            archived = archive_appointments(self.today - timedelta(days=1))
+        self.assertTrue(archived)
+        self.assertEqual(DailyServiceFact.objects.count(), facts)
+        self.assertEqual(days_to_roll_up(self.date_from, self.date_to), [])
+
+        report = build_report(self.date_from, self.date_to, 'master', 'month')
+        self.assertEqual(report, expected)
+        # Живой пересчет читает архив и дает тот же отчет
+        self.assertEqual(self.live_report('master', 'month'), expected)
+
+    def test_sweep_invalidates_closed_days(self):
+        self.rollup()
+        swept_days = sorted(set(
+            Appointment.objects.filter(appointment_date__lt=self.today, status__in=('pending', 'confirmed'))
+            .values_list('appointment_date', flat=True)
+        ))
+        self.assertTrue(swept_days)
+
+        call_command('sweep_appointments', stdout=StringIO())
+
+        self.assertEqual(days_to_roll_up(self.date_from, self.date_to), swept_days)
+        self.assertEqual(build_report(self.date_from, self.date_to, 'category', 'month'), self.live_report('category', 'month'))
+
+
+class SlotContentionTests(TransactionTestCase):
+    """Одновременный выбор одного времени несколькими клиентами на тестовой БД"""
+    CLIENTS = 8
+
+    def setUp(self):
+        cache.clear()
+        self.service = create_service()
+        self.master = create_master(services=[self.service])
+        self.users = [User.objects.create(username=f'client-{index}') for index in range(self.CLIENTS)]
+        self.day = date.today() + timedelta(days=7)
+
+    def run_clients(self, client):
+        """Выполняет client(user) для всех клиентов в отдельных потоках одновременно"""
+        started = threading.Barrier(len(self.users))
+
+        def run(user):
+            try:
+                started.wait()
+                return client(user)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(self.users)) as executor:
+            return list(executor.map(run, self.users))
+
+    def test_one_owner_per_hold(self):
+        results = self.run_clients(
+            lambda user: hold_checkout_slot(user.pk, self.master.pk, self.day, time(10), time(11), 60)
+        )
+        self.assertEqual(results.count(True), 1)
+
+    def book_first_free_time(self, use_holds):
+        """Каждый клиент выбирает ближайшее свободное время, затем все отправляют форму"""
+        chosen = threading.Barrier(len(self.users))
+        # SQLite выполняет запись по одной, отправки формы идут друг за другом
+        submit_lock = threading.Lock()
+
+        def client(user):
+            for attempt in range(len(self.users)):
+                busy = list(get_busy_intervals(self.master.pk, self.day))
+                busy += get_held_intervals(self.master.pk, self.day, exclude_owner=user.pk)
+                start_time = _free_start_times(self.day, self.service.duration_minutes, busy)[0]
+                if not use_holds:
+                    break
+                end_time = get_end_time(self.master.pk, self.service, self.day, start_time)
+                if hold_checkout_slot(user.pk, self.master.pk, self.day, start_time, end_time, 60):
+                    break
+            chosen.wait()
+            with submit_lock:
+                form = AppointmentForm({
+                    'service': self.service.pk,
+                    'master': self.master.pk,
+                    'appointment_date': self.day,
+                    'start_time': start_time,
+                }, client=user)
+                if not form.is_valid():
+                    return False
+                appointment = form.save(commit=False)
+                appointment.client = user
+                appointment.save()
+            release_checkout_hold(user.pk)
+            return True
+
+        return self.run_clients(client)
+
+    def assertNoOverlaps(self):
+        intervals = sorted(
+            Appointment.objects.filter(master=self.master, appointment_date=self.day)
+            .values_list('start_time', 'end_time')
+        )
+        for (start, end), (next_start, next_end) in zip(intervals, intervals[1:]):
+            self.assertLessEqual(end, next_start)
+
+    def test_without_holds_submissions_fail(self):
+        results = self.book_first_free_time(use_holds=False)
+        self.assertEqual(results.count(True), 1)
+        self.assertNoOverlaps()
+
+    def test_with_holds_no_submission_fails(self):
+        results = self.book_first_free_time(use_holds=True)
+        self.assertEqual(results.count(True), self.CLIENTS)
+        self.assertEqual(Appointment.objects.filter(master=self.master, appointment_date=self.day).count(), self.CLIENTS)
+        self.assertNoOverlaps()
@@ -6,12 +6,21 @@ app_name = 'bookings'
 urlpatterns = [
     path('', views.appointment_list, name='appointment_list'),
     path('create/', views.appointment_create, name='appointment_create'),
+    path('series/', views.appointment_series_create, name='appointment_series_create'),
+    path('combo/', views.combo_booking, name='combo_booking'),
     path('<int:pk>/', views.appointment_detail, name='appointment_detail'),
     path('<int:pk>/edit/', views.appointment_edit, name='appointment_edit'),
     path('<int:pk>/cancel/', views.appointment_cancel, name='appointment_cancel'),
     path('available-times/', views.available_times, name='available_times'),
+    path('slot-events/', views.slot_events, name='slot_events'),
+    path('hold/', views.hold_time, name='hold_time'),
+    path('waitlist/', views.waitlist, name='waitlist'),
+    path('waitlist/<int:pk>/accept/', views.waitlist_accept, name='waitlist_accept'),
+    path('waitlist/<int:pk>/cancel/', views.waitlist_cancel, name='waitlist_cancel'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
     
     # Административные маршруты
     path('admin/', views.admin_appointment_list, name='admin_appointment_list'),
     path('admin/<int:pk>/edit/', views.admin_appointment_edit, name='admin_appointment_edit'),
+    path('admin/analytics/', views.admin_analytics, name='admin_analytics'),
 ]
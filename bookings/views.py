@@ -1,21 +1,48 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q
 from django.utils import timezone
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.views.decorators.http import require_POST
 from datetime import datetime, timedelta
-from .models import Appointment, TimeSlot
-from .forms import AppointmentForm, AppointmentFilterForm
+from .models import Appointment, AppointmentArchive, TimeSlot, WaitlistEntry
+from .forms import (
+    AnalyticsReportForm, AppointmentForm, AppointmentFilterForm, AppointmentSeriesForm, ClientAppointmentFilterForm,
+    ComboBookingForm, WaitlistForm,
+)
+from .analytics import build_report, report_totals
+from .archive import ArchiveReadThrough
+from .availability import aget_busy_intervals, get_busy_intervals
+from .calendar import (
+    ICS_CONTENT_TYPE, get_cached_feed, get_feed_appointments, get_feed_validators,
+    get_feed_version, parse_feed_token, stream_feed,
+)
+from .combo import ComboUnavailable, book_combo, combo_not_before, find_combo, plan_signature
+from .durations import aget_duration, aget_service_terms_version, get_duration, get_end_time
+from .events import slot_event_stream
+from .holds import (
+    aget_held_intervals, get_held_intervals, hold_checkout_slot, holds_fingerprint,
+    release_checkout_hold, release_hold,
+)
+from .metrics import BOOKING_CONFLICTS, SLOT_LOOKUPS
+from .series import create_series
+from .signals import slots_changed
+from .slots import aget_slots_version, slot_start_times
 from services.models import Service
-from masters.models import Master
+from masters.models import Master, MasterService
 
 @login_required
 def appointment_create(request):
     """Создание новой записи"""
     if request.method == 'POST':
-        form = AppointmentForm(request.POST)
+        form = AppointmentForm(request.POST, client=request.user)
         if form.is_valid():
             appointment = form.save(commit=False)
             appointment.client = request.user
@@ -30,6 +57,7 @@ def appointment_create(request):
             
             # Сохраняем запись (end_time будет рассчитан автоматически в save())
             appointment.save()
+            release_checkout_hold(request.user.pk)
             messages.success(request, 'Запись успешно создана!')
             return redirect('bookings:appointment_detail', pk=appointment.pk)
     else:
@@ -48,18 +76,19 @@ def appointment_list(request):
     appointments = Appointment.objects.filter(client=request.user)
     
     # Фильтрация
-    filter_form = AppointmentFilterForm(request.GET)
+    filter_form = ClientAppointmentFilterForm(request.GET)
+    include_archive = False
     if filter_form.is_valid():
-        if filter_form.cleaned_data.get('status'):
-            appointments = appointments.filter(status=filter_form.cleaned_data['status'])
-        if filter_form.cleaned_data.get('date_from'):
-            appointments = appointments.filter(appointment_date__gte=filter_form.cleaned_data['date_from'])
-        if filter_form.cleaned_data.get('date_to'):
-            appointments = appointments.filter(appointment_date__lte=filter_form.cleaned_data['date_to'])
-        if filter_form.cleaned_data.get('master'):
-            appointments = appointments.filter(master=filter_form.cleaned_data['master'])
-        if filter_form.cleaned_data.get('service'):
-            appointments = appointments.filter(service=filter_form.cleaned_data['service'])
+        appointments = _filter_appointments(appointments, filter_form.cleaned_data)
+        include_archive = filter_form.cleaned_data.get('include_archive')
+    
+    # Старые записи читаются из архива только по запросу клиента
+    if include_archive:
+        archived = _filter_appointments(
+            AppointmentArchive.objects.filter(client=request.user),
+            filter_form.cleaned_data
+        )
+        appointments = ArchiveReadThrough(appointments, archived)
     
     # Пагинация
     paginator = Paginator(appointments, 10)
@@ -92,7 +121,7 @@ def appointment_edit(request, pk):
         return redirect('bookings:appointment_detail', pk=pk)
     
     if request.method == 'POST':
-        form = AppointmentForm(request.POST, instance=appointment)
+        form = AppointmentForm(request.POST, instance=appointment, client=request.user)
         if form.is_valid():
             form.save()
             messages.success(request, 'Запись успешно обновлена!')
@@ -126,29 +155,333 @@ def appointment_cancel(request, pk):
     }
     return render(request, 'bookings/appointment_cancel.html', context)
 
-def available_times(request):
-    """Получение доступных временных слотов"""
-    master_id = request.GET.get('master')
-    service_id = request.GET.get('service')
-    date = request.GET.get('date')
+@login_required
+def appointment_series_create(request):
+    """Серия регулярных записей одним действием"""
+    result = None
+    if request.method == 'POST':
+        form = AppointmentSeriesForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            series, appointments, conflicts = create_series(
+                request.user,
+                data['master'],
+                data['service'],
+                data['start_date'],
+                data['start_time'],
+                data['frequency'],
+                data['occurrences'],
+                data['notes'],
+            )
+            result = {
+                'series': series,
+                'appointments': appointments,
+                'conflicts': sorted(conflicts.items()),
+            }
+            if appointments:
+                messages.success(request, f'Создано записей: {len(appointments)} из {series.occurrences}')
+            else:
+                messages.error(request, 'Ни одну запись серии создать не удалось')
+    else:
+        form = AppointmentSeriesForm()
     
-    if not all([master_id, service_id, date]):
-        return JsonResponse({'times': []})
+    context = {
+        'form': form,
+        'result': result,
+    }
+    return render(request, 'bookings/appointment_series.html', context)
+
+@login_required
+def combo_booking(request):
+    """Комплексная запись: подбор ближайшего времени для услуг подряд и запись на все сразу"""
+    plan = None
+    if request.method == 'POST':
+        form = ComboBookingForm(request.POST)
+        if form.is_valid():
+            services = form.get_services()
+            appointment_date = form.cleaned_data['appointment_date']
+            plan = find_combo(
+                services,
+                appointment_date,
+                client_id=request.user.pk,
+                not_before=combo_not_before(appointment_date)
+            )
+            if plan is None:
+                messages.error(request, 'На эту дату нет свободного времени для всех услуг подряд')
+            elif 'confirm' in request.POST:
+                # Клиент подтверждал конкретный план (мастера и время каждой
+                # услуги): если он изменился, показываем новый план вместо записи
+                if request.POST.get('plan') != plan_signature(plan):
+                    messages.warning(request, 'Предложенное время успели занять, вот ближайшее свободное')
+                else:
+                    try:
+                        book_combo(request.user, appointment_date, plan, form.cleaned_data['notes'])
+                    except ComboUnavailable:
+                        BOOKING_CONFLICTS.labels('combo').inc()
+                        messages.error(request, 'Время успели занять, попробуйте подобрать снова')
+                        plan = None
+                    else:
+                        messages.success(request, f'Создано записей: {len(plan)}')
+                        return redirect('bookings:appointment_list')
+    else:
+        form = ComboBookingForm()
     
+    signature = None
+    if plan is not None:
+        signature = plan_signature(plan)
+        masters = Master.objects.select_related('user').in_bulk([master_id for master_id, *_ in plan])
+        plan = [
+            {'master': masters[master_id], 'service': service, 'start_time': start_time, 'end_time': end_time}
+            for master_id, service, start_time, end_time in plan
+        ]
+    
+    context = {
+        'form': form,
+        'plan': plan,
+        'plan_signature': signature,
+    }
+    return render(request, 'bookings/combo_booking.html', context)
+
+@login_required
+@require_POST
+def hold_time(request):
+    """Удерживает выбранное в форме время за клиентом, пока он заполняет форму"""
     try:
-        master = Master.objects.get(pk=master_id)
-        service = Service.objects.get(pk=service_id)
-        appointment_date = datetime.strptime(date, '%Y-%m-%d').date()
-    except (Master.DoesNotExist, Service.DoesNotExist, ValueError):
+        master_id = int(request.POST['master'])
+        # Удерживать можно только время активного мастера, оказывающего услугу
+        service = MasterService.objects.select_related('service').get(
+            master_id=master_id,
+            service_id=int(request.POST['service']),
+            is_active=True,
+            master__is_active=True,
+            service__is_active=True,
+        ).service
+        appointment_date = datetime.strptime(request.POST['date'], '%Y-%m-%d').date()
+        start_time = datetime.strptime(request.POST['time'], '%H:%M').time()
+    except (KeyError, ValueError, MasterService.DoesNotExist):
+        return JsonResponse({'held': False}, status=400)
+    # Удерживать можно только начала слотов сетки: по ней читаются удержания
+    if start_time not in slot_start_times():
+        return JsonResponse({'held': False}, status=400)
+    
+    end_time = get_end_time(master_id, service, appointment_date, start_time)
+    busy = Appointment.objects.filter(
+        master_id=master_id,
+        appointment_date=appointment_date,
+        status__in=['pending', 'confirmed'],
+        start_time__lt=end_time,
+        end_time__gt=start_time
+    ).exists()
+    seconds = settings.BOOKING_HOLD_SECONDS
+    if busy or not hold_checkout_slot(request.user.pk, master_id, appointment_date, start_time, end_time, seconds):
+        BOOKING_CONFLICTS.labels('hold').inc()
+        return JsonResponse({'held': False}, status=409)
+    
+    # Открытые формы других клиентов перезапросят слоты
+    slots_changed(master_id, appointment_date, start_time, end_time)
+    return JsonResponse({'held': True, 'expires_in': seconds})
+
+@login_required
+def waitlist(request):
+    """Лист ожидания клиента и запись в него"""
+    if request.method == 'POST':
+        form = WaitlistForm(request.POST)
+        if form.is_valid():
+            entry = form.save(commit=False)
+            entry.client = request.user
+            entry.save()
+            messages.success(request, 'Вы в листе ожидания. Мы сообщим, когда освободится время.')
+            return redirect('bookings:waitlist')
+    else:
+        form = WaitlistForm(initial=request.GET.dict())
+    
+    entries = WaitlistEntry.objects.filter(
+        client=request.user,
+        status__in=['waiting', 'offered']
+    ).select_related('service', 'master__user', 'offered_master__user')
+    
+    context = {
+        'form': form,
+        'entries': entries,
+    }
+    return render(request, 'bookings/waitlist.html', context)
+
+@login_required
+def waitlist_accept(request, pk):
+    """Запись на время, предложенное из листа ожидания"""
+    entry = get_object_or_404(WaitlistEntry, pk=pk, client=request.user)
+    if request.method != 'POST':
+        return redirect('bookings:waitlist')
+    
+    if not entry.has_active_offer():
+        messages.error(request, 'Предложение больше не действует')
+        return redirect('bookings:waitlist')
+    
+    form = AppointmentForm({
+        'service': entry.service_id,
+        'master': entry.offered_master_id,
+        'appointment_date': entry.offered_date,
+        'start_time': entry.offered_start_time,
+    }, client=request.user)
+    if not form.is_valid():
+        messages.error(request, 'Предложенное время уже занято')
+        return redirect('bookings:waitlist')
+    
+    appointment = form.save(commit=False)
+    appointment.client = request.user
+    appointment.save()
+    entry.status = 'booked'
+    entry.save(update_fields=['status'])
+    release_hold(entry.offered_master_id, entry.offered_date, entry.offered_start_time, request.user.pk)
+    messages.success(request, 'Запись успешно создана!')
+    return redirect('bookings:appointment_detail', pk=appointment.pk)
+
+@login_required
+def waitlist_cancel(request, pk):
+    """Выход из листа ожидания"""
+    entry = get_object_or_404(WaitlistEntry, pk=pk, client=request.user)
+    if request.method == 'POST' and entry.status in ['waiting', 'offered']:
+        if entry.status == 'offered':
+            release_hold(entry.offered_master_id, entry.offered_date, entry.offered_start_time, request.user.pk)
+        entry.status = 'cancelled'
+        entry.save(update_fields=['status'])
+        messages.success(request, 'Заявка удалена из листа ожидания')
+    return redirect('bookings:waitlist')
+
+def _available_times_params(request):
+    """Разбирает параметры запроса слотов, возвращает None при ошибке"""
+    try:
+        master_id = int(request.GET['master'])
+        service_id = int(request.GET['service'])
+        appointment_date = datetime.strptime(request.GET['date'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return None
+    return master_id, service_id, appointment_date
+
+def _slots_etag(version, terms_version, service_id, held_intervals=()):
+    """ETag слотов: версия расписания мастера на дату, версия условий мастеров, услуга и удержания"""
+    fingerprint = holds_fingerprint(held_intervals)
+    return quote_etag(f'{version}-{terms_version}-{service_id}' + (f'-{fingerprint}' if fingerprint else ''))
+
+async def _request_user_id(request):
+    """id пользователя в асинхронном представлении (сессия читается синхронно)"""
+    return await sync_to_async(lambda: request.user.pk)()
+
+async def available_times(request):
+    """Получение доступных временных слотов (асинхронно, под ASGI не занимает поток)"""
+    params = _available_times_params(request)
+    if params is None:
+        return JsonResponse({'times': []})
+    master_id, service_id, appointment_date = params
+    
+    # Повторный запрос с актуальным ETag отвечается по кэшу версий без
+    # обращения к записям. Версию читаем до расчета слотов: если запись
+    # появится во время расчета, клиент обновит данные при следующем запросе
+    version = await aget_slots_version(master_id, appointment_date)
+    # Длительность услуги у мастера могла измениться без изменения записей
+    terms_version = await aget_service_terms_version()
+    # Удержания истекают сами, без смены версии, поэтому входят в ETag.
+    # Свои удержания клиенту не мешают; сессию читаем, только если они есть
+    held_intervals = await aget_held_intervals(master_id, appointment_date)
+    if held_intervals:
+        held_intervals = await aget_held_intervals(
+            master_id, appointment_date, exclude_owner=await _request_user_id(request)
+        )
+    etag = _slots_etag(version, terms_version, service_id, held_intervals)
+    if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        SLOT_LOOKUPS.labels('not_modified').inc()
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    
+    service = await Service.objects.filter(pk=service_id).only('duration_minutes', 'price').afirst()
+    if service is None or not await Master.objects.filter(pk=master_id).aexists():
         return JsonResponse({'times': []})
     
     # Получаем доступные временные слоты
-    available_times_list = _get_available_times(master, service, appointment_date)
+    SLOT_LOOKUPS.labels('computed').inc()
+    # Занятость дня берется из кэша по той же версии, что и ETag
+    busy_intervals = await aget_busy_intervals(master_id, appointment_date, version)
+    busy_intervals = busy_intervals + held_intervals
+    duration = await aget_duration(master_id, service)
+    available_times_list = _free_start_times(appointment_date, duration, busy_intervals)
     
     # Преобразуем время в строки для JSON
-    times_str = [time.strftime('%H:%M') for time in available_times_list]
+    times_str = [slot.strftime('%H:%M') for slot in available_times_list]
+    
+    response = JsonResponse({'times': times_str, 'version': version})
+    response['ETag'] = etag
+    # Браузер хранит ответ, но каждый раз перепроверяет его по ETag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+async def slot_events(request):
+    """Поток SSE с изменениями слотов мастера на дату (только под ASGI)"""
+    try:
+        master_id = int(request.GET['master'])
+        appointment_date = datetime.strptime(request.GET['date'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return HttpResponse(status=400)
+    
+    # Под WSGI бесконечный поток занял бы рабочий поток целиком;
+    # 204 сообщает EventSource, что переподключаться не нужно
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    response = StreamingHttpResponse(
+        slot_event_stream(master_id, appointment_date),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def calendar_feed(request, token):
+    """Лента iCalendar мастера или клиента по подписанной ссылке"""
+    feed = parse_feed_token(token)
+    if feed is None:
+        raise Http404
+    kind, owner_id = feed
     
-    return JsonResponse({'times': times_str})
+    appointments = get_feed_appointments(kind, owner_id)
+    version = get_feed_version(kind, owner_id)
+    cached = get_cached_feed(kind, owner_id, version)
+    if cached is not None:
+        etag, last_modified, body = cached
+    else:
+        etag, last_modified = get_feed_validators(kind, owner_id, appointments)
+    
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if cached is not None:
+            response = HttpResponse(body, content_type=ICS_CONTENT_TYPE)
+        else:
+            response = StreamingHttpResponse(
+                stream_feed(
+                    kind, owner_id, version, appointments, etag, last_modified, request.get_host()
+                ),
+                content_type=ICS_CONTENT_TYPE
+            )
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def _filter_appointments(appointments, cleaned_data):
+    """Применяет фильтры формы к записям (рабочим или архивным)"""
+    if cleaned_data.get('status'):
+        appointments = appointments.filter(status=cleaned_data['status'])
+    if cleaned_data.get('date_from'):
+        appointments = appointments.filter(appointment_date__gte=cleaned_data['date_from'])
+    if cleaned_data.get('date_to'):
+        appointments = appointments.filter(appointment_date__lte=cleaned_data['date_to'])
+    if cleaned_data.get('master'):
+        appointments = appointments.filter(master=cleaned_data['master'])
+    if cleaned_data.get('service'):
+        appointments = appointments.filter(service=cleaned_data['service'])
+    return appointments
 
 def _get_available_master(service, date, start_time):
     """Получает доступного мастера для услуги"""
@@ -159,27 +492,30 @@ def _get_available_master(service, date, start_time):
     )
     
     for master in available_masters:
-        if not _is_time_conflicting(master, date, start_time, service.duration_minutes):
+        if not _is_time_conflicting(master, date, start_time, get_duration(master.pk, service)):
             return master
     
     return available_masters.first()
 
-def _get_available_times(master, service, date):
+def _get_available_times(master, service, date, client_id=None):
     """Получает доступные временные слоты для мастера и услуги"""
-    # Время работы студии
-    start_hour = 9
-    end_hour = 21
-    slot_duration = 30  # 30-минутные слоты
+    busy_intervals = list(get_busy_intervals(master.pk, date))
+    busy_intervals += get_held_intervals(master.pk, date, exclude_owner=client_id)
+    return _free_start_times(date, get_duration(master.pk, service), busy_intervals)
+
+def _free_start_times(date, duration_minutes, busy_intervals):
+    """Свободные слоты сетки в рабочие часы студии для длительности услуги"""
+    if not duration_minutes:
+        duration_minutes = 30  # По умолчанию 30 минут
     
     available_times = []
     
-    for hour in range(start_hour, end_hour):
-        for minute in [0, 30]:
-            time_slot = datetime.strptime(f"{hour:02d}:{minute:02d}", "%H:%M").time()
-            
-            # Проверяем, доступно ли время
-            if not _is_time_conflicting(master, date, time_slot, service.duration_minutes):
-                available_times.append(time_slot)
+    for time_slot in slot_start_times():
+        end_time = (datetime.combine(date, time_slot) + timedelta(minutes=duration_minutes)).time()
+        
+        # Проверяем, доступно ли время
+        if not any(busy_start < end_time and busy_end > time_slot for busy_start, busy_end in busy_intervals):
+            available_times.append(time_slot)
     
     return available_times
 
@@ -216,16 +552,7 @@ def admin_appointment_list(request):
     # Фильтрация
     filter_form = AppointmentFilterForm(request.GET)
     if filter_form.is_valid():
-        if filter_form.cleaned_data.get('status'):
-            appointments = appointments.filter(status=filter_form.cleaned_data['status'])
-        if filter_form.cleaned_data.get('date_from'):
-            appointments = appointments.filter(appointment_date__gte=filter_form.cleaned_data['date_from'])
-        if filter_form.cleaned_data.get('date_to'):
-            appointments = appointments.filter(appointment_date__lte=filter_form.cleaned_data['date_to'])
-        if filter_form.cleaned_data.get('master'):
-            appointments = appointments.filter(master=filter_form.cleaned_data['master'])
-        if filter_form.cleaned_data.get('service'):
-            appointments = appointments.filter(service=filter_form.cleaned_data['service'])
+        appointments = _filter_appointments(appointments, filter_form.cleaned_data)
     
     # Пагинация
     paginator = Paginator(appointments, 20)
@@ -247,17 +574,47 @@ def admin_appointment_edit(request, pk):
     
     appointment = get_object_or_404(Appointment, pk=pk)
     
+    # Время, удержанное за владельцем записи (например, предложение из листа
+    # ожидания), не мешает персоналу перенести на него его же запись
     if request.method == 'POST':
-        form = AppointmentForm(request.POST, instance=appointment)
+        form = AppointmentForm(request.POST, instance=appointment, client=appointment.client)
         if form.is_valid():
             form.save()
             messages.success(request, 'Запись успешно обновлена!')
             return redirect('bookings:admin_appointment_list')
     else:
-        form = AppointmentForm(instance=appointment)
+        form = AppointmentForm(instance=appointment, client=appointment.client)
     
     context = {
         'form': form,
         'appointment': appointment,
     }
     return render(request, 'bookings/admin_appointment_edit.html', context)
+
+@login_required
+def admin_analytics(request):
+    """Отчет по выручке и загрузке мастеров для персонала"""
+    if not request.user.is_staff:
+        messages.error(request, 'Доступ запрещен')
+        return redirect('core:home')
+    
+    today = timezone.localdate()
+    initial = {
+        'date_from': today.replace(day=1),
+        'date_to': today,
+        'group_by': 'master',
+    }
+    form = AnalyticsReportForm(request.GET or initial)
+    report = None
+    totals = None
+    if form.is_valid():
+        data = form.cleaned_data
+        report = build_report(data['date_from'], data['date_to'], data['group_by'], data['period'] or None)
+        totals = report_totals(report)
+    
+    context = {
+        'form': form,
+        'report': report,
+        'totals': totals,
+    }
+    return render(request, 'bookings/admin_analytics.html', context)
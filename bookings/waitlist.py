@@ -0,0 +1,109 @@
+"""
+Лист ожидания: предложение освободившегося времени.
+
+При отмене записи освободившееся окно предлагается первому по очереди
+клиенту, который ждет эту услугу на эту дату (у этого мастера или у любого).
+Подбор выполняется фиксированным числом запросов независимо от длины
+очереди: проверка, что окно свободно, выборка нескольких первых кандидатов
+по индексу (service, status, date_from) и условный UPDATE заявки.
+
+Окно удерживается за клиентом в кэше (bookings.holds) на
+WAITLIST_OFFER_MINUTES, заявка получает статус «Предложено время», а письмо
+отправляет manage.py process_waitlist — заявки без notified_at служат
+очередью уведомлений. Та же команда возвращает в очередь просроченные
+предложения и передает окно следующему клиенту.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .durations import get_end_time
+from .holds import hold_slot, release_hold
+from .models import Appointment, WaitlistEntry
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+# Сколько кандидатов читать за раз: на случай, если первых перехватит
+# параллельный подбор, но без чтения всей очереди
+CANDIDATES_LIMIT = 5
+
+
+def offer_freed_slot(master_id, service_id, date, start_time, end_time, exclude_client_id=None, exclude_entry_ids=()):
+    """Предлагает окно первому подходящему клиенту, возвращает заявку или None"""
+    now = timezone.localtime()
+    if date < now.date() or (date == now.date() and start_time <= now.time()):
+        return None
+
+    is_busy = Appointment.objects.filter(
+        master_id=master_id,
+        appointment_date=date,
+        status__in=ACTIVE_STATUSES,
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+    ).exists()
+    if is_busy:
+        return None
+
+    candidates = list(
+        WaitlistEntry.objects.filter(
+            Q(master__isnull=True) | Q(master_id=master_id),
+            service_id=service_id,
+            status='waiting',
+            date_from__lte=date,
+            date_to__gte=date,
+        )
+        .exclude(client_id=exclude_client_id)
+        .exclude(pk__in=exclude_entry_ids)
+        .order_by('created_at')
+        .values_list('pk', 'client_id')[:CANDIDATES_LIMIT]
+    )
+
+    offer_minutes = settings.WAITLIST_OFFER_MINUTES
+    for entry_id, client_id in candidates:
+        if not hold_slot(master_id, date, start_time, end_time, client_id, offer_minutes * 60):
+            # Окно уже удержано кем-то другим
+            return None
+        offered = WaitlistEntry.objects.filter(pk=entry_id, status='waiting').update(
+            status='offered',
+            offered_master_id=master_id,
+            offered_date=date,
+            offered_start_time=start_time,
+            offer_expires_at=timezone.now() + timedelta(minutes=offer_minutes),
+            notified_at=None,
+        )
+        if offered:
+            return WaitlistEntry.objects.get(pk=entry_id)
+        release_hold(master_id, date, start_time, client_id)
+    return None
+
+
+def expire_offers():
+    """Возвращает просроченные предложения в очередь и передает окна дальше"""
+    expired = list(
+        WaitlistEntry.objects.filter(status='offered', offer_expires_at__lte=timezone.now())
+        .select_related('service')
+    )
+    reoffered = 0
+    for entry in expired:
+        updated = WaitlistEntry.objects.filter(pk=entry.pk, status='offered').update(
+            status='waiting',
+            offered_master=None,
+            offered_date=None,
+            offered_start_time=None,
+            offer_expires_at=None,
+            notified_at=None,
+        )
+        if not updated or entry.offered_master_id is None:
+            continue
+        end_time = get_offer_end_time(entry)
+        if offer_freed_slot(
+            entry.offered_master_id, entry.service_id, entry.offered_date,
+            entry.offered_start_time, end_time, exclude_entry_ids=[entry.pk],
+        ):
+            reoffered += 1
+    return len(expired), reoffered
+
+
+def get_offer_end_time(entry):
+    """Окончание предложенного окна с учетом длительности услуги у мастера"""
+    return get_end_time(entry.offered_master_id, entry.service, entry.offered_date, entry.offered_start_time)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, Contact, News, About
+from .models import UserProfile, Contact, News, About, RequestProfile
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -29,3 +29,13 @@ class AboutAdmin(admin.ModelAdmin):
     list_filter = ['is_active']
     list_editable = ['order', 'is_active']
     search_fields = ['title', 'content']
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['path', 'view_name', 'duration_ms', 'query_count', 'mode', 'created_at']
+    list_filter = ['mode', 'view_name']
+    search_fields = ['path', 'view_name']
+    exclude = ['profile', 'queries']
+    readonly_fields = [
+        'method', 'path', 'view_name', 'status_code', 'duration_ms', 'query_count', 'query_time_ms', 'mode', 'created_at',
+    ]
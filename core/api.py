@@ -0,0 +1,158 @@
+"""
+Легкий JSON API каталога для мобильного приложения.
+
+Каждый ресурс описывается CatalogResource: базовый запрос, публичные
+имена полей и соответствующие им пути ORM. Ответ строится через values(),
+без создания экземпляров моделей. Параметры запроса:
+
+    ?fields=id,name     выборочные поля (по умолчанию default_fields)
+    ?ids=1,2,3          выборка по списку id одним запросом
+    ?<фильтр>=<id>      фильтры, объявленные ресурсом
+
+ETag считается до запроса к базе по версии каталога в кэше и разобранным
+параметрам: повторный запрос с If-None-Match получает 304 без обращения
+к базе и сериализации. Версию меняют сигналы моделей каталога
+(core/signals.py); изменения через QuerySet.update() ее не меняют.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import md5
+from django.utils.http import quote_etag
+
+MAX_IDS = 200
+# id в SQLite и PostgreSQL — знаковое 64-битное целое
+MAX_ID = 2 ** 63 - 1
+CATALOG_VERSION_KEY = 'core:catalog-version'
+# Потеря версии при вытеснении лишь меняет ETag
+CATALOG_VERSION_TIMEOUT = 24 * 60 * 60
+
+
+def _new_catalog_version():
+    return uuid.uuid4().hex[:12]
+
+
+async def aget_catalog_version():
+    """Версия каталога для ETag ответов API"""
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, _new_catalog_version(), CATALOG_VERSION_TIMEOUT)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+def invalidate_catalog():
+    cache.set(CATALOG_VERSION_KEY, _new_catalog_version(), CATALOG_VERSION_TIMEOUT)
+
+
+def media_url(name):
+    """Путь файла из values() в URL хранилища"""
+    return default_storage.url(name) if name else None
+
+
+class CatalogResource:
+    """Описание ресурса каталога для JSON API"""
+
+    def __init__(self, name, queryset, fields, default_fields=None, filters=None, transforms=None):
+        self.name = name
+        self.queryset = queryset
+        # Публичное имя поля -> путь ORM для values()
+        self.fields = fields
+        self.default_fields = tuple(default_fields or fields)
+        # Имя параметра -> путь ORM или функция (queryset, id) -> queryset
+        self.filters = filters or {}
+        # Публичное имя поля -> функция преобразования значения
+        self.transforms = transforms or {}
+
+    def parse_fields(self, request):
+        raw = request.GET.get('fields')
+        if not raw:
+            return self.default_fields
+        fields = tuple(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+        unknown = [field for field in fields if field not in self.fields]
+        if unknown or not fields:
+            raise ValueError(
+                f"Неизвестные поля: {', '.join(unknown) or '-'}. "
+                f"Доступны: {', '.join(self.fields)}"
+            )
+        return fields
+
+    def parse_filters(self, request):
+        """Значения фильтров из запроса: {параметр: id}"""
+        values = {}
+        for param in self.filters:
+            value = request.GET.get(param)
+            if value is None:
+                continue
+            if not value.isdigit() or int(value) > MAX_ID:
+                raise ValueError(f'Параметр {param} должен быть числом от 0 до {MAX_ID}')
+            values[param] = int(value)
+        return values
+
+    def build_queryset(self, ids, filters):
+        queryset = self.queryset.all()
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        for param, value in filters.items():
+            lookup = self.filters[param]
+            if callable(lookup):
+                queryset = lookup(queryset, value)
+            else:
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+    def serialize(self, row, fields):
+        item = {}
+        for field in fields:
+            value = row[self.fields[field]]
+            transform = self.transforms.get(field)
+            item[field] = transform(value) if transform else value
+        return item
+
+
+def parse_id_list(raw):
+    """Разбирает ?ids=1,2,3, возвращает None, если параметр не передан"""
+    if raw is None:
+        return None
+    try:
+        ids = {int(value) for value in raw.split(',') if value.strip()}
+    except ValueError:
+        raise ValueError('Параметр ids должен содержать числа через запятую')
+    if any(abs(pk) > MAX_ID for pk in ids):
+        raise ValueError(f'id в параметре ids не могут превышать {MAX_ID}')
+    if len(ids) > MAX_IDS:
+        raise ValueError(f'Не более {MAX_IDS} id за запрос')
+    return sorted(ids)
+
+
+async def catalog_response(request, resource):
+    """Асинхронный ответ JSON API для ресурса каталога"""
+    try:
+        fields = resource.parse_fields(request)
+        ids = parse_id_list(request.GET.get('ids'))
+        filters = resource.parse_filters(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    # Тот же каталог и те же разобранные параметры дают тот же ответ
+    version = await aget_catalog_version()
+    key = f'{version}:{resource.name}:{",".join(fields)}:{ids}:{sorted(filters.items())}'
+    etag = quote_etag(md5(key.encode(), usedforsecurity=False).hexdigest())
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        patch_cache_control(not_modified, public=True, max_age=settings.CATALOG_API_MAX_AGE)
+        return not_modified
+
+    paths = list(dict.fromkeys(resource.fields[field] for field in fields))
+    queryset = resource.build_queryset(ids, filters)
+    data = [resource.serialize(row, fields) async for row in queryset.values(*paths)]
+
+    response = JsonResponse({resource.name: data})
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.CATALOG_API_MAX_AGE)
+    return response
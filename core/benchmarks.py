@@ -0,0 +1,9 @@
+"""Общие функции для команд нагрузочного тестирования и замеров"""
+
+
+def percentile(sorted_values, fraction):
+    """Перцентиль по отсортированному списку (метод ближайшего ранга)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
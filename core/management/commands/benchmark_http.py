@@ -0,0 +1,62 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks import percentile
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный замер запущенного сервера: запросы в секунду и задержки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес сервера')
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Путь для запросов (можно указать несколько раз)',
+        )
+        parser.add_argument('--requests', type=int, default=2000, help='Общее количество запросов')
+        parser.add_argument('--concurrency', type=int, default=16, help='Количество параллельных клиентов')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Таймаут одного запроса, с')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests и --concurrency должны быть положительными')
+
+        base_url = options['url'].rstrip('/')
+        paths = options['paths'] or ['/', '/services/', '/masters/']
+        urls = list(islice(cycle(base_url + path for path in paths), options['requests']))
+        timeout = options['timeout']
+
+        def fetch(url):
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as response:
+                    response.read()
+                    ok = response.status < 500
+            except urllib.error.HTTPError as error:
+                ok = error.code < 500
+            except OSError:
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(fetch, urls))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for latency, ok in results)
+        errors = sum(1 for latency, ok in results if not ok)
+
+        self.stdout.write(f'Запросов: {len(results)}, ошибок: {errors}, время: {elapsed:.2f} с')
+        self.stdout.write(self.style.SUCCESS(f'Запросов в секунду: {len(results) / elapsed:.1f}'))
+        self.stdout.write(
+            f'Задержка, мс: p50={percentile(latencies, 0.50):.1f} '
+            f'p95={percentile(latencies, 0.95):.1f} '
+            f'p99={percentile(latencies, 0.99):.1f} '
+            f'max={latencies[-1]:.1f}'
+        )
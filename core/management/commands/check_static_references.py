@@ -0,0 +1,48 @@
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.template.utils import get_app_template_dirs
+
+STATIC_TAG_RE = re.compile(r"""{%\s*static\s+(['"])(?P<path>[^'"]+)\1""")
+
+
+class Command(BaseCommand):
+    help = 'Проверяет, что каждая ссылка {% static %} в шаблонах указывает на существующий файл'
+
+    def handle(self, *args, **options):
+        template_dirs = [Path(path) for engine in settings.TEMPLATES for path in engine.get('DIRS', [])]
+        template_dirs += [Path(path) for path in get_app_template_dirs('templates')]
+
+        references = {}
+        for template_dir in template_dirs:
+            for template in template_dir.rglob('*.html'):
+                for match in STATIC_TAG_RE.finditer(template.read_text(encoding='utf-8')):
+                    references.setdefault(match.group('path'), []).append(template)
+
+        # После collectstatic дополнительно проверяем манифест с хешированными именами
+        has_manifest = hasattr(staticfiles_storage, 'stored_name') and staticfiles_storage.exists(
+            getattr(staticfiles_storage, 'manifest_name', '')
+        )
+
+        missing = []
+        for path, templates in sorted(references.items()):
+            error = None
+            if not finders.find(path):
+                error = 'файл не найден'
+            elif has_manifest:
+                try:
+                    staticfiles_storage.stored_name(path)
+                except ValueError:
+                    error = 'нет в манифесте, выполните collectstatic'
+            if error:
+                names = ', '.join(sorted({str(template) for template in templates}))
+                missing.append(f'{path}: {error} ({names})')
+
+        self.stdout.write(f'Проверено ссылок на статические файлы: {len(references)}')
+        if missing:
+            raise CommandError('Не найдены статические файлы:\n' + '\n'.join(missing))
+        self.stdout.write(self.style.SUCCESS('Все ссылки {% static %} указывают на существующие файлы'))
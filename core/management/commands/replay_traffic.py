@@ -0,0 +1,281 @@
+import asyncio
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import Resolver404, resolve
+from prometheus_client.parser import text_string_to_metric_families
+from core.benchmarks import percentile
+from core.traffic import read_traffic
+
+# Без тел запросов и CSRF-токенов воспроизводятся только читающие запросы
+REPLAY_METHODS = ('GET', 'HEAD')
+
+
+class NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Перенаправление — ответ воспроизводимого запроса, по нему не переходим"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Воспроизводит журнал трафика (TRAFFIC_RECORD_PATH) на запущенном сервере '
+        'и печатает пропускную способность и перцентили задержки по именам URL'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', nargs='?', help='Журнал трафика (по умолчанию TRAFFIC_RECORD_PATH)')
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес сервера')
+        parser.add_argument('--concurrency', type=int, default=16, help='Количество параллельных клиентов')
+        parser.add_argument('--mode', choices=('threads', 'asyncio'), default='threads', help='Пул потоков или asyncio')
+        parser.add_argument(
+            '--speed', type=float, default=0,
+            help='Скорость относительно записи (2 — вдвое быстрее); 0 — без пауз, максимальная нагрузка',
+        )
+        parser.add_argument('--limit', type=int, help='Воспроизвести только первые N запросов')
+        parser.add_argument(
+            '--user', action='append', default=[], metavar='КЛАСС=ЛОГИН',
+            help='Сессия для запросов класса client или staff, например --user staff=admin',
+        )
+        parser.add_argument('--timeout', type=float, default=10.0, help='Таймаут одного запроса, с')
+        parser.add_argument(
+            '--metrics', action='store_true',
+            help='Сравнить счетчики cache_requests_total на /metrics сервера до и после воспроизведения',
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['speed'] < 0:
+            raise CommandError('--concurrency должен быть положительным, --speed — не отрицательным')
+        path = options['log'] or settings.TRAFFIC_RECORD_PATH
+        if not path:
+            raise CommandError('Укажите журнал или TRAFFIC_RECORD_PATH')
+        try:
+            entries = sorted(read_traffic(path), key=lambda entry: entry['ts'])
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать журнал: {error}')
+
+        replayable = [entry for entry in entries if entry.get('method', 'GET') in REPLAY_METHODS]
+        skipped = len(entries) - len(replayable)
+        if options['limit']:
+            replayable = replayable[:options['limit']]
+        if not replayable:
+            raise CommandError('В журнале нет запросов для воспроизведения')
+        self.stdout.write(
+            f'Запросов в журнале: {len(entries)}, воспроизводится: {len(replayable)} '
+            f'(изменяющие запросы пропущены: {skipped})'
+        )
+
+        sessions = self.create_sessions(options['user'])
+        try:
+            cookies = {
+                user_class: f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+                for user_class, session in sessions.items()
+            }
+            without_session = Counter(
+                entry.get('user') for entry in replayable
+                if entry.get('user', 'anonymous') != 'anonymous' and entry.get('user') not in cookies
+            )
+            for user_class, count in without_session.items():
+                self.stdout.write(self.style.WARNING(
+                    f'{count} запросов класса {user_class} идут без сессии (добавьте --user {user_class}=логин)'
+                ))
+
+            base_url = options['url'].rstrip('/')
+            cache_before = self.cache_counters(base_url, options['timeout']) if options['metrics'] else None
+            jobs = self.build_jobs(replayable, base_url, cookies, options['speed'])
+            run = self.run_threads if options['mode'] == 'threads' else self.run_asyncio
+            started = time.perf_counter()
+            results, lag = run(jobs, options['concurrency'], options['timeout'])
+            elapsed = time.perf_counter() - started
+        finally:
+            for session in sessions.values():
+                session.delete()
+
+        self.report(results, elapsed, lag)
+        if cache_before is not None:
+            self.report_caches(cache_before, self.cache_counters(base_url, options['timeout']))
+
+    def create_sessions(self, specs):
+        """Сессии пользователей на сервере, как после входа, по --user класс=логин"""
+        engine = import_module(settings.SESSION_ENGINE)
+        sessions = {}
+        for spec in specs:
+            user_class, _, username = spec.partition('=')
+            if user_class not in ('client', 'staff') or not username:
+                raise CommandError(f'Неверный --user "{spec}", ожидается client=логин или staff=логин')
+            user = get_user_model().objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'Пользователь "{username}" не найден')
+            session = engine.SessionStore()
+            session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+            session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            sessions[user_class] = session
+        return sessions
+
+    def build_jobs(self, entries, base_url, cookies, speed):
+        """(задержка от начала, имя URL, метод, адрес, cookie) по порядку записи"""
+        first_ts = entries[0]['ts']
+        jobs = []
+        for entry in entries:
+            url = base_url + entry['path'] + (f'?{entry["query"]}' if entry.get('query') else '')
+            due = (entry['ts'] - first_ts) / speed if speed else 0
+            jobs.append((due, url_name(entry), entry.get('method', 'GET'), url, cookies.get(entry.get('user'))))
+        return jobs
+
+    def run_threads(self, jobs, concurrency, timeout):
+        results = []
+        lag = []
+        lock = threading.Lock()
+        iterator = iter(jobs)
+        opener = urllib.request.build_opener(NoRedirectHandler)
+        started = time.perf_counter()
+
+        def worker():
+            while True:
+                with lock:
+                    job = next(iterator, None)
+                if job is None:
+                    return
+                due, name, method, url, cookie = job
+                delay = started + due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                request = urllib.request.Request(url, method=method, headers={'Cookie': cookie} if cookie else {})
+                sent = time.perf_counter()
+                try:
+                    with opener.open(request, timeout=timeout) as response:
+                        response.read()
+                        ok = response.status < 500
+                except urllib.error.HTTPError as error:
+                    ok = error.code < 500
+                except OSError:
+                    ok = False
+                with lock:
+                    results.append((name, time.perf_counter() - sent, ok))
+                    lag.append(max(sent - started - due, 0))
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, lag
+
+    def run_asyncio(self, jobs, concurrency, timeout):
+        return asyncio.run(self._run_asyncio(jobs, concurrency, timeout))
+
+    async def _run_asyncio(self, jobs, concurrency, timeout):
+        results = []
+        lag = []
+        iterator = iter(jobs)
+        started = time.perf_counter()
+
+        async def worker():
+            # Один поток событий: next() между await не гоняется с другими задачами
+            for due, name, method, url, cookie in iterator:
+                delay = started + due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                sent = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(fetch(method, url, cookie), timeout)
+                    ok = status < 500
+                except (OSError, ValueError, IndexError, asyncio.TimeoutError):
+                    ok = False
+                results.append((name, time.perf_counter() - sent, ok))
+                lag.append(max(sent - started - due, 0))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return results, lag
+
+    def report(self, results, elapsed, lag):
+        by_name = {}
+        for name, latency, ok in results:
+            stats = by_name.setdefault(name, {'latencies': [], 'errors': 0})
+            stats['latencies'].append(latency * 1000)
+            stats['errors'] += not ok
+        errors = sum(stats['errors'] for stats in by_name.values())
+        lag.sort()
+
+        self.stdout.write(f'Запросов: {len(results)}, ошибок: {errors}, время: {elapsed:.2f} с')
+        self.stdout.write(self.style.SUCCESS(f'Запросов в секунду: {len(results) / elapsed:.1f}'))
+        self.stdout.write(f'Отставание от расписания, мс: p50={percentile(lag, 0.50) * 1000:.1f} p99={percentile(lag, 0.99) * 1000:.1f}')
+        self.stdout.write(
+            f'{"URL":<40} {"запросов":>8} {"ошибок":>7} {"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9} {"max, мс":>9}'
+        )
+        for name, stats in sorted(by_name.items(), key=lambda item: -len(item[1]['latencies'])):
+            latencies = sorted(stats['latencies'])
+            self.stdout.write(
+                f'{name:<40} {len(latencies):>8} {stats["errors"]:>7} '
+                f'{percentile(latencies, 0.50):>9.1f} {percentile(latencies, 0.95):>9.1f} '
+                f'{percentile(latencies, 0.99):>9.1f} {latencies[-1]:>9.1f}'
+            )
+
+    def cache_counters(self, base_url, timeout):
+        """Попадания и промахи кэшей приложения на сервере: {(кэш, hit|miss): число}"""
+        try:
+            with urllib.request.urlopen(f'{base_url}/metrics', timeout=timeout) as response:
+                text = response.read().decode()
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать {base_url}/metrics (METRICS_ENABLED, METRICS_ALLOWED_IPS): {error}')
+        counters = Counter()
+        for family in text_string_to_metric_families(text):
+            for sample in family.samples:
+                if sample.name == 'cache_requests_total':
+                    counters[(sample.labels['cache'], sample.labels['result'])] += sample.value
+        return counters
+
+    def report_caches(self, before, after):
+        """Доля попаданий кэшей за время воспроизведения"""
+        delta = after - before
+        self.stdout.write(f'{"Кэш":<20} {"попаданий":>10} {"промахов":>10} {"доля попаданий":>15}')
+        for name in sorted({name for name, result in delta}):
+            hits, misses = delta[(name, 'hit')], delta[(name, 'miss')]
+            self.stdout.write(f'{name:<20} {hits:>10.0f} {misses:>10.0f} {hits * 100 / (hits + misses):>14.1f}%')
+
+
+def url_name(entry):
+    """Имя URL записи (app:name); для журналов без имени — по пути"""
+    if entry.get('view'):
+        return entry['view']
+    try:
+        return resolve(entry['path']).view_name
+    except Resolver404:
+        return entry['path']
+
+
+async def fetch(method, url, cookie):
+    """Минимальный HTTP/1.1-клиент на asyncio: одно соединение на запрос, возвращает статус"""
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    connection = asyncio.open_connection(
+        parts.hostname, parts.port or (443 if secure else 80),
+        ssl=ssl.create_default_context() if secure else None,
+    )
+    reader, writer = await connection
+    try:
+        target = parts.path + (f'?{parts.query}' if parts.query else '')
+        headers = [f'{method} {target} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: close']
+        if cookie:
+            headers.append(f'Cookie: {cookie}')
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode())
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        # Connection: close — сервер закрывает соединение после ответа
+        while await reader.read(65536):
+            pass
+        return status
+    finally:
+        writer.close()
@@ -0,0 +1,62 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.querylog import STATS_FILE_PREFIX, load_stats
+
+SORT_KEYS = {
+    'total': lambda entry: entry['total'],
+    'count': lambda entry: entry['count'],
+    'max': lambda entry: entry['max'],
+    'mean': lambda entry: entry['total'] / entry['count'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает самые затратные SQL-запросы по отпечаткам из статистики '
+        'журнала медленных запросов (SLOW_QUERY_STATS_DIR)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Сколько отпечатков показать')
+        parser.add_argument('--sort', choices=SORT_KEYS, default='total', help='Порядок: суммарное, число, максимум, среднее')
+        parser.add_argument('--view', help='Только запросы из указанного имени URL (app:name)')
+        parser.add_argument('--sql-width', type=int, default=300, help='Сколько символов SQL печатать')
+        parser.add_argument('--reset', action='store_true', help='Удалить накопленную статистику после отчета')
+
+    def handle(self, *args, **options):
+        directory = settings.SLOW_QUERY_STATS_DIR
+        entries = load_stats(directory)
+        if options['view']:
+            # Число и время только из этого URL; максимум по URL не хранится
+            entries = {
+                key: dict(entry, count=entry['views'][options['view']][0], total=entry['views'][options['view']][1])
+                for key, entry in entries.items() if options['view'] in entry['views']
+            }
+        if not entries:
+            raise CommandError(f'Нет статистики в {directory} (SLOW_QUERY_LOG_ENABLED включен?)')
+
+        total_count = sum(entry['count'] for entry in entries.values())
+        total_time = sum(entry['total'] for entry in entries.values())
+        self.stdout.write(
+            f'Отпечатков: {len(entries)}, запросов: {total_count}, время: {total_time * 1000:.1f} мс'
+        )
+
+        top = sorted(entries.items(), key=lambda item: SORT_KEYS[options['sort']](item[1]), reverse=True)
+        for key, entry in top[:options['top']]:
+            views = sorted(entry['views'].items(), key=lambda item: item[1][1], reverse=True)
+            views = ', '.join(f'{view} ({count}, {seconds * 1000:.1f} мс)' for view, (count, seconds) in views[:3])
+            self.stdout.write(self.style.SUCCESS(
+                f'{key}  запросов: {entry["count"]}  всего: {entry["total"] * 1000:.1f} мс  '
+                f'среднее: {entry["total"] / entry["count"] * 1000:.2f} мс  max: {entry["max"] * 1000:.1f} мс  '
+                f'доля времени: {entry["total"] / total_time:.1%}'
+            ))
+            self.stdout.write(f'    URL: {views}')
+            self.stdout.write(f'    {entry["sql"][:options["sql_width"]]}')
+
+        if options['reset']:
+            for name in os.listdir(directory):
+                if name.startswith(STATS_FILE_PREFIX):
+                    os.remove(os.path.join(directory, name))
+            self.stdout.write('Статистика удалена')
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в файл реплики для локальной проверки маршрутизации чтения'
+
+    def handle(self, *args, **options):
+        alias = getattr(settings, 'REPLICA_DATABASE', 'replica')
+        if alias not in connections.databases:
+            raise CommandError('Реплика не настроена: задайте DB_REPLICA_NAME в .env')
+
+        primary = connections['default']
+        replica = connections[alias]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite, для других СУБД используйте репликацию сервера')
+
+        primary.ensure_connection()
+        replica.ensure_connection()
+        # Онлайн-копирование средствами SQLite: основная БД остаётся доступной
+        primary.connection.backup(replica.connection)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Реплика {replica.settings_dict["NAME"]} обновлена')
+        )
@@ -0,0 +1,129 @@
+"""
+Метрики в формате Prometheus (страница /metrics).
+
+Счетчики и гистограммы prometheus_client живут в памяти процесса и
+обновляются за доли микросекунды. Под gunicorn каждый воркер — отдельный
+процесс, поэтому нужен многопроцессный режим: переменная окружения
+PROMETHEUS_MULTIPROC_DIR указывает на пустой каталог, воркеры пишут
+значения в файлы в нем (mmap), а /metrics суммирует файлы всех воркеров.
+Хуки очистки каталога и завершения воркеров — в gunicorn.conf.py.
+
+MetricsMiddleware считает запросы и их длительность по имени URL
+(app:name, без пути — число рядов не растет с числом адресов), а также
+SQL-запросы и их время: обертка выполнения запросов подключается к каждому
+соединению и копит значения в объекте текущего запроса (ContextVar, который
+asgiref передает и в потоки ORM асинхронных представлений).
+"""
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+
+# Имя URL для запросов, не совпавших ни с одним маршрутом (404)
+UNRESOLVED = 'unresolved'
+
+HTTP_REQUESTS = Counter(
+    'django_http_requests_total', 'Запросы по имени URL, методу и статусу ответа',
+    ['view', 'method', 'status'],
+)
+HTTP_LATENCY = Histogram(
+    'django_http_request_duration_seconds', 'Длительность обработки запроса по имени URL',
+    ['view'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Counter('django_db_queries_total', 'SQL-запросы по имени URL', ['view'])
+DB_QUERY_SECONDS = Counter('django_db_query_duration_seconds_total', 'Время SQL-запросов по имени URL', ['view'])
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Обращения к кэшам приложения: попадания (hit) и промахи (miss)',
+    ['cache', 'result'],
+)
+
+# [число запросов, секунды] текущего HTTP-запроса
+_request_queries = ContextVar('request_queries', default=None)
+
+
+def cache_access(name, hit):
+    """Отмечает попадание или промах кэша приложения"""
+    CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc()
+
+
+def count_queries(execute, sql, params, many, context):
+    """Обертка connection.execute_wrapper: время запроса в счетчик текущего HTTP-запроса"""
+    queries = _request_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries[0] += 1
+        queries[1] += time.perf_counter() - started
+
+
+def _install_query_counter(sender, connection, **kwargs):
+    # В начало списка: connection.execute_wrapper() (журнал SQL профилировщика)
+    # при выходе снимает последнюю обертку и не должен снять эту
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+class MetricsMiddleware:
+    """Считает запросы, их длительность и SQL по имени URL. Подключается первым в MIDDLEWARE"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        connection_created.connect(_install_query_counter, dispatch_uid='core.metrics.count_queries')
+        # Соединения, открытые до загрузки middleware, сигнал уже пропустили
+        for connection in connections.all(initialized_only=True):
+            _install_query_counter(None, connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = [0, 0.0]
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self._observe(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = [0, 0.0]
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self._observe(request, response, time.perf_counter() - started, queries)
+        return response
+
+    def _observe(self, request, response, elapsed, queries):
+        view = request.resolver_match.view_name if request.resolver_match else UNRESOLVED
+        HTTP_REQUESTS.labels(view, request.method, response.status_code).inc()
+        HTTP_LATENCY.labels(view).observe(elapsed)
+        if queries[0]:
+            DB_QUERIES.labels(view).inc(queries[0])
+            DB_QUERY_SECONDS.labels(view).inc(queries[1])
+
+
+def render_metrics():
+    """Текст /metrics: сумма по всем воркерам в многопроцессном режиме"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
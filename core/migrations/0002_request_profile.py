@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=500, verbose_name='Адрес')),
+                ('view_name', models.CharField(blank=True, max_length=200, verbose_name='Имя URL')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Статус ответа')),
+                ('duration_ms', models.FloatField(db_index=True, verbose_name='Длительность, мс')),
+                ('query_count', models.PositiveIntegerField(verbose_name='SQL-запросов')),
+                ('query_time_ms', models.FloatField(verbose_name='Время SQL, мс')),
+                ('mode', models.CharField(choices=[('sampling', 'Выборка стеков'), ('cprofile', 'cProfile')], max_length=10, verbose_name='Режим')),
+                ('profile', models.BinaryField(verbose_name='Профиль (zlib)')),
+                ('queries', models.BinaryField(verbose_name='Журнал SQL (zlib)')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ['-duration_ms'],
+            },
+        ),
+    ]
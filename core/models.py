@@ -1,3 +1,6 @@
+import json
+import zlib
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
@@ -67,3 +70,43 @@ class About(models.Model):
     
     def __str__(self):
         return self.title
+
+class RequestProfile(models.Model):
+    """Профиль медленного или выбранного запроса (см. core/profiling.py)"""
+    MODE_CHOICES = [
+        ('sampling', _('Выборка стеков')),
+        ('cprofile', 'cProfile'),
+    ]
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Дата создания'))
+    method = models.CharField(max_length=10, verbose_name=_('Метод'))
+    path = models.CharField(max_length=500, verbose_name=_('Адрес'))
+    view_name = models.CharField(max_length=200, blank=True, verbose_name=_('Имя URL'))
+    status_code = models.PositiveSmallIntegerField(verbose_name=_('Статус ответа'))
+    duration_ms = models.FloatField(db_index=True, verbose_name=_('Длительность, мс'))
+    query_count = models.PositiveIntegerField(verbose_name=_('SQL-запросов'))
+    query_time_ms = models.FloatField(verbose_name=_('Время SQL, мс'))
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, verbose_name=_('Режим'))
+    profile = models.BinaryField(verbose_name=_('Профиль (zlib)'))
+    queries = models.BinaryField(verbose_name=_('Журнал SQL (zlib)'))
+    
+    class Meta:
+        verbose_name = _('Профиль запроса')
+        verbose_name_plural = _('Профили запросов')
+        ordering = ['-duration_ms']
+    
+    def __str__(self):
+        return f"{self.method} {self.path} — {self.duration_ms:.0f} мс"
+    
+    @classmethod
+    def trim(cls, keep):
+        """Оставляет только keep последних профилей"""
+        cutoff = list(cls.objects.order_by('-pk').values_list('pk', flat=True)[keep:keep + 1])
+        if cutoff:
+            cls.objects.filter(pk__lte=cutoff[0]).delete()
+    
+    def get_profile_data(self):
+        return zlib.decompress(self.profile)
+    
+    def get_queries(self):
+        return json.loads(zlib.decompress(self.queries))
@@ -0,0 +1,265 @@
+"""
+Профилирование отдельных запросов.
+
+ProfilingMiddleware профилирует долю PROFILING_SAMPLE_RATE запросов и
+любой запрос персонала с заголовком X-Profile. Значение заголовка выбирает
+режим: cprofile — детерминированный профиль cProfile, sampling — выборка
+стеков по настенному времени (ожидание базы и сети тоже видно). Вместе
+с профилем сохраняются имя URL, длительность и журнал SQL-запросов;
+профиль и журнал сжимаются zlib.
+
+Выборка стеков выгружается в формате collapsed stacks («кадр;кадр;кадр N»),
+который понимают flamegraph.pl и speedscope. Профиль cProfile выгружается
+как файл .prof (pstats) для snakeviz или flameprof.
+
+Под ASGI профиль асинхронного представления снимается с потока цикла
+событий и может включать другие запросы, которые выполнялись одновременно.
+"""
+import cProfile
+import json
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+PROFILE_HEADER = 'X-Profile'
+MODES = ('sampling', 'cprofile')
+# Сколько SQL-запросов сохранять в журнале (счетчик учитывает все)
+MAX_LOGGED_QUERIES = 200
+
+# Одновременно в процессе может работать только один cProfile
+_cprofile_lock = threading.Lock()
+
+
+class QueryLog:
+    """
+    Журнал SQL-запросов всех баз (с репликой каталог читается из нее).
+    Обертка добавляется в execute_wrappers соединений текущего потока
+    и при остановке удаляется сама, где бы в списке она ни стояла.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.total += elapsed
+            if len(self.queries) < MAX_LOGGED_QUERIES:
+                self.queries.append({
+                    'sql': sql,
+                    'ms': round(elapsed * 1000, 3),
+                    'many': many,
+                    'alias': context['connection'].alias,
+                })
+
+    def start(self):
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+
+    def stop(self):
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+
+class StackSampler:
+    """Выборка стеков потока по настенному времени в отдельном потоке"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+
+def frame_label(code):
+    """Имя кадра для collapsed stacks: функция и путь относительно проекта"""
+    filename = code.co_filename
+    if filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ',')
+
+
+class Profile:
+    """Профиль одного запроса: cProfile или выборка стеков плюс журнал SQL"""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.profiler = None
+        self.sampler = None
+        self.query_log = QueryLog()
+        self.started = None
+        self.elapsed = None
+
+    def start(self):
+        if self.mode == 'cprofile' and not _cprofile_lock.acquire(blocking=False):
+            # cProfile уже занят другим запросом этого процесса
+            self.mode = 'sampling'
+        if self.mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            self.sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000)
+            self.sampler.start()
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self.started
+        if self.profiler is not None:
+            self.profiler.disable()
+            _cprofile_lock.release()
+        else:
+            self.sampler.stop()
+
+    def profile_data(self):
+        if self.profiler is not None:
+            self.profiler.create_stats()
+            return marshal.dumps(self.profiler.stats)
+        return self.sampler.collapsed().encode()
+
+    def save(self, request, response):
+        from .models import RequestProfile
+
+        resolver_match = request.resolver_match
+        RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:500],
+            view_name=resolver_match.view_name if resolver_match else '',
+            status_code=response.status_code,
+            duration_ms=round(self.elapsed * 1000, 2),
+            query_count=self.query_log.count,
+            query_time_ms=round(self.query_log.total * 1000, 2),
+            mode=self.mode,
+            profile=zlib.compress(self.profile_data()),
+            queries=zlib.compress(json.dumps(self.query_log.queries, ensure_ascii=False).encode()),
+        )
+        RequestProfile.trim(settings.PROFILING_KEEP)
+
+
+class LoadedStats:
+    """Сохраненный профиль cProfile в виде, который принимает pstats.Stats"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def load_pstats(data, stream=None):
+    return pstats.Stats(LoadedStats(marshal.loads(data)), stream=stream)
+
+
+def top_stacks(collapsed, limit=30):
+    """Функции с наибольшим числом выборок на вершине стека: [(кадр, выборок)]"""
+    leaves = Counter()
+    for line in collapsed.splitlines():
+        stack, _, count = line.rpartition(' ')
+        leaves[stack.rsplit(';', 1)[-1]] += int(count)
+    return leaves.most_common(limit)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует выбранные запросы. Подключается в конце MIDDLEWARE, после
+    AuthenticationMiddleware: заголовок X-Profile принимается только от персонала.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.default_mode = settings.PROFILING_MODE
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = self._mode(request) if PROFILE_HEADER in request.headers else None
+        if mode is None and not self._sampled():
+            return self.get_response(request)
+
+        profile = Profile(mode or self.default_mode)
+        profile.query_log.start()
+        profile.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.stop()
+            profile.query_log.stop()
+        if not response.streaming:
+            profile.save(request, response)
+        return response
+
+    async def __acall__(self, request):
+        mode = None
+        if PROFILE_HEADER in request.headers:
+            mode = await sync_to_async(self._mode)(request)
+        if mode is None and not self._sampled():
+            return await self.get_response(request)
+
+        profile = Profile(mode or self.default_mode)
+        # ORM асинхронных представлений выполняется в отдельном потоке запроса,
+        # журнал SQL подключается к соединению этого потока
+        await sync_to_async(profile.query_log.start)()
+        profile.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile.stop()
+            await sync_to_async(profile.query_log.stop)()
+        if not response.streaming:
+            await sync_to_async(profile.save)(request, response)
+        return response
+
+    def _sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _mode(self, request):
+        """Режим из заголовка X-Profile, если его прислал сотрудник"""
+        if not request.user.is_staff:
+            return None
+        value = request.headers[PROFILE_HEADER].strip().lower()
+        return value if value in MODES else self.default_mode
@@ -0,0 +1,220 @@
+"""
+Журнал медленных SQL-запросов и статистика по отпечаткам запросов.
+
+При SLOW_QUERY_LOG_ENABLED обертка выполнения запросов подключается к каждому
+соединению с базой. Для каждого запроса считается отпечаток: литералы и
+параметры заменяются на ?, списки IN (...) и строки VALUES сворачиваются,
+пробелы нормализуются. Запросы, которые отличаются только значениями,
+попадают в одну строку статистики: число, суммарное и максимальное время,
+имена URL, из которых они выполнялись.
+
+Запросы дольше SLOW_QUERY_THRESHOLD_MS пишутся в логгер
+elegant_studio.slow_queries строкой JSON с местом вызова в коде проекта.
+
+Каждый процесс раз в SLOW_QUERY_FLUSH_SECONDS сохраняет свою статистику
+в отдельный файл в SLOW_QUERY_STATS_DIR; команда slow_queries складывает
+файлы всех процессов. Без SLOW_QUERY_LOG_ENABLED ни обертка, ни middleware
+не подключаются.
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.crypto import md5
+
+logger = logging.getLogger('elegant_studio.slow_queries')
+
+# Запросы вне HTTP-запроса (команды, сигналы после ответа) и до разбора URL
+NO_VIEW = '-'
+STATS_FILE_PREFIX = 'querystats-'
+# Сколько кадров кода проекта сохранять в записи о медленном запросе
+STACK_DEPTH = 5
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?(?![\w"])')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_ROWS = re.compile(r'(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_SPACES = re.compile(r'\s+')
+
+_current_request = ContextVar('querylog_request', default=None)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """(отпечаток, нормализованный SQL); текст ORM повторяется, поэтому результат кэшируется"""
+    normalized = _STRING.sub('?', sql)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _IN_LIST.sub('IN (...)', normalized)
+    normalized = _VALUES_ROWS.sub(r'\1, ...', normalized)
+    normalized = _SPACES.sub(' ', normalized).strip()
+    return md5(normalized.encode(), usedforsecurity=False).hexdigest()[:12], normalized
+
+
+def current_view():
+    request = _current_request.get()
+    if request is None or request.resolver_match is None:
+        return NO_VIEW
+    return request.resolver_match.view_name or NO_VIEW
+
+
+def call_site():
+    """Кадры кода проекта (без сторонних пакетов), откуда выполнен запрос"""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        f'{os.path.relpath(frame.filename, base_dir)}:{frame.lineno} in {frame.name}'
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename
+        and not frame.filename.endswith('querylog.py')
+    ]
+    return frames[-STACK_DEPTH:]
+
+
+def new_entry(sql):
+    # views: {имя URL: [число запросов, секунды]}
+    return {'sql': sql, 'count': 0, 'total': 0.0, 'max': 0.0, 'views': {}}
+
+
+def add_to_entry(entry, count, total, longest, views):
+    entry['count'] += count
+    entry['total'] += total
+    entry['max'] = max(entry['max'], longest)
+    for view, (view_count, view_total) in views.items():
+        view_stats = entry['views'].setdefault(view, [0, 0.0])
+        view_stats[0] += view_count
+        view_stats[1] += view_total
+
+
+class QueryStats:
+    """Статистика отпечатков в памяти процесса с периодическим сбросом в файл"""
+
+    def __init__(self, directory, flush_seconds):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.started = int(time.time())
+        self.last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def add(self, sql, elapsed, view):
+        key, normalized = fingerprint(sql)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = new_entry(normalized)
+            add_to_entry(entry, 1, elapsed, elapsed, {view: [1, elapsed]})
+            due = time.monotonic() - self.last_flush >= self.flush_seconds
+            if due:
+                self.last_flush = time.monotonic()
+        if due:
+            self.flush()
+        return key
+
+    def flush(self):
+        with self.lock:
+            data = json.dumps(self.entries, ensure_ascii=False)
+        os.makedirs(self.directory, exist_ok=True)
+        # Замена целиком: команда отчета не увидит недописанный файл
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+            temp_file.write(data)
+        # pid берется при сбросе: с preload_app объект создается до fork воркеров
+        os.replace(temp_path, os.path.join(self.directory, f'{STATS_FILE_PREFIX}{os.getpid()}-{self.started}.json'))
+
+
+_stats = None
+
+
+def log_query(execute, sql, params, many, context):
+    """Обертка connection.execute_wrapper: статистика отпечатков и журнал медленных запросов"""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        view = current_view()
+        key = _stats.add(sql, elapsed, view)
+        if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            logger.warning(json.dumps({
+                'fingerprint': key,
+                'ms': round(elapsed * 1000, 2),
+                'view': view,
+                'alias': context['connection'].alias,
+                'sql': fingerprint(sql)[1][:2000],
+                'origin': call_site(),
+            }, ensure_ascii=False))
+
+
+def _install_query_log(sender, connection, **kwargs):
+    # В начало списка, как и счетчик метрик: connection.execute_wrapper()
+    # профилировщика при выходе снимает последнюю обертку
+    if log_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log_query)
+
+
+def load_stats(directory):
+    """Статистика всех процессов: {отпечаток: запись}, времена в секундах"""
+    merged = {}
+    if not os.path.isdir(directory):
+        return merged
+    for name in os.listdir(directory):
+        if not (name.startswith(STATS_FILE_PREFIX) and name.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as stats_file:
+                entries = json.load(stats_file)
+        except (OSError, ValueError):
+            continue
+        for key, entry in entries.items():
+            if key not in merged:
+                merged[key] = new_entry(entry['sql'])
+            add_to_entry(merged[key], entry['count'], entry['total'], entry['max'], entry['views'])
+    return merged
+
+
+class QueryLogMiddleware:
+    """Запоминает текущий запрос, чтобы обертка знала имя URL. Подключается первым в MIDDLEWARE"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        global _stats
+        self.get_response = get_response
+        if _stats is None:
+            _stats = QueryStats(settings.SLOW_QUERY_STATS_DIR, settings.SLOW_QUERY_FLUSH_SECONDS)
+        connection_created.connect(_install_query_log, dispatch_uid='core.querylog.log_query')
+        # Соединения, открытые до загрузки middleware, сигнал уже пропустили
+        for connection in connections.all(initialized_only=True):
+            _install_query_log(None, connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+    async def __acall__(self, request):
+        token = _current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_request.reset(token)
@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from masters.models import Master, MasterService
+from portfolio.models import Portfolio
+from services.models import Category, Service
+from .api import invalidate_catalog
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Master)
+@receiver(post_delete, sender=Master)
+@receiver(post_save, sender=MasterService)
+@receiver(post_delete, sender=MasterService)
+@receiver(post_save, sender=Portfolio)
+@receiver(post_delete, sender=Portfolio)
+def catalog_changed(sender, instance, **kwargs):
+    """Новая версия каталога после коммита: иначе запрос успел бы закэшировать старые данные под новым ETag"""
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    """Имя мастера входит в API мастеров; вход пользователя меняет только last_login"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    if Master.objects.filter(user_id=instance.pk).exists():
+        transaction.on_commit(invalidate_catalog)
@@ -0,0 +1,437 @@
+import atexit
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from elegant_studio.db_backends.sqlite3.base import pragma_statements
+from masters.models import Master, MasterService
+from prometheus_client import REGISTRY
+from reviews.models import Review
+from services.models import Category, Service
+from . import querylog, traffic
+from .management.commands.replay_traffic import Command as ReplayTrafficCommand
+from .metrics import _install_query_counter, count_queries
+from .models import RequestProfile
+from .profiling import MODES, QueryLog
+from .traffic import TrafficRecorder, read_traffic
+
+# Манифест статики появляется только после collectstatic
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def create_catalog(masters=3):
+    """Категория, услуги, мастера, оказывающие все услуги, и отзывы клиентов"""
+    category = Category.objects.create(name='Маникюр')
+    services = [
+        Service.objects.create(
+            name=f'Услуга {index}', price=1000, duration_minutes=60,
+            category=category, is_featured=True,
+        )
+        for index in range(3)
+    ]
+    for index in range(masters):
+        user = User.objects.create(username=f'master-{index}', first_name=f'Мастер {index}')
+        master = Master.objects.create(user=user, specialization='Маникюр', experience_years=3, bio='')
+        for service in services:
+            MasterService.objects.create(master=master, service=service)
+        client = User.objects.create(username=f'client-{index}')
+        Review.objects.create(client=client, master=master, service=services[0], rating=5, comment='Спасибо')
+    return services
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], STORAGES=TEST_STORAGES)
+class AnonymousPageQueriesTests(TestCase):
+    """Анонимные страницы каталога: число запросов не зависит от числа строк, сессии не читаются"""
+    PAGES = {
+        'core:home': 3,
+        'services:service_list': 3,
+        'masters:master_list': 2,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+
+    def setUp(self):
+        cache.clear()
+
+    def assertNoSessionQueries(self, client, allowed=0):
+        for name, expected in self.PAGES.items():
+            with self.subTest(page=name):
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+                session_queries = [query for query in queries if 'django_session' in query['sql']]
+                self.assertLessEqual(len(session_queries), allowed)
+                self.assertEqual(len(queries) - len(session_queries), expected)
+
+    def test_query_counts(self):
+        for name, expected in self.PAGES.items():
+            with self.subTest(page=name), self.assertNumQueries(expected):
+                self.client.get(reverse(name))
+
+    def test_no_session_queries_without_cookie(self):
+        self.assertNoSessionQueries(self.client)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+
+    def test_stale_cookie_db_sessions(self):
+        # Просроченная сессия в БД: один запрос, после которого
+        # SessionMiddleware удаляет пустую cookie
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'x' * 32
+        self.assertNoSessionQueries(self.client, allowed=1)
+        self.assertEqual(self.client.cookies[settings.SESSION_COOKIE_NAME].value, '')
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_stale_cookie_signed_cookies(self):
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'x' * 32
+        self.assertNoSessionQueries(self.client)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache')
+    def test_stale_cookie_cache_sessions(self):
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'x' * 32
+        self.assertNoSessionQueries(self.client)
+
+
+# Middleware метрик и журнала SQL подключаются в начало, профилировщик — в конец
+PROFILED_MIDDLEWARE = [*settings.MIDDLEWARE, 'core.profiling.ProfilingMiddleware']
+
+
+class QueryWrapperTestCase(TestCase):
+    """Обертки SQL, которые middleware подключают к соединению, снимаются после теста"""
+    dispatch_uid = None
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+
+    def setUp(self):
+        cache.clear()
+        wrappers = list(connection.execute_wrappers)
+        self.addCleanup(connection.execute_wrappers.__setitem__, slice(None), wrappers)
+        self.addCleanup(connection_created.disconnect, dispatch_uid=self.dispatch_uid)
+
+    def assertNoQueryLogs(self):
+        self.assertFalse([wrapper for wrapper in connection.execute_wrappers if isinstance(wrapper, QueryLog)])
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'], STORAGES=TEST_STORAGES, PROFILING_SAMPLE_RATE=1.0,
+    MIDDLEWARE=['core.metrics.MetricsMiddleware', *PROFILED_MIDDLEWARE],
+)
+class MetricsQueryCounterTests(QueryWrapperTestCase):
+    """Счетчик SQL метрик вместе с журналом SQL профилировщика"""
+    dispatch_uid = 'core.metrics.count_queries'
+
+    def counted_queries(self, view):
+        return REGISTRY.get_sample_value('django_db_queries_total', {'view': view}) or 0
+
+    def test_counts_queries_of_profiled_requests(self):
+        view = 'services:service_list'
+        for attempt in range(3):
+            with self.subTest(attempt=attempt):
+                before = self.counted_queries(view)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(view))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.counted_queries(view) - before, len(queries))
+                self.assertIn(count_queries, connection.execute_wrappers)
+                self.assertNoQueryLogs()
+        self.assertEqual(RequestProfile.objects.count(), 3)
+
+    def test_connection_opened_during_profiled_request(self):
+        # Соединение открылось, когда журнал SQL профилировщика уже подключен
+        connection_created.connect(_install_query_counter, dispatch_uid=self.dispatch_uid)
+        query_log = QueryLog()
+        query_log.start()
+        connection_created.send(sender=type(connection), connection=connection)
+        query_log.stop()
+        self.assertIn(count_queries, connection.execute_wrappers)
+        self.assertNoQueryLogs()
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'], STORAGES=TEST_STORAGES, PROFILING_SAMPLE_RATE=1.0,
+    MIDDLEWARE=['core.querylog.QueryLogMiddleware', *PROFILED_MIDDLEWARE],
+    SLOW_QUERY_THRESHOLD_MS=60000,
+)
+class QueryLogTests(QueryWrapperTestCase):
+    """Статистика отпечатков SQL вместе с журналом SQL профилировщика"""
+    dispatch_uid = 'core.querylog.log_query'
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.stats_dir = directory.name
+        # Статистику процесса middleware создает заново в каталоге теста
+        patcher = mock.patch.object(querylog, '_stats', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.unregister_flush)
+
+    def unregister_flush(self):
+        if querylog._stats is not None:
+            atexit.unregister(querylog._stats.flush)
+
+    def test_logs_queries_of_profiled_requests(self):
+        view = 'services:service_list'
+        captured = 0
+        with self.settings(SLOW_QUERY_STATS_DIR=self.stats_dir):
+            for attempt in range(3):
+                with self.subTest(attempt=attempt):
+                    with CaptureQueriesContext(connection) as queries:
+                        response = self.client.get(reverse(view))
+                    self.assertEqual(response.status_code, 200)
+                    captured += len(queries)
+                    self.assertIn(querylog.log_query, connection.execute_wrappers)
+                    self.assertNoQueryLogs()
+
+        querylog._stats.flush()
+        logged = sum(entry['views'].get(view, [0])[0] for entry in querylog.load_stats(self.stats_dir).values())
+        self.assertEqual(logged, captured)
+
+    def test_connection_opened_during_profiled_request(self):
+        connection_created.connect(querylog._install_query_log, dispatch_uid=self.dispatch_uid)
+        query_log = QueryLog()
+        query_log.start()
+        connection_created.send(sender=type(connection), connection=connection)
+        query_log.stop()
+        self.assertIn(querylog.log_query, connection.execute_wrappers)
+        self.assertNoQueryLogs()
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class CatalogApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.services = create_catalog(masters=2)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, etag=None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse(name), params, **headers)
+
+    def test_out_of_range_ids(self):
+        huge = str(2 ** 64)
+        for name, params in (
+            ('services:service_list_json', {'ids': huge}),
+            ('services:service_list_json', {'ids': f'1,-{huge}'}),
+            ('masters:master_service_list_json', {'master': huge}),
+            ('masters:master_list_json', {'service': huge}),
+        ):
+            with self.subTest(name=name, params=params):
+                response = self.get(name, **params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_not_modified_without_queries(self):
+        response = self.get('services:service_list_json', ids=self.services[0].pk)
+        self.assertEqual(len(response.json()['services']), 1)
+        with self.assertNumQueries(0):
+            response = self.get('services:service_list_json', etag=response['ETag'], ids=self.services[0].pk)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_parameters(self):
+        etags = {
+            self.get('services:service_list_json')['ETag'],
+            self.get('services:service_list_json', fields='id,name')['ETag'],
+            self.get('services:service_list_json', ids=self.services[0].pk)['ETag'],
+        }
+        self.assertEqual(len(etags), 3)
+
+    def test_catalog_change_invalidates_etag(self):
+        etag = self.get('masters:master_list_json')['ETag']
+        master = Master.objects.select_related('user').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            master.user.first_name = 'Новое имя'
+            master.user.save()
+        response = self.get('masters:master_list_json', etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Новое имя', [item['first_name'] for item in response.json()['masters']])
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            master.user.save(update_fields=['last_login'])
+        self.assertEqual(self.get('masters:master_list_json', etag=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.services[0].price = 1500
+            self.services[0].save()
+        self.assertEqual(self.get('masters:master_list_json', etag=etag).status_code, 200)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], STORAGES=TEST_STORAGES, MIDDLEWARE=PROFILED_MIDDLEWARE)
+class ProfilingTests(TestCase):
+    # Вторая база вместо реплики: в тестах реплика не настроена
+    EXTRA_ALIAS = 'profiling_extra'
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def add_connection(self):
+        alias = self.EXTRA_ALIAS
+        connections.settings[alias] = connections.configure_settings({
+            'default': connections.settings['default'],
+            alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+        })[alias]
+        self.addCleanup(connections.settings.pop, alias)
+        self.addCleanup(connections.__delitem__, alias)
+        self.addCleanup(lambda: connections[alias].close())
+        return connections[alias]
+
+    def test_query_log_covers_every_alias(self):
+        extra = self.add_connection()
+        query_log = QueryLog()
+        query_log.start()
+        Service.objects.count()
+        with extra.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        query_log.stop()
+
+        self.assertEqual(query_log.count, 2)
+        self.assertEqual([query['alias'] for query in query_log.queries], ['default', self.EXTRA_ALIAS])
+        self.assertNotIn(query_log, connection.execute_wrappers)
+        self.assertNotIn(query_log, extra.execute_wrappers)
+
+    def test_stop_removes_only_itself(self):
+        def later_wrapper(execute, sql, params, many, context):
+            return execute(sql, params, many, context)
+
+        query_log = QueryLog()
+        query_log.start()
+        # Обертка, подключенная после журнала, остается после его остановки
+        connection.execute_wrappers.append(later_wrapper)
+        self.addCleanup(connection.execute_wrappers.remove, later_wrapper)
+        query_log.stop()
+        self.assertIn(later_wrapper, connection.execute_wrappers)
+        self.assertNotIn(query_log, connection.execute_wrappers)
+
+    def test_staff_header_profiles_request(self):
+        self.client.force_login(self.staff)
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                response = self.client.get(reverse('services:service_list'), HTTP_X_PROFILE=mode)
+                self.assertEqual(response.status_code, 200)
+                profile = RequestProfile.objects.latest('pk')
+                self.assertEqual(profile.mode, mode)
+                self.assertEqual(profile.view_name, 'services:service_list')
+                self.assertTrue(profile.query_count)
+                self.assertEqual(len(profile.get_queries()), profile.query_count)
+                response = self.client.get(reverse('core:profile_detail', args=[profile.pk]))
+                self.assertEqual(response.status_code, 200)
+
+    def test_header_from_client_is_ignored(self):
+        self.client.force_login(User.objects.create(username='client'))
+        self.client.get(reverse('services:service_list'), HTTP_X_PROFILE='cprofile')
+        self.assertFalse(RequestProfile.objects.exists())
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class StaticReferencesTests(SimpleTestCase):
+    """Та же проверка, что и check_static_references: битая ссылка роняет тесты"""
+
+    def check_static(self):
+        output = StringIO()
+        call_command('check_static_references', stdout=output)
+        return output.getvalue()
+
+    def test_templates_reference_existing_files(self):
+        self.assertIn('Все ссылки {% static %} указывают на существующие файлы', self.check_static())
+
+    def test_missing_file(self):
+        with tempfile.TemporaryDirectory() as template_dir:
+            Path(template_dir, 'broken.html').write_text(
+                "{% load static %}<img src=\"{% static 'img/missing.png' %}\">", encoding='utf-8'
+            )
+            templates = [{**settings.TEMPLATES[0], 'DIRS': [*settings.TEMPLATES[0]['DIRS'], template_dir]}]
+            with override_settings(TEMPLATES=templates), self.assertRaises(CommandError) as error:
+                self.check_static()
+        self.assertIn('img/missing.png: файл не найден', str(error.exception))
+
+
+class SqlitePragmaTests(SimpleTestCase):
+    def test_valid_values(self):
+        self.assertEqual(
+            pragma_statements({'journal_mode': 'wal', 'cache_size': '-64000', 'temp_store': 'MEMORY'}),
+            ['PRAGMA journal_mode = WAL', 'PRAGMA cache_size = -64000', 'PRAGMA temp_store = MEMORY'],
+        )
+
+    def test_rejects_values_outside_whitelist(self):
+        for pragmas in (
+            {'journal_mode': 'WAL; DROP TABLE auth_user'},
+            {'synchronous': 'SOMETIMES'},
+            {'mmap_size': '1; DROP TABLE auth_user'},
+            {'cache_size': True},
+            {'foreign_keys': 'OFF'},
+        ):
+            with self.subTest(pragmas=pragmas), self.assertRaises(ImproperlyConfigured):
+                pragma_statements(pragmas)
+
+
+class TrafficReplayTests(TestCase):
+    """Журнал, записанный TrafficRecorder, читается и превращается в задания воспроизведения"""
+
+    def setUp(self):
+        log = tempfile.NamedTemporaryFile(suffix='.jsonl', delete=False)
+        log.close()
+        self.path = log.name
+        self.addCleanup(Path(self.path).unlink)
+
+    def request(self, path, query='', user=None):
+        request = RequestFactory().get(path, QUERY_STRING=query)
+        request.resolver_match = resolve(path)
+        if user is not None:
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = 'session'
+            request.user = user
+        return request
+
+    def test_round_trip(self):
+        staff = User.objects.create(username='admin', is_staff=True)
+        recorder = TrafficRecorder(self.path, buffer_size=2)
+        requests = [
+            self.request(reverse('core:home')),
+            self.request(reverse('masters:master_list'), query='page=2'),
+            self.request(reverse('bookings:admin_appointment_list'), user=staff),
+        ]
+        response = mock.Mock(status_code=200)
+        with mock.patch.object(traffic.time, 'time', side_effect=[100.0, 101.0, 103.0]):
+            for request in requests:
+                recorder.record(request, response, 0)
+        recorder.flush()
+        # Оборванная последняя строка (процесс убит во время записи) пропускается
+        with open(self.path, 'a', encoding='utf-8') as log:
+            log.write('{"ts": 104.0, "path": "/bro')
+
+        entries = list(read_traffic(self.path))
+        self.assertEqual([entry['user'] for entry in entries], ['anonymous', 'anonymous', 'staff'])
+
+        jobs = ReplayTrafficCommand().build_jobs(
+            entries, 'http://127.0.0.1:8000', {'staff': 'sessionid=staff'}, speed=2,
+        )
+        self.assertEqual(jobs, [
+            (0, 'core:home', 'GET', 'http://127.0.0.1:8000/', None),
+            (0.5, 'masters:master_list', 'GET', f'http://127.0.0.1:8000{reverse("masters:master_list")}?page=2', None),
+            (1.5, 'bookings:admin_appointment_list', 'GET',
+             f'http://127.0.0.1:8000{reverse("bookings:admin_appointment_list")}', 'sessionid=staff'),
+        ])
@@ -0,0 +1,126 @@
+"""
+Запись трафика для воспроизведения нагрузки (manage.py replay_traffic).
+
+TrafficRecorderMiddleware дописывает в журнал JSON Lines по строке на
+запрос: время, метод, путь, строку запроса, класс пользователя (anonymous,
+client, staff), имя URL, статус и длительность обработки. Тела запросов,
+cookie и заголовки не записываются. Строки копятся в памяти процесса и
+дописываются в файл одним write() с O_APPEND, поэтому несколько процессов
+gunicorn могут писать в один журнал.
+
+Журнал содержит пути с подписанными ссылками календарных лент, поэтому
+хранить его нужно так же, как логи сервера.
+"""
+import atexit
+import json
+import os
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+
+def user_class(request):
+    """Класс пользователя запроса; без cookie сессии пользователь не загружается"""
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return 'anonymous'
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return 'anonymous'
+    return 'staff' if user.is_staff else 'client'
+
+
+class TrafficRecorder:
+    """Буферизованная запись журнала трафика"""
+
+    def __init__(self, path, buffer_size):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def record(self, request, response, started):
+        entry = {
+            'ts': round(time.time(), 3),
+            'method': request.method,
+            'path': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'user': user_class(request),
+            'view': request.resolver_match.view_name if request.resolver_match else None,
+            'status': response.status_code,
+            'ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self.lock:
+            self.buffer.append(line)
+            if len(self.buffer) < self.buffer_size:
+                return
+            lines, self.buffer = self.buffer, []
+        self._write(lines)
+
+    def flush(self):
+        with self.lock:
+            lines, self.buffer = self.buffer, []
+        if lines:
+            self._write(lines)
+
+    def _write(self, lines):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, ''.join(lines).encode())
+        finally:
+            os.close(fd)
+
+
+class TrafficRecorderMiddleware:
+    """
+    Записывает долю TRAFFIC_RECORD_SAMPLE запросов в TRAFFIC_RECORD_PATH.
+    Работает и под WSGI, и под ASGI, не переводя асинхронные представления
+    в поток. Потоки SSE не записываются: воспроизводить их бессмысленно.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample = settings.TRAFFIC_RECORD_SAMPLE
+        self.recorder = TrafficRecorder(settings.TRAFFIC_RECORD_PATH, settings.TRAFFIC_RECORD_BUFFER)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        if self._should_record(response):
+            self.recorder.record(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        if self._should_record(response):
+            # Класс пользователя может потребовать чтения сессии из базы
+            await sync_to_async(self.recorder.record)(request, response, started)
+        return response
+
+    def _should_record(self, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return False
+        return self.sample >= 1 or random.random() < self.sample
+
+
+def read_traffic(path):
+    """Записи журнала по порядку; поврежденные строки (например, оборванные) пропускаются"""
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and 'path' in entry and 'ts' in entry:
+                yield entry
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
@@ -12,9 +13,15 @@ urlpatterns = [
     path('news/<int:news_id>/', views.news_detail, name='news_detail'),
     path('profile/', views.profile, name='profile'),
     path('search/', views.search, name='search'),
+    path('profiles/', views.profile_list, name='profile_list'),
+    path('profiles/<int:pk>/', views.profile_detail, name='profile_detail'),
+    path('profiles/<int:pk>/download/', views.profile_download, name='profile_download'),
     
     # Authentication URLs
     path('accounts/login/', auth_views.LoginView.as_view(), name='account_login'),
     path('accounts/logout/', auth_views.LogoutView.as_view(), name='account_logout'),
     path('accounts/signup/', views.signup, name='account_signup'),
 ]
+
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path('metrics', views.metrics, name='metrics'))
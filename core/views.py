@@ -1,20 +1,29 @@
-from django.shortcuts import render, redirect
+import io
+
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login
 from django.contrib.auth.forms import UserCreationForm
+from django.conf import settings
 from django.contrib import messages
-from .models import Contact, News, About
+from django.core.paginator import Paginator
+from django.http import Http404, HttpResponse
+from .models import Contact, News, About, RequestProfile
+from .metrics import render_metrics
+from .profiling import load_pstats, top_stacks
 from services.models import Service, Category
 from masters.models import Master
 from reviews.models import Review
+from bookings.calendar import get_feed_url
+from bookings.summary import get_client_summary
 
 def home(request):
     """Главная страница сайта"""
     context = {
         'featured_services': Service.objects.filter(is_active=True, is_featured=True)[:6],
-        'masters': Master.objects.filter(is_active=True)[:4],
+        'masters': Master.objects.filter(is_active=True).select_related('user')[:4],
         'featured_news': News.objects.filter(is_active=True, is_featured=True)[:3],
-        'recent_reviews': Review.objects.filter(is_active=True).order_by('-created_at')[:5],
+        'recent_reviews': Review.objects.filter(is_active=True).select_related('client').order_by('-created_at')[:5],
         'contacts': Contact.objects.filter(is_active=True),
     }
     return render(request, 'core/home.html', context)
@@ -59,8 +68,12 @@ def news_detail(request, news_id):
 @login_required
 def profile(request):
     """Личный кабинет пользователя"""
+    master = Master.objects.filter(user=request.user).only('pk').first()
     context = {
         'user': request.user,
+        'summary': get_client_summary(request.user),
+        'client_feed_url': request.build_absolute_uri(get_feed_url('client', request.user.pk)),
+        'master_feed_url': request.build_absolute_uri(get_feed_url('master', master.pk)) if master else None,
     }
     return render(request, 'core/profile.html', context)
 
@@ -115,3 +128,75 @@ def signup(request):
         'form': form,
     }
     return render(request, 'core/signup.html', context)
+
+# Профили запросов (только для персонала)
+@login_required
+def profile_list(request):
+    """Самые медленные из профилированных запросов"""
+    if not request.user.is_staff:
+        messages.error(request, 'Доступ запрещен')
+        return redirect('core:home')
+    
+    profiles = RequestProfile.objects.defer('profile', 'queries')
+    view_name = request.GET.get('view', '')
+    if view_name:
+        profiles = profiles.filter(view_name=view_name)
+    
+    paginator = Paginator(profiles, 50)
+    context = {
+        'profiles': paginator.get_page(request.GET.get('page')),
+        'view_name': view_name,
+        'view_names': RequestProfile.objects.order_by('view_name').values_list('view_name', flat=True).distinct(),
+    }
+    return render(request, 'core/profile_list.html', context)
+
+@login_required
+def profile_detail(request, pk):
+    """Профиль запроса: самые затратные функции и журнал SQL"""
+    if not request.user.is_staff:
+        messages.error(request, 'Доступ запрещен')
+        return redirect('core:home')
+    
+    profile = get_object_or_404(RequestProfile, pk=pk)
+    stats_text = None
+    stacks = None
+    if profile.mode == 'cprofile':
+        stream = io.StringIO()
+        load_pstats(profile.get_profile_data(), stream).sort_stats('cumulative').print_stats(40)
+        stats_text = stream.getvalue()
+    else:
+        stacks = top_stacks(profile.get_profile_data().decode())
+    
+    queries = sorted(profile.get_queries(), key=lambda query: -query['ms'])
+    context = {
+        'profile': profile,
+        'stats_text': stats_text,
+        'stacks': stacks,
+        'samples': sum(count for frame, count in stacks) if stacks else 0,
+        'queries': queries,
+    }
+    return render(request, 'core/profile_detail.html', context)
+
+@login_required
+def profile_download(request, pk):
+    """Профиль файлом: collapsed stacks для flamegraph или .prof для pstats"""
+    if not request.user.is_staff:
+        messages.error(request, 'Доступ запрещен')
+        return redirect('core:home')
+    
+    profile = get_object_or_404(RequestProfile, pk=pk)
+    if profile.mode == 'cprofile':
+        response = HttpResponse(profile.get_profile_data(), content_type='application/octet-stream')
+        filename = f'request-{profile.pk}.prof'
+    else:
+        response = HttpResponse(profile.get_profile_data(), content_type='text/plain; charset=utf-8')
+        filename = f'request-{profile.pk}.collapsed.txt'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def metrics(request):
+    """Метрики Prometheus; отдаются только адресам из METRICS_ALLOWED_IPS"""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
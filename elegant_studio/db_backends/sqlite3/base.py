@@ -0,0 +1,59 @@
+"""
+SQLite-бэкенд, применяющий PRAGMA из настроек при каждом новом соединении.
+
+Пример настройки::
+
+    DATABASES['default'] = {
+        'ENGINE': 'elegant_studio.db_backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'PRAGMAS': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+    }
+
+PRAGMA не принимает параметров запроса, поэтому значения из окружения
+проверяются по белому списку до подстановки в SQL.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+PRAGMA_CHOICES = {
+    'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+}
+INTEGER_PRAGMAS = ('cache_size', 'mmap_size', 'busy_timeout')
+
+
+def pragma_statements(pragmas):
+    """Проверенные команды PRAGMA; неизвестное имя или значение — ImproperlyConfigured"""
+    statements = []
+    for name, value in pragmas.items():
+        if name in PRAGMA_CHOICES:
+            value = str(value).upper()
+            if value not in PRAGMA_CHOICES[name]:
+                raise ImproperlyConfigured(
+                    f'PRAGMA {name} должна быть одной из: {", ".join(PRAGMA_CHOICES[name])}'
+                )
+        elif name in INTEGER_PRAGMAS:
+            if isinstance(value, bool):
+                raise ImproperlyConfigured(f'PRAGMA {name} должна быть целым числом')
+            try:
+                value = int(str(value))
+            except ValueError:
+                raise ImproperlyConfigured(f'PRAGMA {name} должна быть целым числом')
+        else:
+            raise ImproperlyConfigured(f'Неподдерживаемая PRAGMA: {name}')
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pragma_statements = pragma_statements(self.settings_dict.get('PRAGMAS', {}))
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for statement in self.pragma_statements:
+            conn.execute(statement)
+        return conn
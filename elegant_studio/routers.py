@@ -0,0 +1,97 @@
+"""
+Маршрутизация запросов к базе данных между основной БД и репликой.
+
+Чтение каталога (услуги, мастера, портфолио, отзывы) уходит на реплику,
+все записи и данные записей на приём остаются на основной БД. После
+любого изменяющего запроса клиент на короткое время "прилипает" к
+основной БД, чтобы сразу увидеть свои изменения (read-after-write).
+"""
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY_DATABASE = 'default'
+PIN_COOKIE_NAME = 'db_primary_until'
+
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+
+
+def get_replica_database():
+    return getattr(settings, 'REPLICA_DATABASE', 'replica')
+
+
+def pin_to_primary():
+    """Направляет все чтения текущего запроса на основную БД"""
+    return _pinned_to_primary.set(True)
+
+
+def unpin(token):
+    _pinned_to_primary.reset(token)
+
+
+def is_pinned_to_primary():
+    return _pinned_to_primary.get()
+
+
+class PrimaryReplicaRouter:
+    """Отправляет чтение моделей каталога на реплику, остальное — на основную БД"""
+
+    def __init__(self):
+        self.replica_apps = set(getattr(
+            settings, 'REPLICA_APP_LABELS', ['services', 'masters', 'portfolio', 'reviews']
+        ))
+
+    def db_for_read(self, model, **hints):
+        if is_pinned_to_primary() or model._meta.app_label not in self.replica_apps:
+            return PRIMARY_DATABASE
+        return get_replica_database()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, поэтому связи между БД допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DATABASE
+
+
+class PrimaryPinMiddleware:
+    """
+    Закрепляет запрос за основной БД, если он изменяющий или клиент
+    недавно что-то изменил (метка времени хранится в cookie, а не в
+    сессии, чтобы не добавлять запросов к таблице сессий).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+    def __call__(self, request):
+        is_write = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        token = None
+        if is_write or self._is_sticky(request):
+            token = pin_to_primary()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                unpin(token)
+
+        if is_write:
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                str(int(time.time()) + self.sticky_seconds),
+                max_age=self.sticky_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def _is_sticky(self, request):
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE_NAME, 0)) > time.time()
+        except ValueError:
+            return False
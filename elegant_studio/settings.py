@@ -5,6 +5,7 @@ Django settings for elegant_studio project.
 import os
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -69,6 +71,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'elegant_studio.wsgi.application'
+ASGI_APPLICATION = 'elegant_studio.asgi.application'
 
 # Database
 DATABASES = {
@@ -78,6 +81,115 @@ DATABASES = {
     }
 }
 
+# Реплика для чтения каталога: услуги, мастера, портфолио, отзывы.
+# Локально это отдельный файл SQLite, обновляемый командой sync_replica.
+REPLICA_DATABASE = 'replica'
+REPLICA_APP_LABELS = ['services', 'masters', 'portfolio', 'reviews']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+DB_REPLICA_NAME = config('DB_REPLICA_NAME', default='')
+if DB_REPLICA_NAME:
+    DATABASES[REPLICA_DATABASE] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / DB_REPLICA_NAME,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['elegant_studio.routers.PrimaryReplicaRouter']
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('whitenoise.middleware.WhiteNoiseMiddleware') + 1,
+        'elegant_studio.routers.PrimaryPinMiddleware',
+    )
+
+# Запись трафика для воспроизведения нагрузки (manage.py replay_traffic):
+# журнал (пусто — запись выключена), доля записываемых запросов и сколько
+# строк копить в памяти процесса перед записью в файл
+TRAFFIC_RECORD_PATH = config('TRAFFIC_RECORD_PATH', default='')
+TRAFFIC_RECORD_SAMPLE = config('TRAFFIC_RECORD_SAMPLE', default=1.0, cast=float)
+TRAFFIC_RECORD_BUFFER = config('TRAFFIC_RECORD_BUFFER', default=100, cast=int)
+if TRAFFIC_RECORD_PATH:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('whitenoise.middleware.WhiteNoiseMiddleware') + 1,
+        'core.traffic.TrafficRecorderMiddleware',
+    )
+
+# Профилирование запросов (core/profiling.py, страница /profiles/): доля
+# профилируемых запросов (0 — только запросы персонала с заголовком X-Profile),
+# режим по умолчанию (sampling или cprofile), шаг выборки стеков и сколько
+# последних профилей хранить
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_MODE = config('PROFILING_MODE', default='sampling')
+PROFILING_INTERVAL_MS = config('PROFILING_INTERVAL_MS', default=5, cast=int)
+PROFILING_KEEP = config('PROFILING_KEEP', default=500, cast=int)
+if PROFILING_ENABLED:
+    MIDDLEWARE.append('core.profiling.ProfilingMiddleware')
+
+# Метрики Prometheus (core/metrics.py, страница /metrics): адреса, которым
+# она доступна. Под gunicorn задайте PROMETHEUS_MULTIPROC_DIR (см. gunicorn.conf.py)
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=lambda v: [s.strip() for s in v.split(',')])
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'core.metrics.MetricsMiddleware')
+
+# Журнал медленных SQL-запросов (core/querylog.py, manage.py slow_queries):
+# порог в мс, файл журнала (пусто — stderr), каталог статистики по отпечаткам
+# запросов и как часто процесс сохраняет в него свою статистику
+SLOW_QUERY_LOG_ENABLED = config('SLOW_QUERY_LOG_ENABLED', default=False, cast=bool)
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=float)
+SLOW_QUERY_LOG_PATH = config('SLOW_QUERY_LOG_PATH', default='')
+SLOW_QUERY_STATS_DIR = config('SLOW_QUERY_STATS_DIR', default=os.path.join(BASE_DIR, 'querystats'))
+SLOW_QUERY_FLUSH_SECONDS = config('SLOW_QUERY_FLUSH_SECONDS', default=10, cast=int)
+if SLOW_QUERY_LOG_ENABLED:
+    MIDDLEWARE.insert(0, 'core.querylog.QueryLogMiddleware')
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {
+            'slow_queries': {
+                'class': 'logging.FileHandler', 'filename': SLOW_QUERY_LOG_PATH,
+            } if SLOW_QUERY_LOG_PATH else {
+                'class': 'logging.StreamHandler',
+            },
+        },
+        'loggers': {
+            'elegant_studio.slow_queries': {
+                'handlers': ['slow_queries'], 'level': 'WARNING', 'propagate': False,
+            },
+        },
+    }
+
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='elegant-studio'),
+    }
+}
+
+# Sessions: db — таблица django_session, cached_db — кэш с записью в БД,
+# cache — только кэш (нужен общий кэш, например Redis или Memcached),
+# signed_cookies — данные сессии целиком в подписанной cookie, без обращений к БД
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_STRATEGY = config('SESSION_STRATEGY', default='db')
+if SESSION_STRATEGY not in SESSION_ENGINES:
+    raise ImproperlyConfigured(f'SESSION_STRATEGY должен быть одним из: {", ".join(SESSION_ENGINES)}')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_STRATEGY]
+
+# Messages: cookie — сообщения только в cookie, без записи в сессию;
+# fallback — cookie, а при переполнении сессия (поведение Django по умолчанию)
+MESSAGE_STORAGES = {
+    'cookie': 'django.contrib.messages.storage.cookie.CookieStorage',
+    'fallback': 'django.contrib.messages.storage.fallback.FallbackStorage',
+}
+MESSAGE_STRATEGY = config('MESSAGE_STORAGE', default='fallback')
+if MESSAGE_STRATEGY not in MESSAGE_STORAGES:
+    raise ImproperlyConfigured(f'MESSAGE_STORAGE должен быть одним из: {", ".join(MESSAGE_STORAGES)}')
+MESSAGE_STORAGE = MESSAGE_STORAGES[MESSAGE_STRATEGY]
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -107,6 +219,18 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
+# collectstatic сохраняет файлы с хешем содержимого в имени и сразу сжимает
+# их в .gz и .br; WhiteNoise отдает хешированные файлы с кэшированием на год+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+WHITENOISE_MAX_AGE = config('WHITENOISE_MAX_AGE', default=3600, cast=int)
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -142,6 +266,50 @@ MESSAGE_TAGS = {
     messages.ERROR: 'alert-danger',
 }
 
+# Bookings: закрытие прошедших записей (manage.py sweep_appointments)
+BOOKING_SWEEP_RULES = {
+    'confirmed': 'completed',
+    'pending': 'no_show',
+}
+BOOKING_SWEEP_GRACE_MINUTES = config('BOOKING_SWEEP_GRACE_MINUTES', default=60, cast=int)
+BOOKING_SWEEP_BATCH_SIZE = config('BOOKING_SWEEP_BATCH_SIZE', default=500, cast=int)
+
+# JSON API каталога (services/api/, masters/api/, portfolio/api/): время кэширования ответа клиентом
+CATALOG_API_MAX_AGE = config('CATALOG_API_MAX_AGE', default=60, cast=int)
+
+# Bookings: время жизни версий слотов в кэше (ETag для available_times)
+BOOKING_SLOTS_VERSION_TIMEOUT = 60 * 60 * 24
+
+# Bookings: кэш занятости дня мастера и его прогрев по прогнозу спроса
+# (manage.py prewarm_availability): время жизни, глубина истории в неделях,
+# коэффициент сглаживания, горизонт в днях и число прогреваемых пар (мастер, дата)
+BOOKING_AVAILABILITY_TIMEOUT = config('BOOKING_AVAILABILITY_TIMEOUT', default=60 * 60 * 6, cast=int)
+BOOKING_FORECAST_WEEKS = config('BOOKING_FORECAST_WEEKS', default=12, cast=int)
+BOOKING_FORECAST_ALPHA = config('BOOKING_FORECAST_ALPHA', default=0.3, cast=float)
+BOOKING_PREWARM_DAYS = config('BOOKING_PREWARM_DAYS', default=14, cast=int)
+BOOKING_PREWARM_LIMIT = config('BOOKING_PREWARM_LIMIT', default=50, cast=int)
+
+# Bookings: время жизни карты длительностей и цен услуг у мастеров
+# (сбрасывается при изменении MasterService и Service)
+SERVICE_TERMS_TIMEOUT = 60 * 60 * 24
+
+# Bookings: время жизни кэша сводки клиента в личном кабинете
+CLIENT_SUMMARY_TIMEOUT = config('CLIENT_SUMMARY_TIMEOUT', default=60 * 15, cast=int)
+
+# Bookings: календарные ленты .ics (глубина прошлого в днях и время жизни кэша ленты)
+CALENDAR_FEED_PAST_DAYS = config('CALENDAR_FEED_PAST_DAYS', default=30, cast=int)
+CALENDAR_FEED_TIMEOUT = config('CALENDAR_FEED_TIMEOUT', default=60 * 60, cast=int)
+
+# Bookings: сколько секунд выбранное в форме время удерживается за клиентом
+BOOKING_HOLD_SECONDS = config('BOOKING_HOLD_SECONDS', default=5 * 60, cast=int)
+
+# Bookings: лист ожидания (сколько минут освободившееся время удерживается за клиентом)
+WAITLIST_OFFER_MINUTES = config('WAITLIST_OFFER_MINUTES', default=30, cast=int)
+
+# Bookings: перенос старых записей в архив (manage.py archive_appointments)
+BOOKING_ARCHIVE_MONTHS = config('BOOKING_ARCHIVE_MONTHS', default=12, cast=int)
+BOOKING_ARCHIVE_BATCH_SIZE = config('BOOKING_ARCHIVE_BATCH_SIZE', default=500, cast=int)
+
 # Security settings
 if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True
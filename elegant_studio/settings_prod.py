@@ -0,0 +1,57 @@
+"""
+Настройки Django для продакшена (gunicorn).
+
+Все параметры берутся из переменных окружения / .env через decouple:
+    DJANGO_SETTINGS_MODULE=elegant_studio.settings_prod gunicorn -c gunicorn.conf.py
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *
+
+DEBUG = config('DEBUG', default=False, cast=bool)
+
+# Постоянные соединения с БД вместо открытия нового на каждый запрос
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# PRAGMA SQLite, применяемые при каждом подключении
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+    'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+    # Отрицательное значение — размер кэша в КиБ
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=268435456, cast=int),
+    'temp_store': 'MEMORY',
+}
+
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    database['CONN_HEALTH_CHECKS'] = DB_CONN_HEALTH_CHECKS
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['ENGINE'] = 'elegant_studio.db_backends.sqlite3'
+        database['PRAGMAS'] = SQLITE_PRAGMAS
+        # Ожидание блокировки записи вместо немедленной ошибки "database is locked"
+        database.setdefault('OPTIONS', {})['timeout'] = config('SQLITE_BUSY_TIMEOUT', default=20, cast=int)
+
+# Версии слотов, удержания времени (атомарный cache.add) и кэш занятости
+# должны быть общими для всех воркеров gunicorn: кэш в памяти у каждого
+# процесса свой, и воркеры не видели бы удержаний и записей друг друга
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+if CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+    raise ImproperlyConfigured(
+        'settings_prod требует общий кэш: задайте CACHE_BACKEND и CACHE_LOCATION, например '
+        'django.core.cache.backends.redis.RedisCache и redis://127.0.0.1:6379/1 '
+        '(клиент redis есть в requirements-dev.txt, нужен запущенный сервер Redis)'
+    )
+
+# Безопасность
+if not DEBUG:
+    SECURE_CONTENT_TYPE_NOSNIFF = True
+    SECURE_HSTS_INCLUDE_SUBDOMAINS = True
+    SECURE_HSTS_SECONDS = config('SECURE_HSTS_SECONDS', default=31536000, cast=int)
+    SECURE_SSL_REDIRECT = config('SECURE_SSL_REDIRECT', default=True, cast=bool)
+    SESSION_COOKIE_SECURE = SECURE_SSL_REDIRECT
+    CSRF_COOKIE_SECURE = SECURE_SSL_REDIRECT
@@ -0,0 +1,46 @@
+"""
+Конфигурация gunicorn для продакшена.
+
+    DJANGO_SETTINGS_MODULE=elegant_studio.settings_prod gunicorn -c gunicorn.conf.py
+
+Режим ASGI (асинхронные JSON-эндпоинты и SSE не занимают поток на запрос):
+
+    GUNICORN_APP=elegant_studio.asgi:application \
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \
+    DJANGO_SETTINGS_MODULE=elegant_studio.settings_prod gunicorn -c gunicorn.conf.py
+
+Метрики (METRICS_ENABLED=True) суммируются по всем воркерам, если задан
+каталог PROMETHEUS_MULTIPROC_DIR; при запуске сервера он очищается.
+"""
+import multiprocessing
+import os
+import shutil
+
+import decouple
+from prometheus_client import multiprocess
+
+wsgi_app = decouple.config('GUNICORN_APP', default='elegant_studio.wsgi:application')
+worker_class = decouple.config('GUNICORN_WORKER_CLASS', default='gthread')
+bind = decouple.config('GUNICORN_BIND', default='127.0.0.1:8000')
+workers = decouple.config('GUNICORN_WORKERS', default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+# Используется только воркерами gthread
+threads = decouple.config('GUNICORN_THREADS', default=2, cast=int)
+# Перезапуск воркеров ограничивает рост памяти, джиттер разносит перезапуски во времени
+max_requests = decouple.config('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = 100
+timeout = 30
+keepalive = 5
+accesslog = '-'
+
+
+def on_starting(server):
+    # Значения прошлого запуска не должны попасть в новые метрики
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='masterservice',
+            index=models.Index(fields=['service', 'is_active'], name='masterservice_service_idx'),
+        ),
+    ]
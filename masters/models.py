@@ -57,6 +57,10 @@ class MasterService(models.Model):
         verbose_name = _('Услуга мастера')
         verbose_name_plural = _('Услуги мастеров')
         unique_together = ['master', 'service']
+        indexes = [
+            # Выбор мастеров, оказывающих услугу (подбор мастера, комплексная запись)
+            models.Index(fields=['service', 'is_active'], name='masterservice_service_idx'),
+        ]
     
     def __str__(self):
         return f"{self.master} - {self.service}"
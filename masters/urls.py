@@ -7,4 +7,6 @@ urlpatterns = [
     path('', views.master_list, name='master_list'),
     path('<int:pk>/', views.master_detail, name='master_detail'),
     path('service/<int:service_id>/', views.master_by_service, name='master_by_service'),
+    path('api/', views.master_list_json, name='master_list_json'),
+    path('api/services/', views.master_service_list_json, name='master_service_list_json'),
 ]
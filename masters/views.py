@@ -1,11 +1,12 @@
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
 from django.db.models import Q
+from core.api import CatalogResource, catalog_response, media_url
 from .models import Master, MasterService
 
 def master_list(request):
     """Список всех мастеров"""
-    masters = Master.objects.filter(is_active=True)
+    masters = Master.objects.filter(is_active=True).select_related('user')
     
     # Фильтрация по специализации
     specialization = request.GET.get('specialization')
@@ -91,3 +92,54 @@ def master_by_service(request, service_id):
         'master_services': master_services,
     }
     return render(request, 'masters/master_by_service.html', context)
+
+def _filter_by_service(masters, service_id):
+    """Мастера, оказывающие услугу"""
+    return masters.filter(
+        master_masterservices__service_id=service_id,
+        master_masterservices__is_active=True
+    ).distinct()
+
+MASTER_API = CatalogResource(
+    'masters',
+    Master.objects.filter(is_active=True).order_by('sort_order', 'user__first_name'),
+    fields={
+        'id': 'id',
+        'first_name': 'user__first_name',
+        'last_name': 'user__last_name',
+        'specialization': 'specialization',
+        'experience_years': 'experience_years',
+        'bio': 'bio',
+        'photo': 'photo',
+        'sort_order': 'sort_order',
+        'updated_at': 'updated_at',
+    },
+    default_fields=('id', 'first_name', 'last_name', 'specialization', 'experience_years', 'photo'),
+    filters={'service': _filter_by_service},
+    transforms={'photo': media_url},
+)
+
+MASTER_SERVICE_API = CatalogResource(
+    'master_services',
+    MasterService.objects.filter(
+        is_active=True,
+        master__is_active=True,
+        service__is_active=True
+    ).order_by('master_id', 'service_id'),
+    fields={
+        'id': 'id',
+        'master': 'master_id',
+        'service': 'service_id',
+        'price_modifier': 'price_modifier',
+        'duration_modifier': 'duration_modifier',
+    },
+    filters={'master': 'master_id', 'service': 'service_id'},
+)
+
+async def master_list_json(request):
+    """Список активных мастеров в JSON"""
+    return await catalog_response(request, MASTER_API)
+
+async def master_service_list_json(request):
+    """Услуги мастеров с модификаторами цены и длительности в JSON"""
+    return await catalog_response(request, MASTER_SERVICE_API)
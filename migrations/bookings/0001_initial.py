@@ -1,75 +0,0 @@
-# Generated by Django 4.2.7 on 2024-01-01 00:00:00
-
-from django.conf import settings
-from django.db import migrations, models
-import django.db.models.deletion
-
-
-class Migration(migrations.Migration):
-
-    initial = True
-
-    dependencies = [
-        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
-        ('services', '0001_initial'),
-        ('masters', '0001_initial'),
-    ]
-
-    operations = [
-        migrations.CreateModel(
-            name='Appointment',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('appointment_date', models.DateField(verbose_name='Дата записи')),
-                ('start_time', models.TimeField(verbose_name='Время начала')),
-                ('end_time', models.TimeField(verbose_name='Время окончания')),
-                ('status', models.CharField(choices=[('pending', 'Ожидает подтверждения'), ('confirmed', 'Подтверждено'), ('completed', 'Завершено'), ('cancelled', 'Отменено'), ('no_show', 'Не явился')], default='pending', max_length=20, verbose_name='Статус')),
-                ('notes', models.TextField(blank=True, verbose_name='Примечания')),
-                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
-                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
-                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to=settings.AUTH_USER_MODEL, verbose_name='Клиент')),
-                ('master', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='masters.master', verbose_name='Мастер')),
-                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='services.service', verbose_name='Услуга')),
-            ],
-            options={
-                'verbose_name': 'Запись',
-                'verbose_name_plural': 'Записи',
-                'ordering': ['-appointment_date', '-start_time'],
-                'unique_together': {('master', 'appointment_date', 'start_time')},
-            },
-        ),
-        migrations.CreateModel(
-            name='TimeSlot',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('date', models.DateField(verbose_name='Дата')),
-                ('start_time', models.TimeField(verbose_name='Время начала')),
-                ('end_time', models.TimeField(verbose_name='Время окончания')),
-                ('is_available', models.BooleanField(default=True, verbose_name='Доступно')),
-                ('is_break', models.BooleanField(default=False, verbose_name='Перерыв')),
-                ('master', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='time_slots', to='masters.master', verbose_name='Мастер')),
-            ],
-            options={
-                'verbose_name': 'Временной слот',
-                'verbose_name_plural': 'Временные слоты',
-                'unique_together': {('master', 'date', 'start_time')},
-                'ordering': ['date', 'start_time'],
-            },
-        ),
-        migrations.CreateModel(
-            name='MasterService',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('price_modifier', models.DecimalField(decimal_places=2, default=1.0, max_digits=5, verbose_name='Модификатор цены')),
-                ('duration_modifier', models.IntegerField(default=0, verbose_name='Модификатор длительности (минуты)')),
-                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
-                ('master', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='masters.master', verbose_name='Мастер')),
-                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.service', verbose_name='Услуга')),
-            ],
-            options={
-                'verbose_name': 'Услуга мастера',
-                'verbose_name_plural': 'Услуги мастеров',
-                'unique_together': {('master', 'service')},
-            },
-        ),
-    ]
@@ -1,83 +0,0 @@
-# Generated by Django 4.2.7 on 2024-01-01 00:00:00
-
-from django.conf import settings
-from django.db import migrations, models
-import django.db.models.deletion
-
-
-class Migration(migrations.Migration):
-
-    initial = True
-
-    dependencies = [
-        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
-    ]
-
-    operations = [
-        migrations.CreateModel(
-            name='UserProfile',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('phone', models.CharField(blank=True, max_length=20, verbose_name='Телефон')),
-                ('birth_date', models.DateField(blank=True, null=True, verbose_name='Дата рождения')),
-                ('address', models.TextField(blank=True, verbose_name='Адрес')),
-                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
-                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
-                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL)),
-            ],
-            options={
-                'verbose_name': 'Профиль пользователя',
-                'verbose_name_plural': 'Профили пользователей',
-            },
-        ),
-        migrations.CreateModel(
-            name='Contact',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('name', models.CharField(max_length=100, verbose_name='Название')),
-                ('value', models.CharField(max_length=255, verbose_name='Значение')),
-                ('icon', models.CharField(blank=True, max_length=50, verbose_name='Иконка')),
-                ('order', models.IntegerField(default=0, verbose_name='Порядок')),
-                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
-            ],
-            options={
-                'verbose_name': 'Контакт',
-                'verbose_name_plural': 'Контакты',
-                'ordering': ['order'],
-            },
-        ),
-        migrations.CreateModel(
-            name='News',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('title', models.CharField(max_length=200, verbose_name='Заголовок')),
-                ('content', models.TextField(verbose_name='Содержание')),
-                ('image', models.ImageField(blank=True, upload_to='news/', verbose_name='Изображение')),
-                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
-                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
-                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
-                ('is_featured', models.BooleanField(default=False, verbose_name='Рекомендуемое')),
-            ],
-            options={
-                'verbose_name': 'Новость',
-                'verbose_name_plural': 'Новости',
-                'ordering': ['-created_at'],
-            },
-        ),
-        migrations.CreateModel(
-            name='About',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('title', models.CharField(max_length=200, verbose_name='Заголовок')),
-                ('content', models.TextField(verbose_name='Содержание')),
-                ('image', models.ImageField(blank=True, upload_to='about/', verbose_name='Изображение')),
-                ('order', models.IntegerField(default=0, verbose_name='Порядок')),
-                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
-            ],
-            options={
-                'verbose_name': 'О студии',
-                'verbose_name_plural': 'О студии',
-                'ordering': ['order'],
-            },
-        ),
-    ]
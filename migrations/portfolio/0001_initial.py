@@ -1,53 +0,0 @@
-# Generated by Django 4.2.7 on 2024-01-01 00:00:00
-
-from django.db import migrations, models
-import django.db.models.deletion
-
-
-class Migration(migrations.Migration):
-
-    initial = True
-
-    dependencies = [
-        ('masters', '0001_initial'),
-        ('services', '0001_initial'),
-    ]
-
-    operations = [
-        migrations.CreateModel(
-            name='Portfolio',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('title', models.CharField(max_length=200, verbose_name='Название работы')),
-                ('description', models.TextField(verbose_name='Описание работы')),
-                ('image', models.ImageField(upload_to='portfolio/', verbose_name='Изображение')),
-                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
-                ('is_featured', models.BooleanField(default=False, verbose_name='Рекомендуемое')),
-                ('sort_order', models.IntegerField(default=0, verbose_name='Порядок сортировки')),
-                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
-                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
-                ('master', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='portfolio_works', to='masters.master', verbose_name='Мастер')),
-                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='portfolio_works', to='services.service', verbose_name='Услуга')),
-            ],
-            options={
-                'verbose_name': 'Работа в портфолио',
-                'verbose_name_plural': 'Работы в портфолио',
-                'ordering': ['sort_order', '-created_at'],
-            },
-        ),
-        migrations.CreateModel(
-            name='PortfolioImage',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('image', models.ImageField(upload_to='portfolio/additional/', verbose_name='Изображение')),
-                ('caption', models.CharField(blank=True, max_length=200, verbose_name='Подпись')),
-                ('sort_order', models.IntegerField(default=0, verbose_name='Порядок сортировки')),
-                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='additional_images', to='portfolio.portfolio', verbose_name='Работа')),
-            ],
-            options={
-                'verbose_name': 'Дополнительное изображение',
-                'verbose_name_plural': 'Дополнительные изображения',
-                'ordering': ['sort_order'],
-            },
-        ),
-    ]
@@ -1,72 +0,0 @@
-# Generated by Django 4.2.7 on 2024-01-01 00:00:00
-
-from django.conf import settings
-from django.db import migrations, models
-import django.db.models.deletion
-
-
-class Migration(migrations.Migration):
-
-    initial = True
-
-    dependencies = [
-        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
-        ('masters', '0001_initial'),
-        ('services', '0001_initial'),
-    ]
-
-    operations = [
-        migrations.CreateModel(
-            name='Review',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('rating', models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)], verbose_name='Оценка')),
-                ('comment', models.TextField(verbose_name='Комментарий')),
-                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
-                ('is_verified', models.BooleanField(default=False, verbose_name='Подтверждено')),
-                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
-                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
-                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to=settings.AUTH_USER_MODEL, verbose_name='Клиент')),
-                ('master', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='masters.master', verbose_name='Мастер')),
-                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='services.service', verbose_name='Услуга')),
-            ],
-            options={
-                'verbose_name': 'Отзыв',
-                'verbose_name_plural': 'Отзывы',
-                'ordering': ['-created_at'],
-                'unique_together': {('client', 'master', 'service')},
-            },
-        ),
-        migrations.CreateModel(
-            name='ReviewImage',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('image', models.ImageField(upload_to='reviews/', verbose_name='Изображение')),
-                ('caption', models.CharField(blank=True, max_length=200, verbose_name='Подпись')),
-                ('sort_order', models.IntegerField(default=0, verbose_name='Порядок сортировки')),
-                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='reviews.review', verbose_name='Отзыв')),
-            ],
-            options={
-                'verbose_name': 'Изображение отзыва',
-                'verbose_name_plural': 'Изображения отзывов',
-                'ordering': ['sort_order'],
-            },
-        ),
-        migrations.CreateModel(
-            name='ReviewResponse',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('content', models.TextField(verbose_name='Содержание ответа')),
-                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
-                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
-                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
-                ('master', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='masters.master', verbose_name='Мастер')),
-                ('review', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='response', to='reviews.review', verbose_name='Отзыв')),
-            ],
-            options={
-                'verbose_name': 'Ответ на отзыв',
-                'verbose_name_plural': 'Ответы на отзывы',
-                'ordering': ['-created_at'],
-            },
-        ),
-    ]
@@ -1,3 +0,0 @@
-
-
-
@@ -1,55 +0,0 @@
-# Generated by Django 4.2.7 on 2024-01-01 00:00:00
-
-from django.db import migrations, models
-import django.db.models.deletion
-
-
-class Migration(migrations.Migration):
-
-    initial = True
-
-    dependencies = [
-    ]
-
-    operations = [
-        migrations.CreateModel(
-            name='Category',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('name', models.CharField(max_length=100, verbose_name='Название')),
-                ('description', models.TextField(blank=True, verbose_name='Описание')),
-                ('icon', models.CharField(blank=True, max_length=50, verbose_name='Иконка')),
-                ('image', models.ImageField(blank=True, upload_to='categories/', verbose_name='Изображение')),
-                ('sort_order', models.IntegerField(default=0, verbose_name='Порядок сортировки')),
-                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
-            ],
-            options={
-                'verbose_name': 'Категория услуг',
-                'verbose_name_plural': 'Категории услуг',
-                'ordering': ['sort_order', 'name'],
-            },
-        ),
-        migrations.CreateModel(
-            name='Service',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('name', models.CharField(max_length=200, verbose_name='Название')),
-                ('description', models.TextField(verbose_name='Описание')),
-                ('short_description', models.CharField(blank=True, max_length=300, verbose_name='Краткое описание')),
-                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
-                ('duration_minutes', models.IntegerField(verbose_name='Длительность (минуты)')),
-                ('image', models.ImageField(blank=True, upload_to='services/', verbose_name='Изображение')),
-                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
-                ('is_featured', models.BooleanField(default=False, verbose_name='Рекомендуемое')),
-                ('sort_order', models.IntegerField(default=0, verbose_name='Порядок сортировки')),
-                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
-                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
-                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='services', to='services.category', verbose_name='Категория')),
-            ],
-            options={
-                'verbose_name': 'Услуга',
-                'verbose_name_plural': 'Услуги',
-                'ordering': ['sort_order', 'name'],
-            },
-        ),
-    ]
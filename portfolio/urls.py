@@ -9,4 +9,5 @@ urlpatterns = [
     path('<int:pk>/', views.portfolio_detail, name='portfolio_detail'),
     path('master/<int:master_id>/', views.master_portfolio, name='master_portfolio'),
     path('service/<int:service_id>/', views.service_portfolio, name='service_portfolio'),
+    path('api/', views.portfolio_list_json, name='portfolio_list_json'),
 ]
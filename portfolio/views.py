@@ -1,6 +1,7 @@
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
 from django.db.models import Q
+from core.api import CatalogResource, catalog_response, media_url
 from .models import Portfolio
 from masters.models import Master
 from services.models import Service
@@ -129,3 +130,25 @@ def featured_portfolio(request):
         'featured_works': featured_works,
     }
     return render(request, 'portfolio/featured_portfolio.html', context)
+
+PORTFOLIO_API = CatalogResource(
+    'portfolio',
+    Portfolio.objects.filter(is_active=True).order_by('sort_order', '-created_at'),
+    fields={
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'image': 'image',
+        'master': 'master_id',
+        'service': 'service_id',
+        'is_featured': 'is_featured',
+        'created_at': 'created_at',
+    },
+    default_fields=('id', 'title', 'image', 'master', 'service', 'is_featured'),
+    filters={'master': 'master_id', 'service': 'service_id'},
+    transforms={'image': media_url},
+)
+
+async def portfolio_list_json(request):
+    """Работы портфолио в JSON"""
+    return await catalog_response(request, PORTFOLIO_API)
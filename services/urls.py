@@ -8,4 +8,6 @@ urlpatterns = [
     path('<int:pk>/', views.service_detail, name='service_detail'),
     path('category/<int:pk>/', views.category_detail, name='category_detail'),
     path('price/', views.price_list, name='price_list'),
+    path('api/', views.service_list_json, name='service_list_json'),
+    path('api/categories/', views.category_list_json, name='category_list_json'),
 ]
@@ -1,11 +1,12 @@
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
 from django.db.models import Q
+from core.api import CatalogResource, catalog_response, media_url
 from .models import Service, Category
 
 def service_list(request):
     """Список всех услуг"""
-    services = Service.objects.filter(is_active=True)
+    services = Service.objects.filter(is_active=True).select_related('category')
     
     # Фильтрация по категории
     category_id = request.GET.get('category')
@@ -85,3 +86,48 @@ def price_list(request):
         'categories': categories,
     }
     return render(request, 'services/price_list.html', context)
+
+CATEGORY_API = CatalogResource(
+    'categories',
+    Category.objects.filter(is_active=True).order_by('sort_order', 'name'),
+    fields={
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'icon': 'icon',
+        'image': 'image',
+        'sort_order': 'sort_order',
+    },
+    default_fields=('id', 'name', 'icon', 'image'),
+    transforms={'image': media_url},
+)
+
+SERVICE_API = CatalogResource(
+    'services',
+    Service.objects.filter(is_active=True).order_by('sort_order', 'name'),
+    fields={
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'short_description': 'short_description',
+        'price': 'price',
+        'duration_minutes': 'duration_minutes',
+        'category': 'category_id',
+        'category_name': 'category__name',
+        'image': 'image',
+        'is_featured': 'is_featured',
+        'sort_order': 'sort_order',
+        'updated_at': 'updated_at',
+    },
+    default_fields=('id', 'name', 'short_description', 'price', 'duration_minutes', 'category', 'is_featured'),
+    filters={'category': 'category_id'},
+    transforms={'image': media_url},
+)
+
+async def category_list_json(request):
+    """Категории услуг в JSON"""
+    return await catalog_response(request, CATEGORY_API)
+
+async def service_list_json(request):
+    """Каталог активных услуг в JSON"""
+    return await catalog_response(request, SERVICE_API)